@@ -25,6 +25,7 @@ class DataType(Enum):
     STATUS = 4
     SVG = 5
     TEXT_RESULT = 6
+    TEXT_PARTIAL = 7
 
     def to_str(self):
         if self == DataType.TEXT:
@@ -39,13 +40,23 @@ class DataType(Enum):
             return "SVG"
         if self == DataType.TEXT_RESULT:
             return "TEXT_RESULT"
+        if self == DataType.TEXT_PARTIAL:
+            return "TEXT_PARTIAL"
         return "UNKNOWN"
 
 
 class Data:
-    def __init__(self, in_type: DataType, who: Sender = Sender.BOT, data: Any = None, data2: Any = None):
+    def __init__(self, in_type: DataType, who: Sender = Sender.BOT, data: Any = None, data2: Any = None,
+                 internal: Any = None):
+        """:param internal: data for the bot only, never sent to the client"""
         self.type = in_type
         self.data = data
         self.data2 = data2
+        self.internal = internal
         self.who = who
         self.id = str(uuid.uuid1())
+
+    def to_message(self) -> dict:
+        """:return: the message sent to the client"""
+        return {"type": self.type.to_str(), "data": str(self.data), "data2": str(self.data2),
+                "who": self.who.to_str(), "id": self.id}
@@ -1,4 +1,4 @@
-from sage.api.data import Sender, DataType
+from sage.api.data import Sender, DataType, Data
 
 
 def test_sender_to_str():
@@ -13,3 +13,12 @@ def test_type_to_str():
     assert DataType.EVENT.to_str() == "EVENT"
     assert DataType.TEXT_RESULT.to_str() == "TEXT_RESULT"
     assert DataType.AUDIO.to_str() == "AUDIO"
+    assert DataType.TEXT_PARTIAL.to_str() == "TEXT_PARTIAL"
+
+
+def test_to_message():
+    d = Data(in_type=DataType.TEXT_RESULT, who=Sender.RECOGNIZER, data="1 plus 1", internal=["1 plus 1", "1 plus 2"])
+    assert d.to_message() == {"type": "TEXT_RESULT", "data": "1 plus 1", "data2": "None", "who": "RECOGNIZER",
+                              "id": d.id}
+    d = Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data="1 plus...", internal="1 plus")
+    assert d.to_message()["data2"] == "None"
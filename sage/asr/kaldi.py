@@ -1,16 +1,19 @@
 import json
 import queue
 import threading
-from urllib.parse import urlencode
 
 import websocket as websocket
 
 from sage.api.data import Data, DataType, Sender
+from sage.asr.protocol import Transcript, get_url
 from sage.logger import logger
 
+# audio frames waiting for the connection, over it the new frames are dropped
+MAX_AUDIO_QUEUE = 500
+
 
 class WsClient:
-    def __init__(self, url, text_method, event_method):
+    def __init__(self, url, text_method, event_method, nbest: int = 1):
         websocket.setdefaulttimeout(15)
         self.ws_conn = websocket.WebSocketApp(url,
                                               on_open=self.on_open,
@@ -18,10 +21,11 @@ class WsClient:
                                               on_close=self.on_close,
                                               on_error=self.on_error)
         self.ws = None
-        self.__audio_queue: queue.Queue[bytes] = queue.Queue(maxsize=500)
+        # not bounded, so the control messages always fit, `send` bounds the audio
+        self.__audio_queue: queue.Queue[bytes] = queue.Queue()
         self.__text_method = text_method
         self.__event_method = event_method
-        self.hyps = []
+        self.__transcript = Transcript(nbest=nbest)
         self.failed = False
 
         def start_conn():
@@ -36,21 +40,9 @@ class WsClient:
         if len(msg) > 200:
             msg = msg[:200]
         logger.debug("got from kaldi message: %s " % msg)
-        if response['status'] == 0:
-            if 'result' in response:
-                trans = response['result']['hypotheses'][0]['transcript']
-                if response['result']['final']:
-                    self.hyps.append(trans)
-                else:
-                    txt = self.get_text(trans)
-                    if txt:
-                        self.__text_method(False, txt)
-            if 'adaptation_state' in response:
-                logger.debug("got adaptation, do nothing")
-        else:
-            logger.error("Received error from server (status %d)" % response['status'])
-            if 'message' in response:
-                logger.error("Error message:", response['message'])
+        txt = self.__transcript.add(response)
+        if txt:
+            self.__text_method(False, txt)
 
     def on_error(self, ws, err):
         logger.error("Kaldi ws conn error:", err)
@@ -79,9 +71,9 @@ class WsClient:
         self.__audio_queue.put(None)
         if not self.failed:
             self.__event_method("stopped")
-        txt = self.get_text("")
+        txt = self.__transcript.text()
         if txt:
-            self.__text_method(True, txt)
+            self.__text_method(True, txt, self.__transcript.alternatives())
 
     def close(self):
         logger.info("closing")
@@ -89,29 +81,28 @@ class WsClient:
         self.__audio_queue.put(None)
 
     def send(self, data):
+        """
+            does not block the socket handler calling it, drops the audio the server does not keep up with. The control
+            messages, as "EOS", are always queued
+            """
         logger.debug("put data to kaldi queue")
+        if isinstance(data, bytes) and self.__audio_queue.qsize() >= MAX_AUDIO_QUEUE:
+            logger.warning("Kaldi audio queue is full, dropped %d bytes" % len(data))
+            return
         self.__audio_queue.put(data)
 
-    def get_text(self, trans):
-        res = " ".join(self.hyps).strip() + " " + trans
-        return res.strip()
-
-
-def get_url(url):
-    content_type = "audio/x-raw, layout=(string)interleaved, rate=(int)%d, format=(string)S16LE, channels=(int)1" % 16000
-    return url + '?%s' % urlencode([("content-type", content_type)])
-
 
 class Kaldi:
-    def __init__(self, url, msg_func):
+    def __init__(self, url, msg_func, nbest: int = 1):
+        """:param nbest: hypotheses of the final text to pass, the server decoder must be configured to return them"""
         logger.info("Init Kaldi wrapper")
-        self.__audio_queue: queue.Queue[bytes] = queue.Queue(maxsize=500)
         self.__txt_queue: queue.Queue[tuple(bool, str)] = queue.Queue(maxsize=500)
 
         self.recognized_value = ""
         self.working = False
         self.last_gen_type = 0
         self.msg_func = msg_func
+        self.nbest = nbest
         self.next = None
         self.client = None
         self.cl_lock = threading.Lock()
@@ -120,20 +111,28 @@ class Kaldi:
         self.url = f_url
 
     def add(self, data: bytes):
+        """passes the audio straight to the connection of the utterance"""
         logger.debug("add play data of len %d" % len(data))
-        self.__audio_queue.put(data)
+        with self.cl_lock:
+            if self.client is None:
+                logger.debug("no kaldi connection, dropped audio")
+                return
+            self.client.send(data)
 
     def event(self, data: str):
+        """does not block, the new connection is opened and the old one closed on their own threads"""
         if data == "AUDIO_START":
             self.last_gen_type = 0
             self.recognized_value = ""
             self.working = True
             with self.cl_lock:
                 if self.client is not None:
-                    self.client.close()
+                    # closing waits for the connection, the event comes on the thread shared by the sessions
+                    threading.Thread(target=self.client.close, daemon=True, name="kaldi-close").start()
+                    self.client = None
                 try:
                     self.client = WsClient(url=self.url, text_method=self.__process_kaldi_msg,
-                                           event_method=self.__process_events)
+                                           event_method=self.__process_events, nbest=self.nbest)
                 except BaseException as err:
                     logger.error(err)
         elif data == "AUDIO_STOP":
@@ -143,47 +142,34 @@ class Kaldi:
                     self.client.send("EOS")
 
     def start(self):
-        th = threading.Thread(target=self.__recognized, daemon=True)
-        th.start()
-        while True:
-            data = self.__audio_queue.get()
-            if data is None:
-                break
-            self.__process(data)
-        th.join()
-        logger.debug("Exit kaldi recognizer")
-
-    def __recognized(self):
         while True:
             data = self.__txt_queue.get()
             if data is None:
                 break
             self.__process_recognized(data)
+        logger.debug("Exit kaldi recognizer")
 
-    def __process(self, data: bytes):
-        self.client.send(data)
-
-    def __process_kaldi_msg(self, final, txt):
-        self.__txt_queue.put((final, txt))
+    def __process_kaldi_msg(self, final, txt, alternatives=None):
+        self.__txt_queue.put((final, txt, alternatives))
 
     def __process_events(self, event):
         self.msg_func(Data(in_type=DataType.EVENT, who=Sender.RECOGNIZER, data=event))
 
     def __process_recognized(self, data):
         try:
-            final, txt = data
+            final, txt, alternatives = data
             logger.debug("Got from kaldi(%s) %s" % (final, txt))
             if final:
                 self.msg_func(Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data=""))
-                self.msg_func(Data(in_type=DataType.TEXT_RESULT, who=Sender.RECOGNIZER, data=txt))
+                self.msg_func(Data(in_type=DataType.TEXT_RESULT, who=Sender.RECOGNIZER, data=txt,
+                                   internal=alternatives))
             else:
-                self.msg_func(Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data=txt + "..."))
+                self.msg_func(Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data=txt + "...", internal=txt))
         except BaseException as err:
             logger.error(err)
 
     def stop(self):
         logger.debug("stopping kaldi ...")
-        self.__audio_queue.put(None)
         self.__txt_queue.put(None)
         with self.cl_lock:
             if self.client is not None:
@@ -0,0 +1,96 @@
+import asyncio
+import json
+
+import aiohttp
+
+from sage.api.data import Data, DataType, Sender
+from sage.asr.protocol import Transcript, get_url
+from sage.logger import logger
+
+
+class AsyncKaldi:
+    """
+        Kaldi recognizer client of the asyncio runner: a websocket connection per utterance on the event loop of the
+        runner, no threads. Sends the same messages as `Kaldi`
+        """
+
+    def __init__(self, url, msg_func, nbest: int = 1):
+        logger.info("Init async Kaldi wrapper")
+        self.url = get_url(url)
+        logger.info("WS URL: %s" % self.url)
+        self.msg_func = msg_func
+        self.nbest = nbest
+        self.__session = None
+        self.__ws = None
+        self.__reader = None
+
+    async def event(self, data: str):
+        if data == "AUDIO_START":
+            await self.__close()
+            if self.__session is None:
+                self.__session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, connect=15))
+            try:
+                self.__ws = await self.__session.ws_connect(self.url)
+            except BaseException as err:
+                logger.error("Kaldi ws conn error: %s" % err)
+                self.__event("failed")
+                return
+            logger.info("connected to kaldi ws")
+            self.__event("listen")
+            self.__reader = asyncio.create_task(self.__read(self.__ws, Transcript(nbest=self.nbest)))
+        elif data == "AUDIO_STOP":
+            if self.__ws is not None and not self.__ws.closed:
+                await self.__ws.send_str("EOS")
+
+    async def add(self, data: bytes):
+        if self.__ws is not None and not self.__ws.closed:
+            await self.__ws.send_bytes(data)
+
+    async def __read(self, ws, transcript: Transcript):
+        failed = False
+        async for msg in ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                self.__on_message(msg.data, transcript)
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                logger.error("Kaldi ws conn error: %s" % ws.exception())
+                self.__event("failed")
+                failed = True
+                break
+        logger.debug("closed ws kaldi connection")
+        if not failed:
+            self.__event("stopped")
+        txt = transcript.text()
+        if txt:
+            self.msg_func(Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data=""))
+            self.msg_func(Data(in_type=DataType.TEXT_RESULT, who=Sender.RECOGNIZER, data=txt,
+                               internal=transcript.alternatives()))
+
+    def __on_message(self, data: str, transcript: Transcript):
+        """a malformed message is logged and skipped, the reader goes on"""
+        logger.debug("got from kaldi message: %s " % data[:200])
+        try:
+            txt = transcript.add(json.loads(data))
+            if txt:
+                self.msg_func(Data(in_type=DataType.TEXT, who=Sender.RECOGNIZER, data=txt + "...", internal=txt))
+        except Exception as err:
+            logger.error("Bad kaldi message %s: %s: %s" % (data[:200], type(err).__name__, err))
+
+    def __event(self, event: str):
+        self.msg_func(Data(in_type=DataType.EVENT, who=Sender.RECOGNIZER, data=event))
+
+    async def __close(self):
+        if self.__ws is not None:
+            await self.__ws.close()
+            self.__ws = None
+        if self.__reader is not None:
+            reader, self.__reader = self.__reader, None
+            try:
+                await reader
+            except Exception as err:
+                logger.error("Kaldi reader failed: %s: %s" % (type(err).__name__, err))
+
+    async def stop(self):
+        logger.debug("stopping kaldi ...")
+        await self.__close()
+        if self.__session is not None:
+            await self.__session.close()
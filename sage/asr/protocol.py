@@ -0,0 +1,57 @@
+from typing import List, Optional
+from urllib.parse import urlencode
+
+from sage.logger import logger
+
+
+def get_url(url):
+    content_type = "audio/x-raw, layout=(string)interleaved, rate=(int)%d, format=(string)S16LE, channels=(int)1" % 16000
+    return url + '?%s' % urlencode([("content-type", content_type)])
+
+
+def nbest_texts(segments: List[List[str]], n: int) -> List[str]:
+    """
+        :param segments: ranked transcripts of the final segments
+        :return: up to `n` texts of the utterance, the top one first, the others differ from it in one segment
+        """
+    top = [s[0] for s in segments]
+    res = [" ".join(top).strip()]
+    for rank in range(1, n):
+        for i in reversed(range(len(segments))):
+            if rank < len(segments[i]):
+                res.append(" ".join(top[:i] + [segments[i][rank]] + top[i + 1:]).strip())
+    return list(dict.fromkeys(t for t in res if t))[:n]
+
+
+class Transcript:
+    """Collects the responses of the Kaldi server for an utterance"""
+
+    def __init__(self, nbest: int = 1):
+        self.nbest = nbest
+        # ranked transcripts of every final segment
+        self.hyps: List[List[str]] = []
+
+    def add(self, response: dict) -> Optional[str]:
+        """:return: the text with the partial hypothesis to show or None"""
+        if response['status'] != 0:
+            logger.error("Received error from server (status %d)" % response['status'])
+            if 'message' in response:
+                logger.error("Error message: %s" % response['message'])
+            return None
+        if 'adaptation_state' in response:
+            logger.debug("got adaptation, do nothing")
+        if 'result' not in response:
+            return None
+        alternatives = [h['transcript'] for h in response['result']['hypotheses'][:self.nbest]]
+        if response['result']['final']:
+            self.hyps.append(alternatives)
+            return None
+        return self.text(alternatives[0]) or None
+
+    def text(self, trans: str = "") -> str:
+        res = " ".join(h[0] for h in self.hyps).strip() + " " + trans
+        return res.strip()
+
+    def alternatives(self) -> List[str]:
+        """:return: the ranked texts of the utterance"""
+        return nbest_texts(self.hyps, self.nbest)
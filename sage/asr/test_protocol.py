@@ -0,0 +1,34 @@
+from sage.asr.protocol import Transcript, get_url, nbest_texts
+
+
+def test_get_url():
+    assert get_url("ws://k/speech").startswith("ws://k/speech?content-type=audio%2Fx-raw")
+
+
+def test_nbest_texts():
+    assert nbest_texts([["a b"], ["c", "d"]], 3) == ["a b c", "a b d"]
+    assert nbest_texts([["a", "e"], ["c", "d"]], 3) == ["a c", "a d", "e c"]
+    assert nbest_texts([["a", "e"], ["c", "d"]], 1) == ["a c"]
+    assert nbest_texts([], 2) == []
+
+
+def response(final, *hyps, status=0):
+    return {"status": status, "result": {"final": final, "hypotheses": [{"transcript": h} for h in hyps]}}
+
+
+def test_transcript():
+    tr = Transcript(nbest=2)
+    assert tr.add(response(False, "one")) == "one"
+    assert tr.add(response(True, "one plus", "one minus", "won plus")) is None
+    assert tr.add(response(False, "two")) == "one plus two"
+    assert tr.add(response(True, "two", "too")) is None
+    assert tr.text() == "one plus two"
+    assert tr.alternatives() == ["one plus two", "one plus too"]
+
+
+def test_transcript_error():
+    tr = Transcript()
+    assert tr.add({"status": 1, "message": "fail"}) is None
+    assert tr.add({"status": 0, "adaptation_state": {}}) is None
+    assert tr.text() == ""
+    assert tr.alternatives() == []
@@ -0,0 +1,248 @@
+import asyncio
+import inspect
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sage.api.data import Data, DataType, Sender
+from sage.inout.worker import AsyncOutputWorker, BLOCK
+from sage.latency import latencies
+from sage.logger import logger
+from sage.supersede import Generations, is_speech
+
+# input lanes, the lower first
+PRIORITY_CONTROL = 0
+PRIORITY_TEXT = 1
+PRIORITY_STOP = 2
+
+
+def new_event_loop() -> asyncio.AbstractEventLoop:
+    """:return: uvloop loop if it is installed"""
+    try:
+        import uvloop
+    except ImportError:
+        logger.info("No uvloop, using asyncio loop")
+        return asyncio.new_event_loop()
+    return uvloop.new_event_loop()
+
+
+async def maybe_await(res):
+    if inspect.isawaitable(res):
+        return await res
+    return res
+
+
+class AsyncRunner:
+    """
+        `Runner` on one event loop: the input dispatch, the output fan-out and the async recognizer and output
+        processors run on the loop without the thread handoffs. The bot runs on its own single thread executor, so
+        its work keeps the order of the inputs and does not block the audio. The plain output processors run in the
+        default executor. The audio and the events go to the recognizer in their own lane, the events go to the bot
+        ahead of the queued texts
+        """
+
+    def __init__(self, bot, audio_rec, generations: Generations = None):
+        """:param audio_rec: recognizer, `add` and `event` may be coroutines"""
+        logger.info("Init async runner")
+        self.__bot = bot
+        self.__audio_rec = audio_rec
+        self.__generations = generations if generations is not None else Generations()
+        self.__workers = []
+        self.__bot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot")
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        # (priority, seq, time, data)
+        self.__inputs: Optional[asyncio.PriorityQueue] = None
+        self.__seq = itertools.count()
+        # (time, "audio" or "event", data) of the recognizer, in order
+        self.__rec_inputs: Optional[asyncio.Queue] = None
+        self.__latency = latencies("audio", "control", "input")
+        # (generation, data), the output fan-out applies the queue policies of the processors
+        self.__outputs: Optional[asyncio.Queue] = None
+        self.__latest_text = None
+        # a burst of partial hypotheses is parsed ahead only from the latest one
+        self.__latest_partial = None
+        self.__pending = []
+
+    async def run(self):
+        self.__loop = asyncio.get_running_loop()
+        self.__inputs = asyncio.PriorityQueue()
+        self.__rec_inputs = asyncio.Queue()
+        self.__outputs = asyncio.Queue()
+        for item in self.__pending:
+            self.__put(*item)
+        self.__pending = []
+        self.add_output_processor(self.resend_recognized)
+        for w in self.__workers:
+            w.start()
+        fan_out = asyncio.create_task(self.__fan_out())
+        recognize = asyncio.create_task(self.__recognize())
+        while True:
+            _, _, t, inp = await self.__inputs.get()
+            if inp is None:
+                break
+            self.__latency["control" if inp.type == DataType.EVENT else "input"].add(time.monotonic() - t)
+            self.__dispatch(inp)
+        await recognize
+        await fan_out
+        self.__bot_executor.shutdown(wait=True)
+        logger.info("Exit run loop, latency %s" % self.latency_stats())
+
+    def __dispatch(self, inp: Data):
+        if inp.type == DataType.TEXT:
+            self.__in_bot(self.__process_text, inp)
+        elif inp.type == DataType.TEXT_PARTIAL:
+            self.__in_bot(self.__process_partial, inp)
+        elif inp.type == DataType.EVENT:
+            logger.debug("got event %s" % inp.data)
+            self.__in_bot(self.__bot.process_event, inp)
+        else:
+            logger.warning("Don't know what to do with %s - %s" % (inp.type, inp.data))
+
+    async def __recognize(self):
+        """passes the audio and the events to the recognizer in order, an event may wait for its connection"""
+        while True:
+            item = await self.__rec_inputs.get()
+            if item is None:
+                break
+            t, kind, data = item
+            if kind == "event":
+                await maybe_await(self.__audio_rec.event(data))
+            else:
+                await maybe_await(self.__audio_rec.add(data))
+                self.__latency["audio"].add(time.monotonic() - t)
+
+    def __in_bot(self, func, *args):
+        fut = self.__loop.run_in_executor(self.__bot_executor, func, *args)
+        fut.add_done_callback(self.__log_failure)
+
+    @staticmethod
+    def __log_failure(fut: asyncio.Future):
+        if not fut.cancelled() and fut.exception() is not None:
+            logger.error("Bot failed: %s" % fut.exception())
+
+    def __process_text(self, inp: Data):
+        if inp.id != self.__latest_text:
+            # a newer text is queued
+            self.__generations.drop("queued")
+            return
+        self.__bot.process(inp.data, alternatives=inp.internal)
+
+    def __process_partial(self, inp: Data):
+        if inp.id != self.__latest_partial:
+            # a newer partial or the final text is queued
+            self.__generations.drop("partial")
+            return
+        self.__bot.process_partial(inp.data)
+
+    async def __fan_out(self):
+        while True:
+            item = await self.__outputs.get()
+            if item is None:
+                break
+            for w in self.__workers:
+                await w.put(item)
+        for w in self.__workers:
+            await w.stop()
+
+    def add_output_processor(self, proc, max_size: int = 500, overflow: str = BLOCK, speech: bool = False):
+        """`proc` may be a coroutine, see `Runner.add_output_processor`"""
+        name = getattr(proc, "__qualname__", str(proc))
+
+        def fresh(item) -> bool:
+            return not speech or self.__fresh(name, item)
+
+        if asyncio.iscoroutinefunction(proc):
+            async def output(item):
+                if fresh(item):
+                    await proc(item[1])
+        else:
+            def output(item):
+                if fresh(item):
+                    proc(item[1])
+        self.__workers.append(AsyncOutputWorker(name, output, max_size=max_size, overflow=overflow))
+
+    def __fresh(self, name: str, item) -> bool:
+        gen, d = item
+        if is_speech(d) and not self.__generations.is_current(gen):
+            # the answer to an older text is not spoken after the user has said a newer one
+            self.__generations.drop("speech %s" % name)
+            return False
+        return True
+
+    def output_stats(self) -> dict:
+        return {w.name: w.stats() for w in self.__workers}
+
+    def stats(self) -> dict:
+        """:return: the stats to report"""
+        return {"outputs": self.output_stats(), "dropped": self.__generations.dropped(),
+                "latency": self.latency_stats()}
+
+    def add_input(self, d: Data):
+        """may be called from any thread"""
+        if d.type == DataType.AUDIO:
+            self.add_audio(d.data)
+            return
+        if d.type == DataType.EVENT:
+            self.__call(self.__put, "rec", (time.monotonic(), "event", d.data))
+            self.__call(self.__put, "in", (PRIORITY_CONTROL, next(self.__seq), time.monotonic(), d))
+            return
+        if d.type == DataType.TEXT:
+            self.__latest_text = d.id
+            self.__latest_partial = None
+            self.__generations.next()
+        elif d.type == DataType.TEXT_PARTIAL:
+            self.__latest_partial = d.id
+        self.__call(self.__put, "in", (PRIORITY_TEXT, next(self.__seq), time.monotonic(), d))
+
+    def add_audio(self, data: bytes):
+        """may be called from any thread, the audio goes to the recognizer lane, not behind the texts"""
+        self.__call(self.__put, "rec", (time.monotonic(), "audio", data))
+
+    def latency_stats(self) -> dict:
+        """:return: the waits of the audio, the events and the texts in the lanes"""
+        return {lane: latency.stats() for lane, latency in self.__latency.items()}
+
+    def add_output(self, d: Data):
+        """may be called from any thread"""
+        self.__call(self.__put, "out", (self.__generations.current(), d))
+
+    def stop(self):
+        """may be called from any thread"""
+        self.__call(self.__put, "in", (PRIORITY_STOP, next(self.__seq), time.monotonic(), None))
+        self.__call(self.__put, "rec", None)
+        self.__call(self.__put, "out", None)
+
+    def __call(self, func, *args):
+        if self.__loop is None:
+            # before `run`
+            self.__pending.append(args)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.__loop:
+            func(*args)
+        else:
+            self.__loop.call_soon_threadsafe(func, *args)
+
+    def __put(self, where: str, item):
+        if where == "in":
+            self.__inputs.put_nowait(item)
+        elif where == "rec":
+            self.__rec_inputs.put_nowait(item)
+        else:
+            self.__outputs.put_nowait(item)
+
+    async def resend_recognized(self, d: Data):
+        if d.type == DataType.TEXT_RESULT and d.who == Sender.RECOGNIZER:
+            logger.debug("resend recognized text as user input")
+            # internal - ranked hypotheses of the recognizer
+            self.add_input(Data(in_type=DataType.TEXT, who=Sender.USER, data=d.data, internal=d.internal))
+        if d.type == DataType.TEXT and d.who == Sender.RECOGNIZER and d.internal:
+            # partial hypothesis, the bot parses it ahead
+            self.add_input(Data(in_type=DataType.TEXT_PARTIAL, who=Sender.RECOGNIZER, data=d.internal))
+        if d.type == DataType.EVENT and d.who == Sender.RECOGNIZER:
+            logger.debug("resend recognizer events")
+            self.add_input(Data(in_type=DataType.EVENT, who=Sender.RECOGNIZER, data=d.data))
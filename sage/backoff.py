@@ -0,0 +1,31 @@
+import time
+from typing import Callable, Optional
+
+
+class Backoff:
+    """Delays of the retries of a failing start, doubled after every failure up to `max_delay`"""
+
+    def __init__(self, delay: float, max_delay: float, clock: Callable[[], float] = time.monotonic):
+        self.delay = delay
+        self.max_delay = max_delay
+        self.error: Optional[BaseException] = None
+        # failures since the last success
+        self.failures = 0
+        self.__clock = clock
+        self.__next = delay
+        self.__at = 0.0
+
+    def failed(self, err: BaseException):
+        self.error = err
+        self.failures += 1
+        self.__at = self.__clock() + self.__next
+        self.__next = min(self.__next * 2, self.max_delay)
+
+    def succeeded(self):
+        self.error = None
+        self.failures = 0
+        self.__next = self.delay
+
+    def wait(self) -> float:
+        """:return: seconds to the next try"""
+        return max(0.0, self.__at - self.__clock())
@@ -1,9 +1,36 @@
+import math
 import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Tuple
 
 from sage.api.data import Data, DataType, Sender
+from sage.cache import ResultCache
+from sage.cfg.budget import TooComplex
 from sage.cfg.grammar import UnknownWord
-from sage.cfg.parser import UnknownLeave
+from sage.cfg.parser import UnknownLeave, EvaluationLimit
+from sage.cfg.pool import CalculatorPool, Calculation
 from sage.logger import logger
+from sage.nbest import NBestChooser, candidates, settle
+from sage.supersede import Generations, Superseded
+
+# answers when the text is too long to parse or the expression too long to calculate
+limit_messages = {TooComplex: "Per sudėtinga išraiška", EvaluationLimit: "Per ilgai skaičiuoju"}
+
+
+def error_message(err: BaseException) -> str:
+    """:return: the answer to the failed calculation"""
+    if isinstance(err, UnknownLeave):
+        return "Nežinau žodžio '%s'" % err.string
+    if isinstance(err, UnknownWord):
+        if err.word == "<unk>":
+            return "Pasakėte kažkokį nežinomą žodį"
+        return "Nežinau ką daryti su žodžiu '%s'" % err.word
+    if isinstance(err, (TooComplex, EvaluationLimit)):
+        return limit_messages[type(err)]
+    if isinstance(err, ZeroDivisionError):
+        return "Negaliu dalinti iš nulio"
+    return "Deja, kažkokia klaida!"
 
 
 def round_number(num):
@@ -14,6 +41,10 @@ def round_number(num):
             - indicator if the output needs to be converted to text
         """
     value = float(num)
+    if math.isnan(value):
+        return "neapibrėžtas skaičius", False
+    if math.isinf(value):
+        return "labai didelis skaičius" if value > 0 else "labai didelis neigiamas skaičius", False
     if value == round(value):
         if value > 1000000000:
             return "labai didelis skaičius", False
@@ -34,64 +65,147 @@ def round_number(num):
     return truncate(value), True
 
 
+class Answer(NamedTuple):
+    """calculated answer to a text, the cached value"""
+    result: str
+    latex: str
+    svg: str
+    spoken: str
+
+
+def cache_key(txt: str) -> Tuple[str, ...]:
+    return tuple(txt.split())
+
+
 class CalculatorBot:
-    def __init__(self, cfg, parser, eq_maker, eq_parser, out_func, number_to_text_changer,
-                 greet_on_connect: bool = True):
-        self.__eq_parser = eq_parser
+    def __init__(self, cfg, evaluator, eq_maker, out_func, number_to_text_changer,
+                 greet_on_connect: bool = True, pool: CalculatorPool = None, cache: ResultCache = None,
+                 nbest: int = 1, nbest_deadline: float = 2.0, generations: Generations = None,
+                 answers: Executor = None):
+        """
+            :param pool: calculates the texts in worker processes, the answer is sent when the result comes back.
+                `cfg` and `evaluator` calculate inline on the caller's thread if None
+            :param cache: answers of the repeated texts, skips the parse, the evaluation and the latex and
+                number to text calls
+            :param nbest: recognizer hypotheses to try, the highest ranked one with a complete expression is answered
+            :param nbest_deadline: seconds to wait for the better ranked hypotheses
+            :param generations: utterance numbering shared with the runner, the work of an utterance is dropped when
+                a newer one arrives
+            :param answers: runs the answers to the results of the pool, not to hold up the pool thread with the latex
+                and number to text calls. A thread of the bot if None
+            """
         self.__cfg = cfg
+        self.__pool = pool
+        if pool is not None and answers is None:
+            answers = ThreadPoolExecutor(max_workers=1, thread_name_prefix="answer")
+        self.__answers = answers
+        self.__cache = cache
         self.__out_func = out_func
-        self.__parser = parser
+        self.__evaluator = evaluator
         self.__eq_maker = eq_maker
         self.__status_timer = None
         self.__timer_lock = threading.Lock()
         self.__greet_on_connect = greet_on_connect
         self.__number_to_text_changer = number_to_text_changer
+        self.__nbest = nbest
+        self.__nbest_deadline = nbest_deadline
+        self.__generations = generations if generations is not None else Generations()
+        # partial hypotheses of the recognizer are parsed ahead in the session
+        self.__session = cfg.new_session() if pool is None else None
+        if self.__session is None:
+            # the session keeps the chart of the int engine in this process
+            logger.info("Partial hypotheses are not parsed ahead: needs the int engine without the calculator pool")
         logger.info("Init CalculateBot")
 
-    def process(self, txt: str):
+    def process(self, txt: str, alternatives: List[str] = None):
+        """:param alternatives: ranked hypotheses of the recognizer, the first is `txt`"""
         logger.debug("got %s " % txt)
+        gen = self.__generations.next()
         self.__send_status("thinking")
         # resend input to user
         self.__out_func(Data(in_type=DataType.TEXT, data=txt, who=Sender.USER))
+        key = cache_key(txt)
+        if self.__cache is not None:
+            answer = self.__cache.get(key)
+            logger.debug("cache %s" % self.__cache.stats())
+            if answer is not None:
+                self.__say(answer)
+                self.__send_status("waiting")
+                return
+        texts = candidates(txt, alternatives, self.__nbest)
+
+        def answer(rank: int, calculation: Callable[[], Calculation]):
+            # the answer of a lower ranked hypothesis is not cached for the text, it may parse the next time
+            self.__answer(calculation, cache_key(texts[rank]), gen)
+
+        if self.__pool is not None:
+            chooser = NBestChooser(len(texts), lambda r, c: self.__answers.submit(answer, r, c),
+                                   deadline=self.__nbest_deadline)
+            for rank, t in enumerate(texts):
+                fut = self.__pool.submit(t)
+                self.__generations.on_next(fut.cancel)
+                fut.add_done_callback(lambda f, r=rank: chooser.set(r, settle(f.result)))
+            return
+        # inline the hypotheses are tried one by one until the deadline or a newer utterance
+        chooser = NBestChooser(len(texts), answer)
+        start = time.monotonic()
+        for rank, t in enumerate(texts):
+            if chooser.decided() or time.monotonic() - start > self.__nbest_deadline or \
+                    not self.__generations.is_current(gen):
+                break
+            chooser.set(rank, settle(lambda: self.__calculate(t)))
+        chooser.expire()
+
+    def __calculate(self, txt: str) -> Calculation:
+        tree, ok = self.__cfg.parse(txt, session=self.__session)
+        if not ok or tree is None:
+            return ok, None
+        return True, self.__evaluator.evaluate(tree)
+
+    def __answer(self, calculation: Callable[[], Calculation], key: Tuple[str, ...], gen: int):
         try:
-            tree, ok = self.__cfg.parse(txt)
+            # a cancelled calculation of the pool is always superseded
+            self.__generations.check(gen, "calculate")
+            ok, value = calculation()
             if not ok:
-                self.__send_status("saying")
-                self.__out_func(Data(in_type=DataType.TEXT, data="Nesuprantu"))
-            elif tree is None:
-                self.__send_status("saying")
-                self.__out_func(Data(in_type=DataType.TEXT, data="Pabaikite išraišką"))
-            else:
-                res = self.__parser.parse(tree)
-                eq_res = self.__eq_parser.parse(tree)
-                eq_svg = self.__eq_maker.prepare(eq_res)
-                self.__send_status("saying")
-                self.__out_func(Data(in_type=DataType.SVG, data=eq_svg, who=Sender.BOT, data2=res))
-                self.__out_func(Data(in_type=DataType.TEXT_RESULT, data=self.number_as_text(res), who=Sender.BOT))
-        except UnknownLeave as err:
-            logger.error(err)
-            self.__send_status("saying")
-            self.__out_func(Data(in_type=DataType.TEXT, data="Nežinau žodžio '%s'" % err.string, who=Sender.BOT))
-        except UnknownWord as err:
-            logger.error(err)
-            if err.word == "<unk>":
-                self.__send_status("saying")
-                self.__out_func(
-                    Data(in_type=DataType.TEXT, data="Pasakėte kažkokį nežinomą žodį", who=Sender.BOT))
+                self.__say_text("Nesuprantu")
+            elif value is None:
+                self.__say_text("Pabaikite išraišką")
             else:
-                self.__send_status("saying")
-                self.__out_func(
-                    Data(in_type=DataType.TEXT, data="Nežinau ką daryti su žodžiu '%s'" % err.word, who=Sender.BOT))
-        except ZeroDivisionError as err:
-            logger.error(err)
-            self.__send_status("saying")
-            self.__out_func(Data(in_type=DataType.TEXT, data="Negaliu dalinti iš nulio", who=Sender.BOT))
+                answer = self.__make_answer(value, key, gen)
+                self.__generations.check(gen, "answer")
+                self.__say(answer)
+        except Superseded as err:
+            logger.debug(err)
+            return
         except BaseException as err:
             logger.error(err)
-            self.__send_status("saying")
-            self.__out_func(Data(in_type=DataType.TEXT, data="Deja, kažkokia klaida!", who=Sender.BOT))
+            self.__say_text(error_message(err))
         self.__send_status("waiting")
 
+    def __make_answer(self, value: Tuple[str, str], key: Tuple[str, ...], gen: int) -> Answer:
+        res, eq_res = value
+        svg = self.__eq_maker.prepare(eq_res)
+        self.__generations.check(gen, "render")
+        answer = Answer(result=res, latex=eq_res, svg=svg, spoken=self.number_as_text(res))
+        if self.__cache is not None:
+            self.__cache.put(key, answer)
+        return answer
+
+    def __say_text(self, txt: str):
+        self.__send_status("saying")
+        self.__out_func(Data(in_type=DataType.TEXT, data=txt, who=Sender.BOT))
+
+    def __say(self, answer: Answer):
+        self.__send_status("saying")
+        self.__out_func(Data(in_type=DataType.SVG, data=answer.svg, who=Sender.BOT, data2=answer.result))
+        self.__out_func(Data(in_type=DataType.TEXT_RESULT, data=answer.spoken, who=Sender.BOT))
+
+    def process_partial(self, txt: str):
+        logger.debug("got partial %s " % txt)
+        if self.__session is not None:
+            self.__cfg.feed(txt, self.__session)
+
     def process_event(self, inp: Data):
         logger.debug("bot got event %s" % inp.data)
         if inp.type == DataType.EVENT:
@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from sage.logger import logger
+
+
+class ResultCache:
+    """
+        Bounded LRU cache with the entries expiring after `ttl` seconds, keeps the hit and miss counters.
+        Thread safe - the answers of the calculator pool are put from its threads
+        """
+
+    def __init__(self, max_size: int = 1000, ttl: float = 3600.0, clock: Callable[[], float] = time.monotonic):
+        logger.info("Init result cache, size %d, ttl %.0fs" % (max_size, ttl))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.__clock = clock
+        self.__data: OrderedDict = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self.__lock:
+            item = self.__data.get(key)
+            if item is not None and item[0] < self.__clock():
+                del self.__data[key]
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self.__data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: Hashable, value: Any):
+        if self.max_size <= 0:
+            return
+        with self.__lock:
+            self.__data[key] = (self.__clock() + self.ttl, value)
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.max_size:
+                self.__data.popitem(last=False)
+
+    def __len__(self):
+        with self.__lock:
+            return len(self.__data)
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return {"size": len(self.__data), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,63 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from sage.logger import logger
+
+# the file holds two pickles: the header {"version", "hash"} of plain types, then the data
+ARTIFACT_VERSION = 6
+
+
+def file_hash(file: str) -> str:
+    with open(file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def save_artifact(data: dict, cfg_file: str, out_file: str):
+    """
+        saves precalculated grammar data bound to the hash of the source .cfg file. Writes a temp file and replaces
+        `out_file` with it, so a failed write does not leave a truncated artifact
+        """
+    header = {"version": ARTIFACT_VERSION, "hash": file_hash(cfg_file)}
+    fd, tmp = tempfile.mkstemp(prefix=os.path.basename(out_file) + ".", suffix=".tmp",
+                               dir=os.path.dirname(os.path.abspath(out_file)))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # mkstemp makes the file readable by the owner only
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, out_file)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def load_artifact(file: str, cfg_file: str) -> dict | None:
+    """
+        loads the grammar data saved by `save_artifact`, the header is checked before the data is unpickled
+        :return: data or None if the artifact is missing, broken, of other version or made from other .cfg file
+        """
+    try:
+        with open(file, "rb") as f:
+            header = pickle.load(f)
+            if not isinstance(header, dict):
+                logger.warning("Grammar artifact %s has no header" % file)
+                return None
+            if header.get("version") != ARTIFACT_VERSION:
+                logger.warning("Grammar artifact %s version %s, expected %d" %
+                               (file, header.get("version"), ARTIFACT_VERSION))
+                return None
+            if header.get("hash") != file_hash(cfg_file):
+                logger.warning("Grammar artifact %s is outdated, %s has changed" % (file, cfg_file))
+                return None
+            res = pickle.load(f)
+    except FileNotFoundError:
+        logger.warning("No grammar artifact %s" % file)
+        return None
+    except Exception as err:
+        logger.warning("Broken grammar artifact %s: %s: %s" % (file, type(err).__name__, err))
+        return None
+    logger.info("Loaded grammar artifact %s" % file)
+    return res
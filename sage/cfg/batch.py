@@ -0,0 +1,148 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from typing import List, Dict, Any, Iterable
+
+from sage.cfg.budget import TooComplex, ParseBudget
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import Calculator, UnknownWord
+from sage.cfg.parser import UnknownLeave, EvaluationLimit
+from sage.logger import logger
+
+OK = "ok"
+NOT_UNDERSTOOD = "not_understood"
+NO_PARSE = "no_parse"
+UNKNOWN_WORD = "unknown_word"
+UNKNOWN_LEAVE = "unknown_leave"
+TOO_COMPLEX = "too_complex"
+ERROR = "error"
+
+# worker state, initialized once per process by `init_worker`
+_worker = None
+
+
+class Worker:
+    def __init__(self, grammar: str, compiled_file: str, engine: str, budget: ParseBudget = None):
+        self.cfg = Calculator(file=grammar, compiled_file=compiled_file, engine=engine, budget=budget)
+        self.evaluator = Evaluator(leaves_map=self.cfg.leaves_map())
+
+    def process(self, item) -> Dict[str, Any]:
+        """:return: result of the utterance `(index, text)` the same way `CalculatorBot.process` calculates it"""
+        i, txt = item
+        res = {"i": i, "text": txt, "status": OK}
+        start = time.perf_counter()
+        try:
+            tree, ok = self.cfg.parse(txt)
+            if not ok:
+                res["status"] = NOT_UNDERSTOOD
+            elif tree is None:
+                res["status"] = NO_PARSE
+            else:
+                res["result"], res["eq"] = self.evaluator.evaluate(tree)
+        except UnknownWord as err:
+            res["status"], res["error"] = UNKNOWN_WORD, err.word
+        except UnknownLeave as err:
+            res["status"], res["error"] = UNKNOWN_LEAVE, err.string
+        except (TooComplex, EvaluationLimit) as err:
+            res["status"], res["error"] = TOO_COMPLEX, err.message
+        except BaseException as err:
+            res["status"], res["error"] = ERROR, "%s: %s" % (type(err).__name__, err)
+        res["took"] = time.perf_counter() - start
+        return res
+
+
+def init_worker(grammar: str, compiled_file: str, engine: str):
+    global _worker
+    # a pathological line fails with `TOO_COMPLEX` instead of stalling its worker
+    _worker = Worker(grammar, compiled_file, engine, ParseBudget())
+
+
+def process(item) -> Dict[str, Any]:
+    return _worker.process(item)
+
+
+def read_utterances(file: str, field: str) -> List[str]:
+    """reads a text per line, or `field` of every json line if the file is `.jsonl`"""
+    res = []
+    with open(file, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if file.endswith(".jsonl"):
+                line = json.loads(line)[field]
+            res.append(line)
+    return res
+
+
+def percentile(values: List[float], p: float) -> float:
+    """nearest rank percentile, `p` in 0..100"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, math.ceil(p / 100 * len(values)) - 1))
+    return values[k]
+
+
+def run_batch(texts: List[str], workers: int, init_args, chunksize: int) -> Iterable[Dict[str, Any]]:
+    """yields the results in the order of `texts`"""
+    items = list(enumerate(texts))
+    if workers <= 1:
+        init_worker(*init_args)
+        yield from map(process, items)
+        return
+    with multiprocessing.Pool(processes=workers, initializer=init_worker, initargs=init_args) as pool:
+        yield from pool.imap(process, items, chunksize=chunksize)
+
+
+def summary(results: List[Dict[str, Any]], took: float) -> str:
+    latencies = [r["took"] for r in results]
+    statuses = Counter(r["status"] for r in results)
+    lines = ["utterances: %d in %.2fs, %.1f/s" % (len(results), took, len(results) / took if took else 0),
+             "latency: p50 %.2fms, p99 %.2fms, max %.2fms" % (percentile(latencies, 50) * 1000,
+                                                              percentile(latencies, 99) * 1000,
+                                                              max(latencies, default=0) * 1000)]
+    for status, count in statuses.most_common():
+        lines.append("%-15s %6d %6.2f%%" % (status, count, count * 100 / len(results)))
+    return "\n".join(lines)
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Calculates logged utterances offline with a pool of processes",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--input", nargs='?', required=True, help="Text file with an utterance per line or .jsonl")
+    parser.add_argument("--field", nargs='?', default='text', help="Utterance field of .jsonl lines")
+    parser.add_argument("--out", nargs='?', default='', help="Output .jsonl file, stdout by default")
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--grammar_compiled", nargs='?', default='data/calc/grammar.pkl',
+                        help="Precompiled grammar artifact, see sage.cfg.compile_grammar")
+    parser.add_argument("--parse_engine", nargs='?', default='int', choices=['int', 'nltk'],
+                        help="Grammar parser implementation")
+    parser.add_argument("--workers", nargs='?', type=int, default=os.cpu_count(), help="Worker processes")
+    parser.add_argument("--chunksize", nargs='?', type=int, default=16, help="Utterances sent to a worker at once")
+    args = parser.parse_args(args=param)
+
+    texts = read_utterances(args.input, args.field)
+    logger.info("Read %d utterances" % len(texts))
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    results = []
+    start = time.perf_counter()
+    try:
+        for r in run_batch(texts, args.workers, (args.grammar, args.grammar_compiled, args.parse_engine),
+                           args.chunksize):
+            results.append(r)
+            out.write(json.dumps(r, ensure_ascii=False) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(summary(results, time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
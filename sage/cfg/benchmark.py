@@ -0,0 +1,52 @@
+import argparse
+import sys
+import time
+
+from sage.cfg.cases import result_cases, eq_cases
+from sage.cfg.grammar import Calculator
+from sage.logger import logger
+
+
+def load_corpus(file: str):
+    if file:
+        with open(file, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    return [c[0] for c in result_cases + eq_cases]
+
+
+def time_parse(cfg: Calculator, corpus, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for txt in corpus:
+            cfg.parse(txt)
+    return time.perf_counter() - start
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Compares parse engines of Calculator",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--corpus", nargs='?', default='',
+                        help="File with a sentence per line, sentences of sage/cfg/cases.py by default")
+    parser.add_argument("--engines", nargs='?', default='nltk,int', help="Engines to compare")
+    parser.add_argument("--repeat", nargs='?', type=int, default=10, help="Times to parse the corpus")
+    parser.add_argument("--chunk_numbers", default=True, action=argparse.BooleanOptionalAction,
+                        help="Collapse numerals before parsing")
+    args = parser.parse_args(args=param)
+
+    corpus = load_corpus(args.corpus)
+    logger.info("Corpus size %d" % len(corpus))
+    base = None
+    for engine in args.engines.split(","):
+        cfg = Calculator(file=args.grammar, engine=engine, chunk_numbers=args.chunk_numbers)
+        cfg.parse(corpus[0])
+        took = time_parse(cfg, corpus, args.repeat)
+        per_sentence = took / (args.repeat * len(corpus))
+        if base is None:
+            base = per_sentence
+        print("%-6s %10.3f ms/sentence %6.2fx" % (engine, per_sentence * 1000, base / per_sentence))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
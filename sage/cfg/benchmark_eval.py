@@ -0,0 +1,61 @@
+import argparse
+import sys
+import time
+
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import Calculator
+from sage.cfg.parser import ResultParser, EqParser
+from sage.logger import logger
+
+WORDS = ["du", "trys", "penki", "septyni", "vienuolika"]
+
+
+def long_sum(terms: int) -> str:
+    """dictated sum of `terms` numbers"""
+    return " plius ".join(WORDS[i % len(WORDS)] for i in range(terms))
+
+
+def time_call(func, tree, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(tree)
+    return (time.perf_counter() - start) / repeat
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Compares tree evaluation: ResultParser + EqParser vs Evaluator",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--terms", nargs='?', default='5,20,50,100,200', help="Numbers in the dictated sums")
+    parser.add_argument("--repeat", nargs='?', type=int, default=20, help="Times to evaluate every tree")
+    args = parser.parse_args(args=param)
+
+    cfg = Calculator(file=args.grammar, engine="int")
+    leaves_map = cfg.leaves_map()
+    res_parser, eq_parser = ResultParser(leaves_map=leaves_map), EqParser(leaves_map=leaves_map)
+    evaluator = Evaluator(leaves_map=leaves_map)
+
+    def old(_tree):
+        return res_parser.parse(_tree), eq_parser.parse(_tree)
+
+    print("%6s %6s %12s %12s %8s" % ("terms", "depth", "parsers ms", "bytecode ms", "gain"))
+    for terms in [int(t) for t in args.terms.split(",")]:
+        tree, _ = cfg.parse(long_sum(terms))
+        if tree is None:
+            logger.warning("No parse for %d terms" % terms)
+            continue
+        new_took = time_call(evaluator.evaluate, tree, args.repeat)
+        try:
+            if old(tree) != evaluator.evaluate(tree):
+                logger.warning("Different results for %d terms" % terms)
+            old_took = time_call(old, tree, args.repeat)
+        except RecursionError:
+            print("%6d %6d %12s %12.3f %8s" % (terms, tree.height(), "recursion", new_took * 1000, "-"))
+            continue
+        print("%6d %6d %12.3f %12.3f %7.2fx" % (terms, tree.height(), old_took * 1000, new_took * 1000,
+                                                old_took / new_took))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,173 @@
+import argparse
+import json
+import sys
+import time
+from typing import List, Dict, Tuple
+
+from sage.cfg.corpus import generate_corpus
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import Calculator
+from sage.cfg.parser import ResultParser, EqParser
+from sage.logger import logger
+
+# eval_ms - the `Evaluator` of the bot, result_ms and eq_ms - the stages it replaced, timed separately
+METRICS = ("parse_ms", "eval_ms", "result_ms", "eq_ms")
+ALL = "all"
+# iterations of the fixed python loop timing the speed of the machine
+CALIBRATION_LOOPS = 1000000
+
+
+def time_call(func, arg, repeat: int):
+    """:return: the best time in ms and the result or None if failed"""
+    best, res = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            res = func(arg)
+        except BaseException as err:
+            logger.debug("%s failed: %s" % (arg, err))
+            res = None
+        took = (time.perf_counter() - start) * 1000
+        best = took if best is None else min(best, took)
+    return best, res
+
+
+def calibrate(repeat: int) -> float:
+    """:return: the best time in ms of a fixed python loop, the times of the machines are compared relative to it"""
+
+    def loop(n):
+        res = 0
+        for i in range(n):
+            res += i % 7
+        return res
+
+    took, _ = time_call(loop, CALIBRATION_LOOPS, repeat)
+    return took
+
+
+def time_corpus(cfg: Calculator, corpus: List[Dict], repeat: int) -> Dict[str, Dict]:
+    """:return: mean times per sentence of the bucket for `METRICS`"""
+    evaluator = Evaluator(leaves_map=cfg.leaves_map())
+    res_parser, eq_parser = ResultParser(leaves_map=cfg.leaves_map()), EqParser(leaves_map=cfg.leaves_map())
+    sums: Dict[str, Dict] = dict()
+    for c in corpus:
+        took = dict()
+        took["parse_ms"], parsed = time_call(cfg.parse, c["text"], repeat)
+        tree = parsed[0] if parsed else None
+        if tree is None:
+            logger.warning("No parse of `%s`" % c["text"])
+            continue
+        took["eval_ms"], _ = time_call(evaluator.evaluate, tree, repeat)
+        took["result_ms"], _ = time_call(res_parser.parse, tree, repeat)
+        took["eq_ms"], _ = time_call(eq_parser.parse, tree, repeat)
+        for b in (c["bucket"], ALL):
+            s = sums.setdefault(b, {"count": 0, **{m: 0.0 for m in METRICS}})
+            s["count"] += 1
+            for m in METRICS:
+                s[m] += took[m]
+    for s in sums.values():
+        for m in METRICS:
+            s[m] /= s["count"]
+    return sums
+
+
+def compare(current: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float, min_count: int,
+            scale: float = 1.0) -> List[str]:
+    """
+        :param tolerance: the relative slowdown allowed, 0.5 - 50% slower than the baseline
+        :param scale: the speed of this machine relative to the one of the baseline, the baseline times are multiplied
+        :return: regressions - bucket metrics slower than the scaled baseline by more than `tolerance`
+        """
+    res = []
+    for b, base in baseline.items():
+        cur = current.get(b)
+        if cur is None or base["count"] < min_count:
+            continue
+        for m in METRICS:
+            expected = base.get(m, 0) * scale
+            if expected > 0 and cur[m] > expected * (1 + tolerance):
+                res.append("%s %s: %.3fms vs %.3fms baseline, %+.0f%%" %
+                           (b, m, cur[m], expected, (cur[m] / expected - 1) * 100))
+    return res
+
+
+def print_table(current: Dict[str, Dict], baseline: Dict[str, Dict], scale: float = 1.0):
+    print("%-28s %6s" % ("bucket", "count") + "".join(" %14s" % m for m in METRICS))
+    for b in sorted(current, key=lambda k: (k == ALL, k)):
+        cur, base = current[b], baseline.get(b)
+        cells = []
+        for m in METRICS:
+            cell = "%.3f" % cur[m]
+            if base and base.get(m, 0) > 0:
+                cell += " %+.0f%%" % ((cur[m] / (base[m] * scale) - 1) * 100)
+            cells.append(cell)
+        print("%-28s %6d" % (b, cur["count"]) + "".join(" %14s" % c for c in cells))
+
+
+def save_baseline(file: str, config: Dict, calibration_ms: float, buckets: Dict[str, Dict]):
+    with open(file, "w", encoding="utf-8") as f:
+        json.dump({"config": config, "calibration_ms": calibration_ms, "buckets": buckets}, f, ensure_ascii=False,
+                  indent=2)
+
+
+def load_baseline(file: str, config: Dict) -> Tuple[Dict[str, Dict], float]:
+    """:return: the bucket times and the calibration time of the baseline machine"""
+    with open(file, encoding="utf-8") as f:
+        data = json.load(f)
+    if data["config"] != config:
+        logger.warning("Baseline config %s differs from %s" % (data["config"], config))
+    return data["buckets"], data["calibration_ms"]
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Times parsing and evaluation on a corpus generated from the grammar "
+                                                 "and compares the times with the baseline",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--parse_engine", nargs='?', default='int', choices=['int', 'nltk'],
+                        help="Grammar parser implementation")
+    parser.add_argument("--size", nargs='?', type=int, default=500, help="Sentences in the corpus")
+    parser.add_argument("--seed", nargs='?', type=int, default=1, help="Corpus random seed")
+    parser.add_argument("--max_tokens", nargs='?', type=int, default=60, help="Max sentence length")
+    parser.add_argument("--repeat", nargs='?', type=int, default=3, help="Times to run, the best time is taken")
+    parser.add_argument("--baseline", nargs='?', default='data/calc/benchmark_baseline.json',
+                        help="Baseline json file recorded with --save, not compared if empty")
+    parser.add_argument("--save", default=False, action=argparse.BooleanOptionalAction,
+                        help="Save the times as the baseline instead of comparing")
+    parser.add_argument("--tolerance", nargs='?', type=float, default=0.5,
+                        help="Fail if a bucket gets slower than the baseline by more than the fraction, "
+                             "the baseline is scaled by the speed of the machine")
+    parser.add_argument("--min_count", nargs='?', type=int, default=5,
+                        help="Buckets with fewer baseline sentences are not compared")
+    args = parser.parse_args(args=param)
+
+    cfg = Calculator(file=args.grammar, engine=args.parse_engine)
+    config = {"size": args.size, "seed": args.seed, "max_tokens": args.max_tokens, "engine": args.parse_engine}
+    corpus = generate_corpus(cfg.grammar, args.size, seed=args.seed, max_tokens=args.max_tokens)
+    logger.info("Generated %d sentences" % len(corpus))
+    # the speed of a shared machine drifts, the faster of the calibrations before and after the corpus is taken
+    calibration_ms = calibrate(args.repeat)
+    current = time_corpus(cfg, corpus, args.repeat)
+    calibration_ms = min(calibration_ms, calibrate(args.repeat))
+
+    if args.save:
+        save_baseline(args.baseline, config, calibration_ms, current)
+        print_table(current, {})
+        logger.info("Saved baseline %s" % args.baseline)
+        return
+    baseline, scale = dict(), 1.0
+    if args.baseline:
+        baseline, base_calibration_ms = load_baseline(args.baseline, config)
+        scale = calibration_ms / base_calibration_ms
+        logger.info("This machine is %.2fx the time of the baseline one" % scale)
+    print_table(current, baseline, scale)
+    regressions = compare(current, baseline, args.tolerance, args.min_count, scale)
+    for r in regressions:
+        print("REGRESSION %s" % r)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Dict
+
+from sage.cfg.parser import ParseError
+from sage.logger import logger
+
+TOKENS = "tokens"
+EDGES = "edges"
+TIME = "time"
+
+
+class TooComplex(ParseError):
+    """Raised when parsing runs out of its budget"""
+
+    def __init__(self, reason: str, value):
+        self.message = "Too complex: %s limit exceeded (%s)" % (reason, value)
+        self.reason = reason
+        self.value = value
+        super().__init__(self.message)
+
+
+class ParseBudget:
+    """
+        Limits of a single parse: number of tokens, chart edges and wall time.
+        Keeps the counters of the exceeded limits by the reason
+        """
+
+    def __init__(self, max_tokens: int = 100, max_edges: int = 200000, max_seconds: float = 2.0):
+        self.max_tokens = max_tokens
+        self.max_edges = max_edges
+        self.max_seconds = max_seconds
+        self.__hits: Dict[str, int] = {TOKENS: 0, EDGES: 0, TIME: 0}
+        self.__lock = threading.Lock()
+
+    def __getstate__(self):
+        # the lock is recreated, a copy in a worker process keeps its own counters
+        res = self.__dict__.copy()
+        del res["_ParseBudget__lock"]
+        return res
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__lock = threading.Lock()
+
+    def start(self, tokens) -> "BudgetCheck":
+        """starts a parse of the tokens, :return: check to call while parsing"""
+        if len(tokens) > self.max_tokens:
+            self.hit(TOKENS, len(tokens))
+        return BudgetCheck(self)
+
+    def hit(self, reason: str, value):
+        hits = self.count(reason)
+        logger.warning("Parse budget exceeded: %s %s, hits %s" % (reason, value, hits))
+        raise TooComplex(reason, value)
+
+    def count(self, reason: str) -> Dict[str, int]:
+        """counts the exceeded limit, e.g. of a copy in a worker process, :return: the counters"""
+        with self.__lock:
+            self.__hits[reason] = self.__hits.get(reason, 0) + 1
+            return dict(self.__hits)
+
+    def hits(self) -> Dict[str, int]:
+        """:return: counters of the exceeded limits"""
+        with self.__lock:
+            return dict(self.__hits)
+
+
+class BudgetCheck:
+    # wall time is checked once per the number of steps
+    TIME_CHECK_STEPS = 256
+
+    def __init__(self, budget: ParseBudget):
+        self.__budget = budget
+        self.__max_edges = budget.max_edges
+        self.__start = time.monotonic()
+        self.__steps = 0
+
+    def check(self, num_edges: int):
+        """raises `TooComplex` if the chart has too many edges or the parse takes too long"""
+        if num_edges > self.__max_edges:
+            self.__budget.hit(EDGES, num_edges)
+        self.__steps += 1
+        if self.__steps % self.TIME_CHECK_STEPS == 0:
+            took = time.monotonic() - self.__start
+            if took > self.__budget.max_seconds:
+                self.__budget.hit(TIME, "%.2fs" % took)
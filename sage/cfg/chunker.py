@@ -0,0 +1,124 @@
+import itertools
+from functools import lru_cache
+from typing import List, Set, Dict, Tuple
+
+import nltk
+from nltk import Nonterminal
+from nltk.grammar import Production
+
+from sage.cfg.optimizer import unfold_helpers
+from sage.cfg.parser import ResultParser, NumberToken
+from sage.logger import logger
+
+# preterminals of the plain (nominative) numerals making a `Sveikas`
+NOMINATIVE = ("VIENETAS", "DESIMT", "DESIMTYS", "VIENUOLIKOS", "SIMTAS", "TUKSTANTIS", "MILIJONAS")
+# preterminals of all numeral families: nominative, ...LPS, ...SHAK, ...SAK, ...SKAIT, ...VARD
+NUMERAL_PREFIXES = NOMINATIVE + ("SAKSKAIT",)
+# nonterminals accepting a collapsed numeral
+CHUNK_LABELS = ("Sveikas", "Sveikas2")
+
+
+def number_token(labels) -> str:
+    """terminal of a collapsed numeral derivable from all the `labels`"""
+    return "<%s>" % "|".join(labels)
+
+
+def add_number_productions(grammar: nltk.CFG) -> nltk.CFG:
+    """returns a copy of the grammar that accepts collapsed numerals as a whole `Sveikas`/`Sveikas2`"""
+    res = list(grammar.productions())
+    for n in range(1, len(CHUNK_LABELS) + 1):
+        for labels in itertools.combinations(CHUNK_LABELS, n):
+            for lb in labels:
+                res.append(Production(Nonterminal(lb), [number_token(labels)]))
+    return nltk.CFG(grammar.start(), res)
+
+
+def get_preterminals(grammar: nltk.CFG) -> Dict[str, Set[str]]:
+    res = dict()
+    for pr in grammar.productions():
+        if pr.is_lexical() and len(pr.rhs()) == 1:
+            res.setdefault(pr.rhs()[0], set()).add(pr.lhs().symbol())
+    return res
+
+
+class NumberChunker:
+    """
+        Collapses spans of plain numerals into a single pre-valued `NumberToken`, so the chart parser does not
+        need to build the numeral structure.
+        A span is collapsed only if it is a maximal run of numeral words, all of them can be a part of a plain
+        `Sveikas` and the run can not be read in a different way by the surrounding grammar (fractional part after
+        `kablelis`, root multiplier before `šaknis`)
+        """
+
+    def __init__(self, grammar: nltk.CFG, leaves_map: dict):
+        logger.info("Init number chunker")
+        self.__leaves_map = leaves_map
+        self.__sub_parsers = [nltk.ChartParser(nltk.CFG(Nonterminal(lb), grammar.productions()))
+                              for lb in CHUNK_LABELS]
+        pre = get_preterminals(grammar)
+        self.__numerals = {w for w, lbs in pre.items() if any(lb.startswith(NUMERAL_PREFIXES) for lb in lbs)}
+        self.__nominative = {w for w, lbs in pre.items() if lbs.intersection(NOMINATIVE)}
+        self.__sak_skait = {w for w, lbs in pre.items() if "SAKSKAIT" in lbs}
+        self.__saknis = {w for w, lbs in pre.items() if "SAKNISPAGRINDAS" in lbs}
+        self.__kablelis = {w for w, lbs in pre.items() if "KABLELIS" in lbs}
+        self.__init_value()
+
+    def __init_value(self):
+        self.__parser = ResultParser(leaves_map=self.__leaves_map)
+        self.__value = lru_cache(maxsize=1000)(self.__calc_value)
+
+    def __getstate__(self):
+        # the parser and the cache hold closures - recreated after unpickling
+        res = self.__dict__.copy()
+        del res["_NumberChunker__parser"]
+        del res["_NumberChunker__value"]
+        return res
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__init_value()
+
+    def chunk(self, tokens: List[str]) -> List[str]:
+        res = []
+        i = 0
+        while i < len(tokens):
+            if tokens[i] not in self.__numerals:
+                res.append(tokens[i])
+                i += 1
+                continue
+            j = i
+            while j < len(tokens) and tokens[j] in self.__numerals:
+                j += 1
+            span = tuple(tokens[i:j])
+            chunk = None
+            if self.__can_chunk(tokens, i, j):
+                chunk = self.__value(span)
+            if chunk is None:
+                res.extend(span)
+            else:
+                res.append(NumberToken(chunk[0], value=chunk[1], words=span))
+            i = j
+        return res
+
+    def __can_chunk(self, tokens: List[str], start: int, end: int) -> bool:
+        if any(w not in self.__nominative for w in tokens[start:end]):
+            return False
+        if start > 0 and tokens[start - 1] in self.__kablelis:
+            return False
+        if end < len(tokens) and tokens[end - 1] in self.__sak_skait and tokens[end] in self.__saknis:
+            return False
+        return True
+
+    def __calc_value(self, span: Tuple[str]):
+        """:return: (token, value) or None if the span is not a single numeral"""
+        labels, tree = [], None
+        for lb, p in zip(CHUNK_LABELS, self.__sub_parsers):
+            t = next(iter(p.parse(span)), None)
+            if t is not None:
+                labels.append(lb)
+                tree = tree or t
+        if tree is None:
+            return None
+        res = self.__parser.map_to_res(unfold_helpers(tree))
+        self.__parser.calculate(res)
+        return number_token(labels), res.value
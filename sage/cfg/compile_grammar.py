@@ -0,0 +1,25 @@
+import argparse
+import sys
+import time
+
+from sage.cfg.artifact import save_artifact
+from sage.cfg.grammar import prepare_grammar_data
+from sage.logger import logger
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Precompiles grammar into a binary artifact loaded by Calculator",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar .cfg file")
+    parser.add_argument("--out", nargs='?', default='data/calc/grammar.pkl', help="Output artifact file")
+    args = parser.parse_args(args=param)
+
+    start = time.time()
+    data = prepare_grammar_data(args.grammar, repair_index=True)
+    save_artifact(data, cfg_file=args.grammar, out_file=args.out)
+    logger.info("Saved %s in %.3fs" % (args.out, time.time() - start))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,125 @@
+import random
+from collections import Counter
+from typing import List, Dict, Tuple
+
+import nltk
+from nltk.grammar import Production
+
+LENGTH_BUCKETS = (5, 10, 20, 40)
+DEPTH_BUCKETS = (10, 15, 20, 30)
+
+
+def min_values(grammar: nltk.CFG, value) -> Dict[nltk.Nonterminal, int]:
+    """:return: the minimal `value(production, values)` of every nonterminal"""
+    res = dict()
+    changed = True
+    while changed:
+        changed = False
+        for pr in grammar.productions():
+            h = value(pr, res)
+            if h < res.get(pr.lhs(), h + 1):
+                res[pr.lhs()] = h
+                changed = True
+    return res
+
+
+def production_height(pr: Production, heights: Dict[nltk.Nonterminal, int]) -> float:
+    res = 0
+    for s in pr.rhs():
+        if isinstance(s, nltk.Nonterminal):
+            res = max(res, heights.get(s, float("inf")))
+    return res + 1
+
+
+def production_length(pr: Production, lengths: Dict[nltk.Nonterminal, int]) -> float:
+    """number of tokens of the shortest derivation starting with the production"""
+    return sum(lengths.get(s, float("inf")) if isinstance(s, nltk.Nonterminal) else 1 for s in pr.rhs())
+
+
+class CorpusGenerator:
+    """
+        Deterministic sentence generator from the grammar productions.
+        Every expansion takes the least used production with the probability `coverage`, otherwise a random one, so
+        the corpus covers all productions. Every sentence gets a random target length up to `max_tokens`, a
+        production is taken only if the shortest sentence with it still fits the target. Below `max_depth` only the
+        productions of the lowest derivations are used
+        """
+
+    def __init__(self, grammar: nltk.CFG, seed: int = 1, coverage: float = 0.5, max_depth: int = 25,
+                 max_tokens: int = 40):
+        self.grammar = grammar
+        self.coverage = coverage
+        self.max_depth = max_depth
+        self.max_tokens = max_tokens
+        self.__target = 0
+        # length of the shortest sentence with the productions taken so far
+        self.__reserved = 0
+        self.used: Counter = Counter()
+        self.__rnd = random.Random(seed)
+        self.__heights = min_values(grammar, production_height)
+        self.__lengths = min_values(grammar, production_length)
+        self.__prods = {lhs: [p for p in grammar.productions(lhs=lhs)
+                              if production_height(p, self.__heights) < float("inf")]
+                        for lhs in self.__heights}
+
+    def sentence(self) -> Tuple[List[str], int]:
+        """:return: tokens and the depth of the derivation"""
+        self.__target = self.__rnd.randint(1, self.max_tokens)
+        self.__reserved = self.__lengths[self.grammar.start()]
+        return self.__expand(self.grammar.start(), 0)
+
+    def __expand(self, sym, depth) -> Tuple[List[str], int]:
+        prods = self.__prods[sym]
+        base = self.__reserved - self.__lengths[sym]
+        if depth >= self.max_depth:
+            # the lowest derivations always terminate
+            prods = [p for p in prods if production_height(p, self.__heights) == self.__heights[sym]]
+        else:
+            prods = [p for p in prods if base + production_length(p, self.__lengths) <= self.__target] or \
+                    [p for p in prods if production_length(p, self.__lengths) == self.__lengths[sym]]
+        if self.__rnd.random() < self.coverage:
+            least = min(self.used[p] for p in prods)
+            pr = [p for p in prods if self.used[p] == least][0]
+        else:
+            pr = self.__rnd.choice(prods)
+        self.used[pr] += 1
+        self.__reserved = base + production_length(pr, self.__lengths)
+        tokens, height = [], 0
+        for s in pr.rhs():
+            if isinstance(s, nltk.Nonterminal):
+                t, h = self.__expand(s, depth + 1)
+                tokens.extend(t)
+                height = max(height, h)
+            else:
+                tokens.append(s)
+        return tokens, height + 1
+
+    def coverage_ratio(self) -> float:
+        return len(self.used) / len(self.grammar.productions())
+
+
+def bucket(value: int, limits) -> str:
+    low = 1
+    for limit in limits:
+        if value <= limit:
+            return "%d-%d" % (low, limit)
+        low = limit + 1
+    return "%d+" % low
+
+
+def generate_corpus(grammar: nltk.CFG, size: int, seed: int = 1, max_tokens: int = 60) -> List[Dict]:
+    """:return: `size` unique sentences with their token length and depth buckets"""
+    gen = CorpusGenerator(grammar, seed=seed, max_tokens=max_tokens)
+    res, seen = [], set()
+    attempts = 0
+    while len(res) < size and attempts < size * 20:
+        attempts += 1
+        tokens, depth = gen.sentence()
+        txt = " ".join(tokens)
+        if not tokens or len(tokens) > max_tokens or txt in seen:
+            continue
+        seen.add(txt)
+        res.append({"text": txt, "tokens": len(tokens), "depth": depth,
+                    "bucket": "len %s, depth %s" % (bucket(len(tokens), LENGTH_BUCKETS),
+                                                    bucket(depth, DEPTH_BUCKETS))})
+    return res
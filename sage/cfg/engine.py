@@ -0,0 +1,301 @@
+from typing import List, Dict, Tuple, Any
+
+import nltk
+
+from sage.cfg.budget import ParseBudget
+from sage.logger import logger
+
+NONE = -1
+
+
+class IntGrammar:
+    """
+        Grammar converted to integer coded symbols and a dotted rule table:
+        `rhs[p]` - symbols of the production `p`, `lhs[p]` - its left side,
+        `by_first[s]` - productions starting with the symbol `s`, `terminal[s]` - is the symbol a terminal
+        """
+
+    def __init__(self, grammar: nltk.CFG):
+        logger.info("Init int grammar")
+        self.cfg = grammar
+        self.symbols: Dict[Any, int] = dict()
+        self.labels: List[str] = []
+        self.terminal: List[bool] = []
+        self.lhs: List[int] = []
+        self.rhs: List[Tuple[int, ...]] = []
+        seen = set()
+        for pr in grammar.productions():
+            key = (pr.lhs(), pr.rhs())
+            # duplicated productions make the same edges in nltk, skip them
+            if key in seen:
+                continue
+            seen.add(key)
+            self.lhs.append(self.__symbol(pr.lhs()))
+            self.rhs.append(tuple(self.__symbol(s) for s in pr.rhs()))
+        self.start = self.__symbol(grammar.start())
+        self.by_first: List[List[int]] = [[] for _ in self.labels]
+        self.empty: List[int] = []
+        for p, rhs in enumerate(self.rhs):
+            if rhs:
+                self.by_first[rhs[0]].append(p)
+            else:
+                self.empty.append(p)
+
+    def __symbol(self, s) -> int:
+        res = self.symbols.get(s)
+        if res is None:
+            res = len(self.labels)
+            self.symbols[s] = res
+            self.labels.append(s.symbol() if isinstance(s, nltk.Nonterminal) else s)
+            self.terminal.append(not isinstance(s, nltk.Nonterminal))
+        return res
+
+
+class IntChart:
+    """
+        Array backed chart. Edge `e` is `prod[e]` with the dot at `dot[e]` spanning `start[e]:end[e]`, leaf edges
+        have `prod[e] == NONE`. Instead of child pointer lists it keeps the first backpointer `(prev, child)` of every
+        edge - enough to rebuild the first tree - and the number of child pointer lists to know when an edge is
+        modified.
+        If `journal` is a list, the changes of counts and applied backpointers are logged there, so the chart can be
+        rolled back with `rollback`
+        """
+
+    def __init__(self, grammar: IntGrammar, tokens: List[str]):
+        self.g = grammar
+        self.tokens = tokens
+        self.prod: List[int] = []
+        self.dot: List[int] = []
+        self.start: List[int] = []
+        self.end: List[int] = []
+        self.sym: List[int] = []  # lhs symbol
+        self.next: List[int] = []  # symbol after the dot or NONE if complete
+        self.count: List[int] = []  # number of child pointer lists
+        self.first: List[Tuple[int, int]] = []
+        self.keys: List[Tuple[int, int, int, int]] = []
+        self.journal = None
+        self.__ids: Dict[Tuple[int, int, int, int], int] = dict()
+        self.__applied: Dict[Tuple[int, int], int] = dict()
+        # indexes by position and symbol
+        self.complete_at: List[Dict[int, List[int]]] = []
+        self.incomplete_at: List[Dict[int, List[int]]] = []
+        self.ensure_positions(len(tokens))
+
+    def num_edges(self) -> int:
+        return len(self.prod)
+
+    def ensure_positions(self, n: int):
+        while len(self.complete_at) <= n:
+            self.complete_at.append(dict())
+            self.incomplete_at.append(dict())
+
+    def edge_id(self, key: Tuple[int, int, int, int]) -> int:
+        return self.__ids.get(key, NONE)
+
+    def __index_list(self, e: int) -> List[int]:
+        if self.next[e] == NONE:
+            return self.complete_at[self.start[e]][self.sym[e]]
+        return self.incomplete_at[self.end[e]][self.next[e]]
+
+    def remove_leaf(self, i: int):
+        """drops the leaf edge at `i`, it must not be used by any other edge"""
+        e = self.__ids.pop((NONE, 0, i, i + 1), None)
+        if e is not None:
+            self.__index_list(e).remove(e)
+
+    def rollback(self, num_edges: int, journal_len: int):
+        """undoes the journaled changes and drops the edges added after the chart had `num_edges`"""
+        while len(self.journal) > journal_len:
+            kind, key, old = self.journal.pop()
+            if kind == 0:
+                self.count[key] = old
+            elif old is None:
+                del self.__applied[key]
+            else:
+                self.__applied[key] = old
+        for e in range(len(self.prod) - 1, num_edges - 1, -1):
+            if self.__ids.get(self.keys[e]) == e:
+                del self.__ids[self.keys[e]]
+                self.__index_list(e).pop()
+        for arr in (self.prod, self.dot, self.start, self.end, self.sym, self.next, self.count, self.first,
+                    self.keys):
+            del arr[num_edges:]
+
+    def __set_applied(self, key, value):
+        if self.journal is not None:
+            self.journal.append((1, key, self.__applied.get(key)))
+        self.__applied[key] = value
+
+    def __add_count(self, e, value):
+        if self.journal is not None:
+            self.journal.append((0, e, self.count[e]))
+        self.count[e] += value
+
+    def __add(self, key, prod, dot, start, end, sym, nxt) -> int:
+        e = len(self.prod)
+        self.__ids[key] = e
+        self.prod.append(prod)
+        self.dot.append(dot)
+        self.start.append(start)
+        self.end.append(end)
+        self.sym.append(sym)
+        self.next.append(nxt)
+        self.count.append(0)
+        self.first.append((NONE, NONE))
+        self.keys.append(key)
+        if nxt == NONE:
+            self.complete_at[start].setdefault(sym, []).append(e)
+        else:
+            self.incomplete_at[end].setdefault(nxt, []).append(e)
+        return e
+
+    def __tree_edge(self, prod, dot, start, end) -> Tuple[int, bool]:
+        key = (prod, dot, start, end)
+        e = self.__ids.get(key)
+        if e is not None:
+            return e, False
+        rhs = self.g.rhs[prod]
+        nxt = rhs[dot] if dot < len(rhs) else NONE
+        return self.__add(key, prod, dot, start, end, self.g.lhs[prod], nxt), True
+
+    def insert_leaf(self, i: int, sym: int) -> int:
+        """:return: edge or NONE if it exists"""
+        key = (NONE, 0, i, i + 1)
+        if key in self.__ids:
+            return NONE
+        e = self.__add(key, NONE, 0, i, i + 1, sym, NONE)
+        self.count[e] = 1
+        return e
+
+    def insert_empty(self, prod: int, i: int) -> int:
+        e, new = self.__tree_edge(prod, 0, i, i)
+        if not new:
+            return NONE
+        self.count[e] = 1
+        return e
+
+    def insert_predicted(self, prod: int, child: int) -> int:
+        """`[B -> A * beta]` from the complete edge `A`, child pointer list is `(child,)`"""
+        e, new = self.__tree_edge(prod, 1, self.start[child], self.end[child])
+        key = (NONE - e, child)
+        if key in self.__applied:
+            return NONE
+        self.__set_applied(key, 1)
+        if new:
+            self.first[e] = (NONE, child)
+        self.__add_count(e, 1)
+        return e
+
+    def insert_moved(self, prev: int, child: int) -> int:
+        """
+            moves the dot of `prev` over `child`, it adds `count[prev]` child pointer lists,
+            the edge is modified only if `prev` got new ones since the last move over the same `child`
+            """
+        e, new = self.__tree_edge(self.prod[prev], self.dot[prev] + 1, self.start[prev], self.end[child])
+        key = (prev, child)
+        done = self.__applied.get(key, 0)
+        c = self.count[prev]
+        if c <= done:
+            return NONE
+        self.__set_applied(key, c)
+        if new:
+            self.first[e] = (prev, child)
+        self.__add_count(e, c - done)
+        return e
+
+    def tree(self, e: int):
+        """builds the tree from the first backpointers - the same tree nltk yields first"""
+        if self.prod[e] == NONE:
+            return self.tokens[self.start[e]]
+        children = []
+        node = e
+        while self.dot[node] > 0:
+            prev, child = self.first[node]
+            children.append(self.tree(child))
+            if prev == NONE:
+                break
+            node = prev
+        children.reverse()
+        return nltk.Tree(self.g.labels[self.sym[e]], children)
+
+
+def apply_rules(g: IntGrammar, chart: IntChart, edge: int):
+    """bottom up predict combine and fundamental rules for the edge taken from the agenda"""
+    nxt = chart.next[edge]
+    if nxt == NONE:
+        # bottom up predict combine
+        for p in g.by_first[chart.sym[edge]]:
+            e = chart.insert_predicted(p, edge)
+            if e != NONE:
+                yield e
+        # fundamental rule, complete edge on the right
+        lefts = chart.incomplete_at[chart.start[edge]].get(chart.sym[edge])
+        if lefts:
+            i = 0
+            while i < len(lefts):
+                e = chart.insert_moved(lefts[i], edge)
+                if e != NONE:
+                    yield e
+                i += 1
+    else:
+        # fundamental rule, incomplete edge on the left
+        rights = chart.complete_at[chart.end[edge]].get(nxt)
+        if rights:
+            i = 0
+            while i < len(rights):
+                e = chart.insert_moved(edge, rights[i])
+                if e != NONE:
+                    yield e
+                i += 1
+
+
+class IntChartParser:
+    """
+        Bottom up left corner chart parser over `IntGrammar`.
+        It follows `nltk.ChartParser` with `BU_LC_STRATEGY` step by step - the agenda order, the order of index
+        lookups and the modified edge rules are the same - so it finds the same first parse
+        """
+
+    def __init__(self, grammar: IntGrammar, budget: ParseBudget = None):
+        self.__g = grammar
+        self.budget = budget
+
+    def grammar(self) -> IntGrammar:
+        return self.__g
+
+    def chart_parse_first(self, tokens: List[str]) -> Tuple[IntChart, int]:
+        """:return: chart and the first complete root edge or NONE"""
+        g = self.__g
+        tokens = list(tokens)
+        g.cfg.check_coverage(tokens)
+        check = self.budget.start(tokens) if self.budget else None
+        chart = IntChart(g, tokens)
+        n = len(tokens)
+
+        def is_root(_e):
+            return chart.next[_e] == NONE and chart.sym[_e] == g.start and chart.start[_e] == 0 and \
+                chart.end[_e] == n
+
+        for i, t in enumerate(tokens):
+            chart.insert_leaf(i, g.symbols[t])
+        for p in g.empty:
+            for i in range(n + 1):
+                e = chart.insert_empty(p, i)
+                if e != NONE and is_root(e):
+                    return chart, e
+        agenda = list(range(chart.num_edges()))
+        agenda.reverse()
+        while agenda:
+            if check:
+                check.check(chart.num_edges())
+            edge = agenda.pop()
+            for e in apply_rules(g, chart, edge):
+                if is_root(e):
+                    return chart, e
+                agenda.append(e)
+        return chart, NONE
+
+    def parse(self, tokens: List[str]):
+        chart, edge = self.chart_parse_first(tokens)
+        if edge != NONE:
+            yield chart.tree(edge)
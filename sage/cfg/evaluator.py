@@ -0,0 +1,354 @@
+import math
+from typing import Any, List, Tuple, Callable, Dict
+
+import nltk
+
+from sage.cfg.parser import NumberToken, UnknownLeave, UnknownOperation, NotImplementedOperation, add_to_dict, \
+    Deadline, op_pow, number_to_str, bounded, divide
+from sage.logger import logger
+
+# result of an operation: (value, latex), latex is a fragment - a value or a tuple of fragments joined on `render`
+Pair = Tuple[Any, Any]
+# program instruction: (PUSH, value, word, 0) or (APPLY, operation, label, number of arguments)
+Instruction = Tuple[int, Any, str, int]
+PUSH = 0
+APPLY = 1
+
+
+class EvalNode:
+    __slots__ = ("name", "word", "value", "latex")
+
+    def __init__(self, name: str, word: str, value: Any, latex: Any):
+        self.name = name
+        self.word = word
+        self.value = value
+        self.latex = latex
+
+
+class Evaluator:
+    """
+        Evaluates the parse tree computing the value of `ResultParser` and the equation of `EqParser` together.
+        The tree is lowered once into a flat postfix program - leaves resolved to values, labels resolved to
+        operations - and the program is run in a loop over a value stack, so deep trees do not recurse.
+        Equation parts are kept as nested tuples of fragments and joined only once in `render`.
+        Powers are bounded by `op_pow`, the other integer results by `bounded` and the whole run by `time_limit`,
+        so the worst case latency is bounded
+        """
+
+    def __init__(self, leaves_map, time_limit: float = 1.0):
+        """:param time_limit: seconds, `EvaluationLimit` is raised if the evaluation takes longer"""
+        logger.info("Init Evaluator")
+        self.leaves_map = leaves_map
+        self.time_limit = time_limit
+        self.operations_map = init_operations()
+
+    def evaluate(self, tree: nltk.Tree) -> Tuple[str, str]:
+        """:return: value as `ResultParser.parse` and equation as `EqParser.parse`"""
+        res = self.calculate(tree)
+        return number_to_str(res.value), render(res.latex)
+
+    def calculate(self, tree) -> EvalNode:
+        return run(self.compile(tree), Deadline(self.time_limit))
+
+    def compile(self, tree) -> List[Instruction]:
+        """lowers the tree into a postfix program"""
+        res = []
+        stack = [(tree, False)]
+        while stack:
+            node, children_done = stack.pop()
+            if type(node) is nltk.Tree:
+                if children_done:
+                    name = node.label()
+                    op = self.operations_map.get(name)
+                    if op is None:
+                        raise UnknownOperation(name)
+                    res.append((APPLY, op, name, len(node)))
+                else:
+                    stack.append((node, True))
+                    stack.extend((ch, False) for ch in reversed(node))
+            elif isinstance(node, NumberToken):
+                res.append((PUSH, node.value, node, 0))
+            else:
+                v = self.leaves_map.get(node)
+                if v is None:
+                    raise UnknownLeave(node)
+                res.append((PUSH, v, node, 0))
+        return res
+
+
+def run(program: List[Instruction], deadline: Deadline = None) -> EvalNode:
+    """runs the postfix program, :return: the result node"""
+    stack = []
+    for code, arg, label, arity in program:
+        if code == PUSH:
+            stack.append(EvalNode("", label, arg, arg))
+            continue
+        if arity:
+            nodes = stack[-arity:]
+            del stack[-arity:]
+        else:
+            nodes = []
+        value, latex = arg(nodes)
+        if deadline is not None:
+            deadline.check()
+        stack.append(EvalNode(label, "", value, latex))
+    return stack[-1]
+
+
+def render(latex) -> str:
+    if type(latex) is not tuple:
+        return str(latex)
+    parts = []
+    stack = [latex]
+    while stack:
+        f = stack.pop()
+        if type(f) is tuple:
+            stack.extend(reversed(f))
+        else:
+            parts.append(str(f))
+    return "".join(parts)
+
+
+def pair(node: EvalNode) -> Pair:
+    return node.value, node.latex
+
+
+def init_operations() -> Dict[str, Callable[[List[EvalNode]], Pair]]:
+    res = dict()
+    add_to_dict(res, ["VIENETAS", "DESIMT", "DESIMTYS", "SIMTAS", "TUKSTANTIS",
+                      "MILIJONAS", "Israiska", "S", "VIENETASSHAK", 'KABLELIS',
+                      "VIENETASSKAIT", "VIENETASVARD", "VIENUOLIKOS", "VIENETASSAK", "VIENUOLIKOSSHAK",
+                      "VIENETASLPS", "VienetLps", "SIMTASLPS", "SIMTASSHAK", "DESIMTLPS",
+                      "DESIMTYSLPS", "VIENUOLIKOSLPS", "MILIJONASLPS", "MILIJONASSHAK",
+                      "TUKSTANTISLPS", "TUKSTANTISSHAK"],
+                take_first)
+    add_to_dict(res, ["Vienet", "Vienet2", "VienetShak", "VienetSkait", "VienetVard", "SveikojiDal", "Trupmenine",
+                      "SingleParen", "VienetSak", "Saknlps"],
+                take_first)
+    add_to_dict(res, ["Desimt", "Desimt2", "DesimtShak", "DesimtSkait", "DesimtVard", "DesimtLps", "DesimtSak"],
+                numeral(process_desimt))
+    add_to_dict(res, ["Simt", "Simt2", "SimtShak", "SimtSkait", "SimtVard", "SimtLps", "SimtSak"],
+                numeral(with_scale(("SIMTAS", "SIMTASSHAK", "SIMTASLPS"))))
+    add_to_dict(res, ["Tukst", "Tukst2", "TukstShak", "TukstSkait", "TukstVard", "TukstLps", "TukstSak"],
+                numeral(with_scale(("TUKSTANTIS", "TUKSTANTISSHAK", "TUKSTANTISLPS"))))
+    add_to_dict(res, ["Sveikas", "Sveikas2", "SveikasShak", "SveikasSkait", "SveikasVard", "SveikasLps", "SveikasSak"],
+                numeral(with_scale(("MILIJONAS", "MILIJONASSHAK", "MILIJONASLPS"))))
+    add_to_dict(res, ["Skaicius", "Skaicius2"], process_skaicius)
+    add_to_dict(res, ["Gilyn", "Gilyn2", "Reiksme", "Reiksme2"], take_first)
+    add_to_dict(res, ["Isrneig", "Isrneig2"], process_vienetas_neig)
+    res["Isrlps"] = take_first
+    res["Isrsak"] = take_first
+    res["Isrkart"] = process_op
+    res["Israiskaplus"] = process_op
+    res["Lps"] = op_laipsnis
+    res["Laipsnis"] = process_laipsnis_next
+    res["Realus"] = numeral(process_realus)
+    add_to_dict(res, ["SklDes", "Skip", "PLIUS", "MINUS", "DAUGYBA", "DALYBA", "LAIPSNISPAGRINDAS", "KABLELISV2",
+                      "Plius", "Minus", "Dalyba", "Daugyba", "SklKair", "SAKNISPAGRINDAS", "Saknis"], process_skip)
+    res["KairysSkl"] = process_skl_kair
+    res["DesinysSkl"] = process_skl_des
+    res["IsraiskaSkl"] = process_skl
+    res["Sak"] = process_saknis
+    res["SaknLong"] = process_saknis_l
+    res["TrupmenineV2"] = process_trupmena
+    res["RealusV2"] = process_realus_v2
+    res["More"] = process_more
+    return res
+
+
+def get_op(name: str) -> Callable:
+    res = binary_operations.get(name)
+    if res is None:
+        raise UnknownOperation(name)
+    return res
+
+
+def numeral(op: Callable[[List[Any], List[str]], Any]) -> Callable[[List[EvalNode]], Pair]:
+    """numerals are written as their value"""
+
+    def res(nodes: List[EvalNode]) -> Pair:
+        v = op([n.value for n in nodes], [n.name for n in nodes])
+        return v, v
+
+    return res
+
+
+def take_first(nodes: List[EvalNode]) -> Pair:
+    return nodes[0].value, nodes[0].latex
+
+
+def process_skip(nodes: List[EvalNode]) -> Pair:
+    return "", ""
+
+
+def process_desimt(values: List[Any], names: List[str]) -> Any:
+    return sum(values)
+
+
+def with_scale(scale_names):
+    def res(values: List[Any], names: List[str]) -> Any:
+        if len(values) == 1:
+            return values[0]
+        if len(values) == 3:
+            return values[0] * values[1] + values[2]
+        if names[0] in scale_names:
+            return values[0] + values[1]
+        return values[0] * values[1]
+
+    return res
+
+
+def process_realus(values: List[Any], names: List[str]) -> Any:
+    return float("%d.%d" % (values[0], values[2]))
+
+
+def process_vienetas_neig(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 2:
+        return op_neig(nodes)
+    return take_first(nodes)
+
+
+def process_laipsnis_next(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 2:
+        if nodes[1].word == "laipsniu":
+            return take_first(nodes)
+        elif nodes[0].word == "minus":
+            return -nodes[1].value, -nodes[1].latex
+        else:
+            return pair(nodes[1])
+    if len(nodes) == 3:
+        if nodes[1].word == "laipsniu":
+            return pair(nodes[2])
+    return take_first(nodes)
+
+
+def process_skaicius(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 1:
+        return take_first(nodes)
+    return op_dalint(pair(nodes[0]), pair(nodes[1]))
+
+
+def process_saknis(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 3:
+        return op_saknis(pair(nodes[2]), pair(nodes[0]))
+    if len(nodes) == 2:
+        if nodes[0].name == "SAKSKAIT":
+            return op_daugint(pair(nodes[0]), pair(nodes[1]))
+        if nodes[0].name == "Saknis":
+            return op_saknis(pair(nodes[1]), (2, 2))
+    raise NotImplementedOperation("process_saknis")
+
+
+def process_saknis_l(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 2:
+        return op_saknis(pair(nodes[1]), (2, 2))
+    if len(nodes) == 3:
+        if nodes[0].name == "SAKSKAIT":
+            return op_daugint(pair(nodes[0]), op_saknis(pair(nodes[2])))
+        if nodes[0].name == "Saknlps":
+            return op_saknis(pair(nodes[2]), pair(nodes[0]))
+    if len(nodes) == 4:
+        return op_daugint(pair(nodes[0]), op_saknis(pair(nodes[3]), pair(nodes[1])))
+    raise NotImplementedOperation("process_saknis_l")
+
+
+def process_trupmena(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 2:
+        return op_dalint(pair(nodes[0]), pair(nodes[1]))
+    raise NotImplementedOperation("process_trupmena")
+
+
+def process_realus_v2(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 3:
+        return op_skaic_su_trupm(pair(nodes[0]), pair(nodes[2]))
+    raise NotImplementedOperation("process_realus_v2")
+
+
+def process_skl_kair(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 1:
+        return op_skliaustai(pair(nodes[0]))
+    return op_skliaustai(pair(nodes[1]))
+
+
+def process_skl_des(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 4:
+        return op_skliaustai(exec_simple_op(nodes[0:3]))
+    if len(nodes) == 3:
+        return op_pow(nodes[0].value, nodes[1].value), op_pow(nodes[0].latex, nodes[1].latex)
+    if len(nodes) == 2:
+        return op_skliaustai(pair(nodes[0]))
+    raise NotImplementedOperation("process_skl_des")
+
+
+def process_skl(nodes: List[EvalNode]) -> Pair:
+    if nodes[0].name == "S":
+        return op_skliaustai(pair(nodes[0]))
+    elif len(nodes) == 2:
+        return op_skliaustai(pair(nodes[0]))
+    if len(nodes) == 4:
+        return op_skliaustai(exec_simple_op(nodes[0:3]))
+    if len(nodes) == 3:
+        return exec_simple_op(nodes[0:3])
+    raise NotImplementedOperation("process_skl")
+
+
+def exec_simple_op(nodes: List[EvalNode]) -> Pair:
+    return get_op(nodes[1].name)(pair(nodes[0]), pair(nodes[2]))
+
+
+def process_more(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) == 3:
+        return exec_simple_op(nodes)
+    raise NotImplementedOperation("process_more")
+
+
+def process_op(nodes: List[EvalNode]) -> Pair:
+    if len(nodes) >= 3:
+        return exec_simple_op(nodes)
+    return take_first(nodes)
+
+
+def op_plius(p1: Pair, p2: Pair) -> Pair:
+    return bounded(p1[0] + p2[0]), (p1[1], " + ", p2[1])
+
+
+def op_minus(p1: Pair, p2: Pair) -> Pair:
+    return bounded(p1[0] - p2[0]), (p1[1], " - ", p2[1])
+
+
+def op_daugint(p1: Pair, p2: Pair) -> Pair:
+    return bounded(p1[0] * p2[0]), (p1[1], " \\cdot ", p2[1])
+
+
+def op_dalint(p1: Pair, p2: Pair) -> Pair:
+    return divide(p1[0], p2[0]), ("\\frac{", p1[1], "}{", p2[1], "}")
+
+
+def op_skaic_su_trupm(p1: Pair, p2: Pair) -> Pair:
+    return p1[0] + p2[0], (p1[1], " ", p2[1])
+
+
+def op_laipsnis(nodes: List[EvalNode]) -> Pair:
+    return op_pow(nodes[0].value, nodes[1].value), (nodes[0].latex, "^{", nodes[1].latex, "}")
+
+
+def op_neig(nodes: List[EvalNode]) -> Pair:
+    return 0 - nodes[1].value, ("-", nodes[1].latex)
+
+
+def op_skliaustai(p: Pair) -> Pair:
+    return p[0], ("\\left( ", p[1], " \\right)")
+
+
+def op_saknis(p1: Pair, p2: Pair) -> Pair:
+    if p2[0] == 2:
+        value = math.sqrt(p1[0])
+    else:
+        value = math.pow(p1[0], 1. / p2[0])
+    if p2[1] == 2:
+        return value, ("\\sqrt{", p1[1], "}")
+    return value, ("\\sqrt[", p2[1], "]{", p1[1], "}")
+
+
+binary_operations = {"Plius": op_plius, "Minus": op_minus, "Daugyba": op_daugint, "Dalyba": op_dalint,
+                     "Saknis": op_saknis, "SkaicSuTrupmena": op_skaic_su_trupm}
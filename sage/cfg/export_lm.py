@@ -0,0 +1,101 @@
+import argparse
+import math
+import random
+import sys
+from typing import Callable, List
+
+import nltk
+
+from sage.cfg.budget import ParseBudget
+from sage.cfg.corpus import generate_corpus
+from sage.cfg.grammar import Calculator, get_leaves
+from sage.cfg.lm import NgramModel, WordGraph
+from sage.logger import logger
+
+DEFAULT_OUT = {"fst": "data/calc/grammar.fst.txt", "arpa": "data/calc/grammar.arpa"}
+
+
+def sentences(grammar: nltk.CFG, size: int, seed: int, max_tokens: int) -> List[List[str]]:
+    return [c["text"].split() for c in generate_corpus(grammar, size, seed=seed, max_tokens=max_tokens)]
+
+
+def in_grammar(cfg: Calculator, tokens: List[str]) -> bool:
+    try:
+        tree, _ = cfg.parse(" ".join(tokens))
+        return tree is not None
+    except BaseException as err:
+        logger.debug("`%s`: %s" % (" ".join(tokens), err))
+        return False
+
+
+def precision(cfg: Calculator, sample: Callable[[random.Random], List[str]], size: int, seed: int) -> float:
+    """:return: the share of the sampled word sequences parsed by the grammar"""
+    rnd = random.Random(seed)
+    return sum(in_grammar(cfg, sample(rnd)) for _ in range(size)) / size if size else 1.0
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Exports the finite-state approximation of the grammar for the "
+                                                 "recognizer: the word pair acceptor in OpenFst text format or the "
+                                                 "ARPA n-gram model of the sentences generated from the grammar. "
+                                                 "The model is validated on the generated sentences",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--format", nargs='?', default='arpa', choices=['arpa', 'fst'],
+                        help="Output format, the word pair fst over-generates a lot, use it with --min_in_grammar 0")
+    parser.add_argument("--out", nargs='?', default='',
+                        help="Output file, data/calc/grammar.fst.txt or data/calc/grammar.arpa by default")
+    parser.add_argument("--symbols", nargs='?', default='data/calc/words.txt', help="Word symbol table of the fst")
+    parser.add_argument("--order", nargs='?', type=int, default=3, help="Order of the n-gram model")
+    parser.add_argument("--size", nargs='?', type=int, default=5000, help="Generated sentences to train the n-grams")
+    parser.add_argument("--max_tokens", nargs='?', type=int, default=40, help="Max tokens of a generated sentence")
+    parser.add_argument("--seed", nargs='?', type=int, default=1, help="Seed of the generated sentences")
+    parser.add_argument("--validate", nargs='?', type=int, default=300,
+                        help="Held-out generated sentences and samples of the model to validate, 0 - do not validate")
+    parser.add_argument("--min_in_grammar", nargs='?', type=float, default=0.3,
+                        help="Fail if a smaller share of the samples of the model is parsed by the grammar")
+    args = parser.parse_args(args=param)
+
+    grammar = nltk.data.load(args.grammar, format="cfg")
+    out = args.out or DEFAULT_OUT[args.format]
+    if args.format == "fst":
+        model = WordGraph(grammar)
+        with open(args.symbols, "w", encoding="utf-8") as f:
+            f.write(model.symbols())
+        text = model.to_fst()
+        accepts = model.accepts
+        logger.info("Word graph: %d words, %d arcs" % (len(model.words), sum(len(n) for n in model.next.values())))
+    else:
+        model = NgramModel(order=args.order, vocab=get_leaves(grammar))
+        for tokens in sentences(grammar, args.size, args.seed, args.max_tokens):
+            model.add(tokens)
+        text = model.to_arpa()
+
+        def accepts(tokens: List[str]) -> bool:
+            return math.isfinite(model.logprob(tokens))
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(text)
+    logger.info("Saved %s" % out)
+    if args.validate <= 0:
+        return
+    held_out = sentences(grammar, args.validate, args.seed + 1, args.max_tokens)
+    rejected = [t for t in held_out if not accepts(t)]
+    if args.format == "arpa":
+        words = sum(len(t) + 1 for t in held_out)
+        logger.info("Held-out perplexity: %.2f" % 10 ** (-sum(model.logprob(t) for t in held_out) / words))
+    cfg = Calculator(file=args.grammar, engine="int", budget=ParseBudget())
+    in_rate = precision(cfg, lambda rnd: model.sample(rnd, args.max_tokens), args.validate, args.seed)
+    logger.info("In grammar samples of the model: %.1f%%" % (100 * in_rate))
+    if in_rate < args.min_in_grammar:
+        logger.error("In grammar samples of the model %.1f%% < %.1f%%" % (100 * in_rate, 100 * args.min_in_grammar))
+        sys.exit(1)
+    if rejected:
+        logger.error("Rejected %d of %d grammar sentences, e.g. `%s`" %
+                     (len(rejected), len(held_out), " ".join(rejected[0])))
+        sys.exit(1)
+    logger.info("Accepted all %d held-out grammar sentences" % len(held_out))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
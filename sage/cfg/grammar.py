@@ -1,9 +1,20 @@
+import itertools
+import pickle
 from collections import OrderedDict
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
 
 import nltk
+from nltk.parse.chart import LeafEdge
 
+from sage.cfg.artifact import load_artifact
+from sage.cfg.budget import ParseBudget, TooComplex
+from sage.cfg.chunker import NumberChunker, add_number_productions
+from sage.cfg.engine import IntGrammar, IntChartParser
+from sage.cfg.incremental import IncrementalParser
+from sage.cfg.optimizer import has_helpers, unfold_helpers
 from sage.cfg.parser import ParseError
+from sage.cfg.pcfg import best_tree, complete_logprobs, load_logprobs
+from sage.cfg.repair import RepairIndex
 from sage.logger import logger
 
 
@@ -44,66 +55,291 @@ def extract_unknown_word(param: str) -> str | None:
     return None
 
 
+def make_leaves_map(grammar) -> dict:
+    prefixes = OrderedDict()
+    add_to_dict(prefixes, ['dešimt'], 10)
+    add_to_dict(prefixes, ['vienuolik'], 11)
+    add_to_dict(prefixes, ['dvylik'], 12)
+    add_to_dict(prefixes, ['trylik'], 13)
+    add_to_dict(prefixes, ['keturiolik'], 14)
+    add_to_dict(prefixes, ['penkiolik'], 15)
+    add_to_dict(prefixes, ['šešiolik'], 16)
+    add_to_dict(prefixes, ['septyniolik'], 17)
+    add_to_dict(prefixes, ['aštuoniolik'], 18)
+    add_to_dict(prefixes, ['devyniolik'], 19)
+    add_to_dict(prefixes, ['dvidešimt'], 20)
+    add_to_dict(prefixes, ['trisdešimt'], 30)
+    add_to_dict(prefixes, ['keturiasdešimt'], 40)
+    add_to_dict(prefixes, ['penkiasdešimt'], 50)
+    add_to_dict(prefixes, ['šešiasdešimt'], 60)
+    add_to_dict(prefixes, ['septyniasdešimt'], 70)
+    add_to_dict(prefixes, ['aštuoniasdešimt'], 80)
+    add_to_dict(prefixes, ['devyniasdešimt'], 90)
+    add_to_dict(prefixes, ["šimt"], 100)
+    add_to_dict(prefixes, ["tūkstan"], 1000)
+    add_to_dict(prefixes, ["milijon"], 1000000)
+    add_to_dict(prefixes, ['vien', 'pirm'], 1)
+    add_to_dict(prefixes, ['du', 'dviej', 'dvi', 'kvadrat', 'antr'], 2)
+    add_to_dict(prefixes, ['trys', 'tri', 'kubu', 'kubin', 'treč', 'trej'], 3)
+    add_to_dict(prefixes, ['ketur', 'ketvirt'], 4)
+    add_to_dict(prefixes, ['penk'], 5)
+    add_to_dict(prefixes, ['šeš'], 6)
+    add_to_dict(prefixes, ['septyn', 'septin'], 7)
+    add_to_dict(prefixes, ['aštuon', 'aštunt'], 8)
+    add_to_dict(prefixes, ['devyn', 'devin'], 9)
+
+    res = dict()
+    leaves = get_leaves(grammar)
+    add_to_dict(res,
+                ["plius", 'pridėti', 'atimti', 'minus', 'dalint', 'dalinti', 'dalinta', 'padalint', 'padalinti',
+                 'padalinta', 'dauginti', 'dauginta', 'padauginti', 'padauginta', 'kart',
+                 "pakelta", 'pakelti', 'laipsniu', 'laipsnio',
+                 "iš", "kablelis", "skliaustai", "skliausteliuose", "šaknis", "apskliausta", "sveikas",
+                 "sveiki",
+                 "vardiklyje", "skliaustuose", "skliausteliai", "atsidaro", "atsidarantys", "atviras",
+                 "skliaustelis", "užsidaro", "uždaras", "apskliausti", "šaknies", "šaknys", "pošaknyje",
+                 "trupmena", "skaitiklyje", "ir", "visa", "tai"], 0)
+    for leave in leaves:
+        if leave not in res:
+            v = try_get_value(prefixes, leave)
+            res[leave] = v
+    return res
+
+
+def prepare_grammar_data(file: str, chunk_numbers: bool = True, repair_index: bool = False) -> dict:
+    """
+        loads the grammar and precalculates what `Calculator` needs
+        :param repair_index: build the index of `repair_words`, it takes longer than the rest
+        """
+    grammar = nltk.data.load(file, format="cfg")
+    leaves_map = make_leaves_map(grammar)
+    res = {"grammar": grammar, "leaves_map": leaves_map}
+    if repair_index:
+        res["repair_index"] = pickle.dumps(RepairIndex(get_leaves(grammar)), protocol=pickle.HIGHEST_PROTOCOL)
+    if chunk_numbers:
+        res["chunker"] = NumberChunker(grammar, leaves_map)
+        res["parse_grammar"] = add_number_productions(grammar)
+    return res
+
+
+def load_repair_index(data: dict) -> RepairIndex:
+    """:return: the index of the artifact, it is kept pickled there and loaded only by the calculators using it"""
+    if "repair_index" in data:
+        return pickle.loads(data["repair_index"])
+    return RepairIndex(get_leaves(data["grammar"]))
+
+
+def take_first_parse(trees: List[nltk.Tree]) -> nltk.Tree:
+    return trees[0]
+
+
+def shallowest_parse(trees: List[nltk.Tree]) -> nltk.Tree:
+    """selects the tree with the smallest height, the first one wins on ties"""
+    return min(trees, key=lambda t: t.height())
+
+
+def first_tree(chart, edge, memo=None):
+    """
+        builds only the first tree of the edge - the one NLTK would yield first - without
+        enumerating the other child pointer lists
+        :return: tree or None if the edge produces no (acyclic) tree
+        """
+    if memo is None:
+        memo = {}
+    if edge in memo:
+        return memo[edge]
+    if isinstance(edge, LeafEdge):
+        return edge.lhs()
+    # mark as in progress - cyclic derivations yield no tree, same as in nltk.Chart.trees
+    memo[edge] = None
+    res = None
+    for cpl in chart.child_pointer_lists(edge):
+        children = []
+        for cp in cpl:
+            ch = first_tree(chart, cp, memo)
+            if ch is None:
+                break
+            children.append(ch)
+        else:
+            res = nltk.Tree(edge.lhs().symbol(), children)
+            break
+    memo[edge] = res
+    return res
+
+
+class BudgetChartParser(nltk.ChartParser):
+    """Chart parser checking the `ParseBudget` on every agenda step"""
+
+    def __init__(self, grammar, budget: ParseBudget = None, **parser_args):
+        super().__init__(grammar, **parser_args)
+        self.budget = budget
+
+    def chart_parse(self, tokens, trace=None):
+        chart, _ = self.run_agenda(tokens, stop_at_root=False)
+        return chart
+
+    def run_agenda(self, tokens, stop_at_root: bool):
+        """:return: chart and the first complete root edge if `stop_at_root` or None"""
+        tokens = list(tokens)
+        self._grammar.check_coverage(tokens)
+        check = self.budget.start(tokens) if self.budget else None
+        chart = self._chart_class(tokens)
+        grammar = self._grammar
+        start, end = grammar.start(), chart.num_leaves()
+
+        def is_root(e):
+            return stop_at_root and e.is_complete() and e.lhs() == start and e.start() == 0 and e.end() == end
+
+        for axiom in self._axioms:
+            for edge in axiom.apply(chart, grammar):
+                if is_root(edge):
+                    return chart, edge
+        agenda = chart.edges()
+        agenda.reverse()
+        while agenda:
+            if check:
+                check.check(chart.num_edges())
+            edge = agenda.pop()
+            for rule in self._inference_rules:
+                for new_edge in rule.apply(chart, grammar, edge):
+                    if is_root(new_edge):
+                        return chart, new_edge
+                    agenda.append(new_edge)
+        return chart, None
+
+
+class FirstParseChartParser(BudgetChartParser):
+    """Chart parser that stops as soon as the first complete parse of the whole input is in the chart"""
+
+    def chart_parse_first(self, tokens):
+        return self.run_agenda(tokens, stop_at_root=True)
+
+    def parse(self, tokens, tree_class=nltk.Tree):
+        chart, edge = self.chart_parse_first(tokens)
+        if edge is not None:
+            tree = first_tree(chart, edge)
+            if tree is not None:
+                yield tree
+                return
+            # cyclic derivation only - fall back to the full chart
+            yield from super().parse(tokens, tree_class=tree_class)
+
+
+class ViterbiChartParser(BudgetChartParser):
+    """Builds the whole chart within the budget and yields only the most probable tree"""
+
+    def __init__(self, grammar, logprobs: Dict, budget: ParseBudget = None, **parser_args):
+        super().__init__(grammar, budget=budget, **parser_args)
+        self.logprobs = complete_logprobs(grammar, logprobs)
+
+    def parse(self, tokens, tree_class=nltk.Tree):
+        tree = best_tree(self.chart_parse(tokens), self._grammar.start(), self.logprobs)
+        if tree is not None:
+            yield tree
+
+
 class Calculator:
-    def __init__(self, file):
-        self.grammar = nltk.data.load(file, format="cfg")
+    def __init__(self, file, first_parse: bool = True,
+                 select_parse: Callable[[List[nltk.Tree]], nltk.Tree] = take_first_parse,
+                 chunk_numbers: bool = True, compiled_file: str = None, engine: str = "nltk",
+                 budget: ParseBudget = None, weights: str = None, repair_words: bool = False):
+        """
+            :param first_parse: stop parsing at the first complete tree, `select_parse` is not used then
+            :param select_parse: policy selecting the best tree from all parses
+            :param chunk_numbers: collapse plain numeral spans into single pre-valued tokens before parsing
+            :param compiled_file: grammar artifact prepared by `sage.cfg.compile_grammar`, `file` is loaded if
+                the artifact is missing or outdated
+            :param engine: `nltk` - nltk chart parser, `int` - `IntChartParser` over integer coded grammar, it finds
+                the same first parse, supports only `first_parse` mode, `viterbi` - the most probable tree of the
+                whole chart by the `weights`
+            :param budget: limits of a single parse, `parse` raises `TooComplex` if they are exceeded
+            :param weights: weighted grammar made by `sage.cfg.train_pcfg`, required by the `viterbi` engine
+            :param repair_words: replace the words unknown to the grammar with the nearest leaves by the edit distance
+                before parsing, `UnknownWord` is raised only for the words without a close leaf
+            """
+        if engine not in ("nltk", "int", "viterbi"):
+            raise ValueError("Unknown parse engine `%s`" % engine)
+        if engine == "int" and not first_parse:
+            raise ValueError("Engine `int` supports only the first parse mode")
+        if engine == "viterbi" and not weights:
+            raise ValueError("Engine `viterbi` needs the weights")
+        data = None
+        if compiled_file:
+            data = load_artifact(compiled_file, cfg_file=file)
+        if data is None:
+            data = prepare_grammar_data(file, chunk_numbers=chunk_numbers)
+        self.grammar = data["grammar"]
+        self.__leaves_map = data["leaves_map"]
+        # grammar rewritten by `sage.cfg.optimize_grammar`
+        self.__unfold = has_helpers(self.grammar)
         logger.info("Init Grammar")
-        self.__parser = nltk.ChartParser(grammar=self.grammar)
+        self.__first_parse = first_parse
+        self.__select_parse = select_parse
+        self.__chunker = None
+        self.__repair = load_repair_index(data) if repair_words else None
+        self.budget = budget
+        parse_grammar = self.grammar
+        if chunk_numbers:
+            self.__chunker = data["chunker"]
+            parse_grammar = data["parse_grammar"]
+        self.__parser = self.__make_parser(engine, parse_grammar, weights)
+
+    def __make_parser(self, engine: str, parse_grammar: nltk.CFG, weights: str):
+        if engine == "int":
+            # coding the grammar is faster than unpickling it
+            return IntChartParser(IntGrammar(parse_grammar), budget=self.budget)
+        if engine == "viterbi":
+            return ViterbiChartParser(parse_grammar, load_logprobs(weights), budget=self.budget)
+        if self.__first_parse:
+            return FirstParseChartParser(grammar=parse_grammar, budget=self.budget)
+        return BudgetChartParser(grammar=parse_grammar, budget=self.budget)
 
     def leaves_map(self) -> dict:
-        prefixes = OrderedDict()
-        add_to_dict(prefixes, ['dešimt'], 10)
-        add_to_dict(prefixes, ['vienuolik'], 11)
-        add_to_dict(prefixes, ['dvylik'], 12)
-        add_to_dict(prefixes, ['trylik'], 13)
-        add_to_dict(prefixes, ['keturiolik'], 14)
-        add_to_dict(prefixes, ['penkiolik'], 15)
-        add_to_dict(prefixes, ['šešiolik'], 16)
-        add_to_dict(prefixes, ['septyniolik'], 17)
-        add_to_dict(prefixes, ['aštuoniolik'], 18)
-        add_to_dict(prefixes, ['devyniolik'], 19)
-        add_to_dict(prefixes, ['dvidešimt'], 20)
-        add_to_dict(prefixes, ['trisdešimt'], 30)
-        add_to_dict(prefixes, ['keturiasdešimt'], 40)
-        add_to_dict(prefixes, ['penkiasdešimt'], 50)
-        add_to_dict(prefixes, ['šešiasdešimt'], 60)
-        add_to_dict(prefixes, ['septyniasdešimt'], 70)
-        add_to_dict(prefixes, ['aštuoniasdešimt'], 80)
-        add_to_dict(prefixes, ['devyniasdešimt'], 90)
-        add_to_dict(prefixes, ["šimt"], 100)
-        add_to_dict(prefixes, ["tūkstan"], 1000)
-        add_to_dict(prefixes, ["milijon"], 1000000)
-        add_to_dict(prefixes, ['vien', 'pirm'], 1)
-        add_to_dict(prefixes, ['du', 'dviej', 'dvi', 'kvadrat', 'antr'], 2)
-        add_to_dict(prefixes, ['trys', 'tri', 'kubu', 'kubin', 'treč', 'trej'], 3)
-        add_to_dict(prefixes, ['ketur', 'ketvirt'], 4)
-        add_to_dict(prefixes, ['penk'], 5)
-        add_to_dict(prefixes, ['šeš'], 6)
-        add_to_dict(prefixes, ['septyn', 'septin'], 7)
-        add_to_dict(prefixes, ['aštuon', 'aštunt'], 8)
-        add_to_dict(prefixes, ['devyn', 'devin'], 9)
-
-        res = dict()
-        leaves = get_leaves(self.grammar)
-        add_to_dict(res,
-                    ["plius", 'pridėti', 'atimti', 'minus', 'dalint', 'dalinti', 'dalinta', 'padalint', 'padalinti',
-                     'padalinta', 'dauginti', 'dauginta', 'padauginti', 'padauginta', 'kart',
-                     "pakelta", 'pakelti', 'laipsniu', 'laipsnio',
-                     "iš", "kablelis", "skliaustai", "skliausteliuose", "šaknis", "apskliausta", "sveikas",
-                     "sveiki",
-                     "vardiklyje", "skliaustuose", "skliausteliai", "atsidaro", "atsidarantys", "atviras",
-                     "skliaustelis", "užsidaro", "uždaras", "apskliausti", "šaknies", "šaknys", "pošaknyje",
-                     "trupmena", "skaitiklyje", "ir", "visa", "tai"], 0)
-        for leave in leaves:
-            if leave not in res:
-                v = try_get_value(prefixes, leave)
-                res[leave] = v
+        return self.__leaves_map
+
+    def new_session(self) -> Optional[IncrementalParser]:
+        """
+            :return: incremental parse session for `parse` and `feed` or None if the engine does not support it
+            """
+        if isinstance(self.__parser, IntChartParser):
+            return IncrementalParser(self.__parser.grammar(), budget=self.budget)
+        return None
+
+    def __tokens(self, txt: str) -> List[str]:
+        tokens = txt.split()
+        if self.__repair is not None:
+            tokens = self.__repair.repair(tokens)
+        if self.__chunker is not None:
+            tokens = self.__chunker.chunk(tokens)
+        return tokens
+
+    def feed(self, txt: str, session: IncrementalParser):
+        """parses a partial hypothesis in the session ahead of the final text, errors are ignored"""
+        try:
+            for _ in session.feed(self.__tokens(txt)):
+                pass
+        except Exception as err:
+            logger.debug("partial parse failed: %s" % err)
+
+    def __trees(self, tokens: List[str], session: Optional[IncrementalParser]) -> List[nltk.Tree]:
+        if session is not None:
+            res = list(session.parse(tokens))
+        elif self.__first_parse:
+            res = list(itertools.islice(self.__parser.parse(tokens), 1))
+        else:
+            res = list(self.__parser.parse(tokens))
+        if self.__unfold:
+            res = [unfold_helpers(t) for t in res]
         return res
 
-    def parse(self, txt: str):
+    def parse(self, txt: str, session: IncrementalParser = None):
+        """:param session: session from `new_session` - reuses the work done for the previous hypotheses"""
         logger.debug("got %s " % txt)
+        tokens = self.__tokens(txt)
         try:
-            res = list(self.__parser.parse(txt.split()))
+            res = self.__trees(tokens, session)
+        except TooComplex:
+            raise
         except ValueError as err:
             w = extract_unknown_word(str(err))
             if w:
@@ -114,7 +350,9 @@ class Calculator:
             logger.critical(err, exc_info=True)
             return None, False
         if len(res) > 0:
-            return res[0], True
+            if self.__first_parse:
+                return res[0], True
+            return self.__select_parse(res), True
         return None, True
 
 
@@ -0,0 +1,139 @@
+from typing import List, Optional
+
+from sage.cfg.budget import ParseBudget, BudgetCheck
+from sage.cfg.engine import IntGrammar, IntChart, NONE, apply_rules
+
+
+class Checkpoint:
+    def __init__(self, num_edges: int, journal_len: int, agenda: List[int], pointer: int):
+        self.num_edges = num_edges
+        self.journal_len = journal_len
+        self.agenda = agenda
+        self.pointer = pointer
+
+
+class IncrementalParser:
+    """
+        Parse session for a token sequence that grows word by word and may be revised, e.g. ASR partial hypotheses.
+
+        It runs the same agenda as `IntChartParser`, but the run can be paused and resumed. Until the run looks at
+        the token `q` for the first time it depends only on the tokens before `q`, so a checkpoint is saved at that
+        moment for every `q`. A new hypothesis rolls the chart back to the checkpoint of the common prefix and
+        continues from there, the result is the same first tree as `IntChartParser` gives for the whole sequence.
+        The budget is checked between the steps only, so the session stays consistent after `TooComplex`
+        """
+
+    def __init__(self, grammar: IntGrammar, budget: ParseBudget = None):
+        self.__g = grammar
+        self.budget = budget
+        self.__check: Optional[BudgetCheck] = None
+        self.__tokens: List[str] = []
+        self.__chart = IntChart(grammar, self.__tokens)
+        self.__chart.journal = []
+        # agenda is the stack of derived edges, the initial edges - leaves, then empty edges - are taken
+        # by `pointer` when the stack is empty
+        self.__agenda: List[int] = []
+        self.__pointer = 0
+        self.__checkpoints: List[Checkpoint] = []
+        self.__root = NONE
+        self.__insert_empty(0)
+
+    def tokens(self) -> List[str]:
+        return self.__tokens
+
+    def parse(self, tokens: List[str]):
+        """yields the first tree of the tokens, parsing stops as soon as it is found"""
+        self.__update(tokens)
+        while self.__root == NONE and self.__step():
+            pass
+        if self.__root != NONE:
+            yield self.__chart.tree(self.__root)
+
+    def feed(self, tokens: List[str]):
+        """builds the whole chart of the tokens ahead of the next `parse` call, yields the first tree"""
+        self.__update(tokens)
+        while self.__step():
+            pass
+        if self.__root != NONE:
+            yield self.__chart.tree(self.__root)
+
+    def __update(self, tokens: List[str]):
+        tokens = list(tokens)
+        self.__g.cfg.check_coverage(tokens)
+        self.__check = self.budget.start(tokens) if self.budget else None
+        old = self.__tokens
+        p = 0
+        while p < len(old) and p < len(tokens) and old[p] == tokens[p]:
+            p += 1
+        if p == len(old) == len(tokens):
+            # collapsed numerals compare by the token only, take the new values
+            self.__tokens[:] = tokens
+            return
+        # the run is the same for all sequences with this prefix until the checkpoint `p`
+        while len(self.__checkpoints) <= p:
+            self.__step()
+        cp = self.__checkpoints[p]
+        chart = self.__chart
+        chart.rollback(cp.num_edges, cp.journal_len)
+        self.__agenda = list(cp.agenda)
+        self.__pointer = cp.pointer
+        del self.__checkpoints[p + 1:]
+        for i in range(p, len(old)):
+            chart.remove_leaf(i)
+        self.__tokens[:] = tokens
+        chart.ensure_positions(len(tokens))
+        for i in range(p, len(tokens)):
+            chart.insert_leaf(i, self.__g.symbols[tokens[i]])
+        for i in range(len(tokens) + 1):
+            self.__insert_empty(i)
+        self.__root = self.__find_root()
+
+    def __insert_empty(self, i: int):
+        for p in self.__g.empty:
+            if self.__chart.edge_id((p, 0, i, i)) == NONE:
+                self.__chart.insert_empty(p, i)
+
+    def __find_root(self) -> int:
+        n = len(self.__tokens)
+        for e in self.__chart.complete_at[0].get(self.__g.start, []):
+            if self.__chart.end[e] == n:
+                return e
+        return NONE
+
+    def __initial(self, k: int) -> int:
+        n = len(self.__tokens)
+        if k < n:
+            return self.__chart.edge_id((NONE, 0, k, k + 1))
+        k -= n
+        return self.__chart.edge_id((self.__g.empty[k // (n + 1)], 0, k % (n + 1), k % (n + 1)))
+
+    def __save_checkpoint(self):
+        self.__checkpoints.append(Checkpoint(self.__chart.num_edges(), len(self.__chart.journal), list(self.__agenda),
+                                             self.__pointer))
+
+    def __step(self) -> bool:
+        """processes one agenda edge, returns False if the run is finished"""
+        g, chart = self.__g, self.__chart
+        if self.__check:
+            self.__check.check(chart.num_edges())
+        n = len(self.__tokens)
+        q = len(self.__checkpoints)
+        if self.__agenda:
+            edge = self.__agenda[-1]
+            nxt = chart.next[edge]
+            if q <= n and chart.end[edge] == q and nxt != NONE and g.terminal[nxt]:
+                self.__save_checkpoint()
+            self.__agenda.pop()
+        else:
+            if q <= n and self.__pointer == q:
+                self.__save_checkpoint()
+            if self.__pointer >= n + len(g.empty) * (n + 1):
+                return False
+            edge = self.__initial(self.__pointer)
+            self.__pointer += 1
+        for e in apply_rules(g, chart, edge):
+            self.__agenda.append(e)
+            if self.__root == NONE and chart.next[e] == NONE and chart.sym[e] == g.start and \
+                    chart.start[e] == 0 and chart.end[e] == n:
+                self.__root = e
+        return True
@@ -0,0 +1,221 @@
+import math
+import random
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+import nltk
+from nltk import Nonterminal
+
+from sage.cfg.optimizer import remove_useless
+
+BOS = "<s>"
+EOS = "</s>"
+EPS = "<eps>"
+
+
+def nullable(productions: List) -> Set[Nonterminal]:
+    """:return: the nonterminals deriving the empty sentence"""
+    res: Set[Nonterminal] = set()
+    changed = True
+    while changed:
+        changed = False
+        for pr in productions:
+            if pr.lhs() not in res and all(s in res for s in pr.rhs()):
+                res.add(pr.lhs())
+                changed = True
+    return res
+
+
+def edge_words(productions: List, null: Set[Nonterminal], first: bool) -> Dict[Nonterminal, Set[str]]:
+    """:return: the words starting (`first`) or ending the sentences of every nonterminal"""
+    res: Dict[Nonterminal, Set[str]] = {pr.lhs(): set() for pr in productions}
+    changed = True
+    while changed:
+        changed = False
+        for pr in productions:
+            words = res[pr.lhs()]
+            size = len(words)
+            for s in (pr.rhs() if first else reversed(pr.rhs())):
+                if not isinstance(s, Nonterminal):
+                    words.add(s)
+                    break
+                words.update(res[s])
+                if s not in null:
+                    break
+            changed = changed or len(words) != size
+    return res
+
+
+def word_pairs(grammar: nltk.CFG) -> Set[Tuple[str, str]]:
+    """
+        :return: the pairs of words following each other in the sentences of the grammar, the sentence starts and
+            ends are the pairs with `BOS` and `EOS`. The set is exact: every pair occurs in some sentence
+        """
+    productions = remove_useless(grammar.productions(), grammar.start())
+    null = nullable(productions)
+    first, last = edge_words(productions, null, True), edge_words(productions, null, False)
+
+    def words(s, edges):
+        return edges[s] if isinstance(s, Nonterminal) else {s}
+
+    res = set()
+    for pr in productions:
+        rhs = pr.rhs()
+        for i in range(len(rhs)):
+            for j in range(i + 1, len(rhs)):
+                res.update((a, b) for a in words(rhs[i], last) for b in words(rhs[j], first))
+                if rhs[j] not in null:
+                    break
+    start = grammar.start()
+    res.update((BOS, w) for w in first.get(start, set()))
+    res.update((w, EOS) for w in last.get(start, set()))
+    if start in null:
+        res.add((BOS, EOS))
+    return res
+
+
+class WordGraph:
+    """
+        Finite-state approximation of the grammar: a state per word, an arc between two words if they follow each
+        other in some sentence. It accepts every sentence of the grammar and more - the recursion of the grammar is
+        not kept
+        """
+
+    def __init__(self, grammar: nltk.CFG):
+        self.next: Dict[str, List[str]] = dict()
+        for a, b in sorted(word_pairs(grammar)):
+            self.next.setdefault(a, []).append(b)
+        self.words = sorted({w for w in self.next if w != BOS} | {w for n in self.next.values() for w in n} - {EOS})
+
+    def accepts(self, tokens: List[str]) -> bool:
+        prev = BOS
+        for t in tokens + [EOS]:
+            if t not in self.next.get(prev, []):
+                return False
+            prev = t
+        return True
+
+    def sample(self, rnd: random.Random, max_tokens: int) -> List[str]:
+        """:return: a random walk of up to `max_tokens` words, it may end in a non final state"""
+        res, prev = [], BOS
+        while len(res) < max_tokens:
+            prev = rnd.choice(self.next.get(prev, [EOS]))
+            if prev == EOS:
+                break
+            res.append(prev)
+        return res
+
+    def symbols(self) -> str:
+        """:return: OpenFst symbol table of the words, `EPS` is 0"""
+        return "".join("%s %d\n" % (w, i) for i, w in enumerate([EPS] + self.words))
+
+    def to_fst(self) -> str:
+        """
+            :return: OpenFst text format of the word acceptor (as a transducer of the same input and output words),
+                the arcs leaving a state get the uniform probability, the costs are -ln(p)
+            """
+        states = {w: i + 1 for i, w in enumerate(self.words)}
+        states[BOS] = 0
+        arcs, finals = [], []
+        for a in [BOS] + self.words:
+            nxt = self.next.get(a, [])
+            if not nxt:
+                continue
+            cost = math.log(len(nxt))
+            for b in nxt:
+                if b == EOS:
+                    finals.append("%d %.6f\n" % (states[a], cost))
+                else:
+                    arcs.append("%d %d %s %s %.6f\n" % (states[a], states[b], b, b, cost))
+        return "".join(arcs + finals)
+
+
+class NgramModel:
+    """
+        Witten-Bell interpolated n-gram model of sentences, written in the ARPA format. Every word of `vocab` gets
+        a probability even if it is not seen in the training sentences
+        """
+
+    def __init__(self, order: int = 3, vocab: Iterable[str] = ()):
+        self.order = order
+        self.counts: List[Counter] = [Counter() for _ in range(order + 1)]
+        self.vocab = set(vocab)
+        self.__contexts: Dict[Tuple, Tuple[int, int]] = dict()
+        self.__probs: Dict[Tuple, float] = dict()
+
+    def add(self, tokens: List[str]):
+        seq = [BOS] + tokens + [EOS]
+        self.vocab.update(tokens)
+        for i in range(1, len(seq)):
+            for n in range(1, min(self.order, i + 1) + 1):
+                self.counts[n][tuple(seq[i - n + 1:i + 1])] += 1
+        self.__contexts, self.__probs = dict(), dict()
+
+    def __words(self) -> List[str]:
+        return sorted(self.vocab | {EOS})
+
+    def __context(self, h: Tuple) -> Tuple[int, int]:
+        """:return: the count and the number of different words following the context"""
+        if not self.__contexts:
+            self.__contexts[()] = (0, 0)
+            for n in range(1, self.order + 1):
+                for ng, c in self.counts[n].items():
+                    total, types = self.__contexts.get(ng[:-1], (0, 0))
+                    self.__contexts[ng[:-1]] = (total + c, types + 1)
+        return self.__contexts.get(h, (0, 0))
+
+    def prob(self, ngram: Tuple) -> float:
+        """:return: P(ngram[-1] | ngram[:-1])"""
+        res = self.__probs.get(ngram)
+        if res is not None:
+            return res
+        if len(ngram) == 1:
+            lower = 1 / len(self.__words())
+        else:
+            lower = self.prob(ngram[1:])
+        total, types = self.__context(ngram[:-1])
+        res = lower if total == 0 else (self.counts[len(ngram)][ngram] + types * lower) / (total + types)
+        self.__probs[ngram] = res
+        return res
+
+    def backoff(self, h: Tuple) -> float:
+        # the mass left for the unseen words of the interpolated model
+        total, types = self.__context(h)
+        return types / (total + types) if total else 1.0
+
+    def history(self, tokens: List[str]) -> Tuple:
+        return tuple(([BOS] + tokens)[-(self.order - 1):]) if self.order > 1 else ()
+
+    def logprob(self, tokens: List[str]) -> float:
+        """:return: log10 probability of the sentence, the end of the sentence included"""
+        return sum(math.log10(self.prob(self.history(tokens[:i]) + (w,))) for i, w in enumerate(tokens + [EOS]))
+
+    def sample(self, rnd: random.Random, max_tokens: int) -> List[str]:
+        words = self.__words()
+        res = []
+        while len(res) < max_tokens:
+            h = self.history(res)
+            w = rnd.choices(words, weights=[self.prob(h + (w,)) for w in words])[0]
+            if w == EOS:
+                break
+            res.append(w)
+        return res
+
+    def __ngrams(self, n: int) -> List[Tuple]:
+        if n == 1:
+            return [(w,) for w in [BOS] + self.__words()]
+        return sorted(self.counts[n])
+
+    def to_arpa(self) -> str:
+        sections = [self.__ngrams(n) for n in range(1, self.order + 1)]
+        res = ["\\data\\\n"] + ["ngram %d=%d\n" % (n + 1, len(s)) for n, s in enumerate(sections)]
+        for n, ngrams in enumerate(sections, start=1):
+            res.append("\n\\%d-grams:\n" % n)
+            for ng in ngrams:
+                p = -99 if ng == (BOS,) else math.log10(self.prob(ng))
+                line = "%.6f\t%s" % (p, " ".join(ng))
+                if n < self.order and self.__context(ng)[0] > 0:
+                    line += "\t%.6f" % math.log10(self.backoff(ng))
+                res.append(line + "\n")
+        res.append("\n\\end\\\n")
+        return "".join(res)
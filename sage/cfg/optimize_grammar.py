@@ -0,0 +1,78 @@
+import argparse
+import sys
+from typing import List, Dict, Set, Tuple
+
+from sage.cfg.batch import Worker
+from sage.cfg.benchmark import load_corpus
+from sage.cfg.corpus import generate_corpus
+from sage.cfg.evaluator import init_operations as init_eval_operations
+from sage.cfg.grammar import Calculator
+from sage.cfg.optimizer import Optimizer, grammar_to_str
+from sage.cfg.parser import init_operations, init_base_operations
+from sage.logger import logger
+
+
+def protected_labels() -> Set[str]:
+    """labels the evaluation relies on"""
+    return set(init_operations(init_base_operations())) | set(init_eval_operations())
+
+
+def verify(grammar: str, optimized: str, engine: str, corpus: List[str]) -> Tuple[List[Dict], float]:
+    """:return: differences of the results calculated with the grammars and the speedup of the optimized grammar,
+        0.1 is 10% less calculation time, a negative one is a slowdown"""
+    workers = [Worker(grammar, "", engine), Worker(optimized, "", engine)]
+    res, took = [], [0.0, 0.0]
+    for i, txt in enumerate(corpus):
+        results = []
+        for k, w in enumerate(workers):
+            r = w.process((i, txt))
+            took[k] += r.pop("took")
+            results.append(r)
+        if results[0] != results[1]:
+            res.append({"text": txt, "original": results[0], "optimized": results[1]})
+    speedup = took[0] / took[1] - 1 if took[1] > 0 else 0.0
+    logger.info("Calculated %d sentences in %.3fs with the original grammar, in %.3fs with the optimized one, "
+                "speedup %.1f%%" % (len(corpus), took[0], took[1], speedup * 100))
+    return res, speedup
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Rewrites the grammar into an equivalent one that parses faster and "
+                                                 "verifies that it gives the same results on the corpus",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--out", nargs='?', default='data/calc/grammar.opt.cfg', help="Optimized grammar file")
+    parser.add_argument("--corpus", nargs='?', default='',
+                        help="File with a sentence per line, sentences of sage/cfg/cases.py by default")
+    parser.add_argument("--generated", nargs='?', type=int, default=2000,
+                        help="Sentences generated from the grammar added to the corpus of the check")
+    parser.add_argument("--seed", nargs='?', type=int, default=1, help="Seed of the generated sentences")
+    parser.add_argument("--parse_engine", nargs='?', default='int', choices=['int', 'nltk'],
+                        help="Grammar parser implementation")
+    parser.add_argument("--min_speedup", nargs='?', type=float, default=None,
+                        help="Fail if the optimized grammar is not faster by this fraction, e.g. 0.05, "
+                             "only a warning on no speedup by default")
+    args = parser.parse_args(args=param)
+
+    cfg = Calculator(file=args.grammar, engine=args.parse_engine)
+    optimized = Optimizer(cfg.grammar, protected_labels()).optimize()
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write("# Generated from %s by sage.cfg.optimize_grammar, do not edit\n\n" % args.grammar)
+        f.write(grammar_to_str(optimized))
+    logger.info("Saved %s: %d productions, %d in the original" %
+                (args.out, len(optimized.productions()), len(cfg.grammar.productions())))
+    corpus = load_corpus(args.corpus) + [c["text"] for c in generate_corpus(cfg.grammar, args.generated,
+                                                                            seed=args.seed)]
+    diffs, speedup = verify(args.grammar, args.out, args.parse_engine, corpus)
+    for d in diffs:
+        print("DIFF `%s`: %s vs %s" % (d["text"], d["original"], d["optimized"]))
+    print("Speedup with %s: %.1f%%" % (args.parse_engine, speedup * 100))
+    if speedup <= 0:
+        logger.warning("The optimized grammar is not faster with the %s engine" % args.parse_engine)
+    if diffs or (args.min_speedup is not None and speedup < args.min_speedup):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,202 @@
+from collections import Counter
+from typing import List, Set, Dict, Tuple, Callable
+
+import nltk
+from nltk import Nonterminal
+from nltk.grammar import Production
+
+# prefix of the nonterminals added by the optimizer, their nodes are spliced into the parent node of the tree
+HELPER_PREFIX = "_"
+
+
+def is_helper(label) -> bool:
+    return isinstance(label, str) and label.startswith(HELPER_PREFIX)
+
+
+def has_helpers(grammar: nltk.CFG) -> bool:
+    return any(is_helper(pr.lhs().symbol()) for pr in grammar.productions())
+
+
+def unfold_helpers(tree):
+    """:return: the tree of the original grammar - the children of helper nodes moved to their parents"""
+    if not isinstance(tree, nltk.Tree):
+        return tree
+    children = []
+    for ch in tree:
+        ch = unfold_helpers(ch)
+        if isinstance(ch, nltk.Tree) and is_helper(ch.label()):
+            children.extend(ch)
+        else:
+            children.append(ch)
+    return nltk.Tree(tree.label(), children)
+
+
+def remove_useless(productions: List[Production], start: Nonterminal) -> List[Production]:
+    """removes productions with unproductive symbols - not deriving any sentence, then unreachable from `start`"""
+    productive: Set[Nonterminal] = set()
+    changed = True
+    while changed:
+        changed = False
+        for pr in productions:
+            if pr.lhs() not in productive and \
+                    all(s in productive for s in pr.rhs() if isinstance(s, Nonterminal)):
+                productive.add(pr.lhs())
+                changed = True
+    productions = [pr for pr in productions
+                   if pr.lhs() in productive and all(s in productive for s in pr.rhs() if isinstance(s, Nonterminal))]
+    by_lhs: Dict[Nonterminal, List[Production]] = dict()
+    for pr in productions:
+        by_lhs.setdefault(pr.lhs(), []).append(pr)
+    reachable, todo = {start}, [start]
+    while todo:
+        for pr in by_lhs.get(todo.pop(), []):
+            for s in pr.rhs():
+                if isinstance(s, Nonterminal) and s not in reachable:
+                    reachable.add(s)
+                    todo.append(s)
+    return [pr for pr in productions if pr.lhs() in reachable]
+
+
+def remove_duplicates(productions: List[Production]) -> List[Production]:
+    return list(dict.fromkeys(productions))
+
+
+def merge_equivalent(productions: List[Production], protected: Set[str]) -> List[Production]:
+    """
+        merges not protected nonterminals with identical alternatives into one.
+        Preterminals are not merged, the chunker and the leaves map rely on their labels
+        """
+    while True:
+        alternatives: Dict[Nonterminal, Set[Tuple]] = dict()
+        for pr in productions:
+            alternatives.setdefault(pr.lhs(), set()).add(pr.rhs())
+        same: Dict[frozenset, Nonterminal] = dict()
+        replace: Dict[Nonterminal, Nonterminal] = dict()
+        for lhs, alts in alternatives.items():
+            if lhs.symbol() in protected or all(is_lexical(rhs) for rhs in alts):
+                continue
+            key = frozenset(alts)
+            if key in same:
+                replace[lhs] = same[key]
+            else:
+                same[key] = lhs
+        if not replace:
+            return productions
+        productions = remove_duplicates([Production(pr.lhs(), [replace.get(s, s) for s in pr.rhs()])
+                                         for pr in productions if pr.lhs() not in replace])
+
+
+def is_lexical(rhs) -> bool:
+    return all(not isinstance(s, Nonterminal) for s in rhs)
+
+
+class Optimizer:
+    """
+        Rewrites the grammar into an equivalent one with fewer chart edges.
+        Productions sharing a prefix are left factored: `A -> X Y Z | X Y W` becomes `A -> X Y _A_1`,
+        `_A_1 -> Z | W`, so the chart predicts `X Y` once. Prefixes of two symbols shared by productions of different
+        nonterminals, e.g. `Vienet SIMTAS` of the `Simt...` families, are extracted into a helper nonterminal too.
+        Helper nonterminals start with `HELPER_PREFIX`, `unfold_helpers` turns the trees back into the trees of the
+        original grammar, so the labels the evaluator relies on are kept.
+        Left recursion is kept: the chart parser handles it, and the evaluator relies on the left associative trees.
+        The productions of the protected nonterminals are not factored: the evaluator reads their children by the
+        count and the position, and the helpers there change the order the chart finds the trees of an ambiguous
+        sentence, e.g. `IsraiskaSkl -> IsraiskaSkl Dalyba Gilyn Plius Israiskaplus` is found before
+        `IsraiskaSkl -> IsraiskaSkl Dalyba Israiskaplus`. The rewritten grammar derives the same trees,
+        `sage.cfg.optimize_grammar` verifies that the first ones give the same results on a generated corpus
+        """
+
+    def __init__(self, grammar: nltk.CFG, protected: Set[str]):
+        for pr in grammar.productions():
+            if is_helper(pr.lhs().symbol()):
+                raise ValueError("Grammar already has the helper nonterminal `%s`" % pr.lhs())
+        self.grammar = grammar
+        self.protected = set(protected) | {grammar.start().symbol()}
+        self.__helpers = 0
+
+    def optimize(self) -> nltk.CFG:
+        start = self.grammar.start()
+        res = remove_duplicates(self.grammar.productions())
+        res = remove_useless(res, start)
+        res = merge_equivalent(res, self.protected)
+        res = self.left_factor(res)
+        res = self.extract_shared_pairs(res)
+        # factoring makes identical helpers
+        res = merge_equivalent(res, self.protected)
+        return nltk.CFG(start, res)
+
+    def __helper(self, name: str) -> Nonterminal:
+        self.__helpers += 1
+        return Nonterminal("%s%s_%d" % (HELPER_PREFIX, name, self.__helpers))
+
+    def __factored(self, pr: Production) -> bool:
+        return pr.lhs().symbol() not in self.protected
+
+    def extract_shared_pairs(self, productions: List[Production]) -> List[Production]:
+        while True:
+            pairs = Counter(pr.rhs()[:2] for pr in productions if len(pr.rhs()) > 2 and self.__factored(pr))
+            shared = [p for p, n in pairs.items() if n > 1]
+            if not shared:
+                return productions
+            helpers = {p: self.__helper("P") for p in shared}
+            res = [Production(h, p) for p, h in helpers.items()]
+            for pr in productions:
+                h = helpers.get(pr.rhs()[:2]) if len(pr.rhs()) > 2 and self.__factored(pr) else None
+                res.append(pr if h is None else Production(pr.lhs(), (h,) + pr.rhs()[2:]))
+            productions = res
+
+    def left_factor(self, productions: List[Production]) -> List[Production]:
+        by_lhs: Dict[Nonterminal, List[Production]] = dict()
+        for pr in productions:
+            by_lhs.setdefault(pr.lhs(), []).append(pr)
+        res = []
+        for lhs, prods in by_lhs.items():
+            if lhs.symbol() in self.protected:
+                res.extend(prods)
+            else:
+                res.extend(self.__factor(lhs, [pr.rhs() for pr in prods]))
+        return res
+
+    def __factor(self, lhs: Nonterminal, alternatives: List[Tuple]) -> List[Production]:
+        groups: Dict = dict()
+        for rhs in alternatives:
+            groups.setdefault(rhs[:1], []).append(rhs)
+        res = []
+        for first, group in groups.items():
+            longer = [rhs for rhs in group if len(rhs) > 1]
+            if len(longer) < 2:
+                res.extend(Production(lhs, rhs) for rhs in group)
+                continue
+            n = common_prefix(longer)
+            prefix = longer[0][:n]
+            rest = [rhs[n:] for rhs in longer if len(rhs) > n]
+            # alternatives equal to a part of the prefix stay
+            res.extend(Production(lhs, rhs) for rhs in group if len(rhs) <= n)
+            if not rest:
+                continue
+            if len(rest) == 1:
+                res.append(Production(lhs, prefix + rest[0]))
+                continue
+            h = self.__helper(lhs.symbol().lstrip(HELPER_PREFIX))
+            res.append(Production(lhs, prefix + (h,)))
+            res.extend(self.__factor(h, rest))
+        return res
+
+
+def common_prefix(sequences: List[Tuple]) -> int:
+    n = 0
+    while all(len(s) > n and s[n] == sequences[0][n] for s in sequences):
+        n += 1
+    return n
+
+
+def grammar_to_str(grammar: nltk.CFG, weight: Callable[[Production], str] = lambda pr: "") -> str:
+    """:return: the grammar in the `.cfg` format, a line per nonterminal, the start symbol first"""
+    by_lhs: Dict[Nonterminal, List[str]] = {grammar.start(): []}
+    for pr in grammar.productions():
+        by_lhs.setdefault(pr.lhs(), []).append(" ".join(s.symbol() if isinstance(s, Nonterminal) else repr(s)
+                                                        for s in pr.rhs()) + weight(pr))
+    lines = []
+    for lhs, alts in by_lhs.items():
+        lines.append("%s -> %s" % (lhs.symbol(), " | ".join(alts)))
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,6 @@
 import math
+import time
+from fractions import Fraction
 from typing import Any, List, Dict
 
 import nltk as nltk
@@ -8,7 +10,17 @@ from sage.logger import logger
 
 class ParseError(Exception):
     """Base class for parse exceptions"""
-    pass
+
+    def __reduce__(self):
+        # the errors cross process boundaries, see `sage.cfg.pool`, the attributes are restored without `__init__`
+        return restore_error, (type(self), self.__dict__)
+
+
+def restore_error(cls, state: dict) -> ParseError:
+    res = cls.__new__(cls)
+    Exception.__init__(res, state.get("message", ""))
+    res.__dict__.update(state)
+    return res
 
 
 class UnknownLeave(ParseError):
@@ -38,6 +50,43 @@ class UnknownOperation(ParseError):
         super().__init__(self.message)
 
 
+class EvaluationLimit(ParseError):
+    """Raised when the evaluation runs out of its time budget"""
+
+    def __init__(self, took: float):
+        self.message = "Evaluation took over %.2fs" % took
+        self.took = took
+        super().__init__(self.message)
+
+
+# exact integer results above the size are calculated in floats, such integers are still fast to calculate and to
+# print (python refuses to print integers of more than 4300 digits)
+MAX_EXACT_BITS = 8192
+
+
+class Deadline:
+    """Wall-clock budget of the evaluation"""
+
+    def __init__(self, seconds: float):
+        self.__start = time.monotonic()
+        self.__seconds = seconds
+
+    def check(self):
+        took = time.monotonic() - self.__start
+        if took > self.__seconds:
+            raise EvaluationLimit(took)
+
+
+class NumberToken(str):
+    """Token replacing a span of numeral words, it matches the grammar as a terminal and keeps the span's value"""
+
+    def __new__(cls, token: str, value: Any = 0, words=()):
+        res = super().__new__(cls, token)
+        res.value = value
+        res.words = words
+        return res
+
+
 class ResultNode:
     def __init__(self, node: nltk.Tree = None, node_value: str = ""):
         self.nodes = []
@@ -71,9 +120,7 @@ class ResultParser:
         return res
 
     def to_str(self, value):
-        if value == round(value):
-            return str(round(value))
-        return str(value)
+        return number_to_str(value)
 
     def calculate(self, node: ResultNode):
         for ch in node.nodes:
@@ -86,6 +133,8 @@ class ResultParser:
             if v is None:
                 raise UnknownOperation(node.nltk_node.label())
             node.value = v(node.nodes)
+        elif isinstance(node.node_value, NumberToken):
+            node.value = node.node_value.value
         else:
             v = self.leaves_map.get(node.node_value)
             if v is None:
@@ -312,7 +361,7 @@ def process_skl_des(base_op, nodes: List[ResultNode]) -> Any:
     if (len(nodes)) == 4:
         return get_op(base_op, "Skliaustai")(exec_simple_op(base_op, nodes[0:3]))
     if (len(nodes)) == 3:
-        return nodes[0].value ** nodes[1].value
+        return op_pow(nodes[0].value, nodes[1].value)
     if (len(nodes)) == 2:
         return get_op(base_op, "Skliaustai")(nodes[0].value)
     raise NotImplementedOperation("process_skl_des")
@@ -376,8 +425,18 @@ def process_op(base_op, nodes: List[ResultNode]) -> Any:
     return nodes[0].value
 
 
+def bounded(value) -> Any:
+    """:return: the integer over `MAX_EXACT_BITS` as a float, a signed infinity if it overflows"""
+    if isinstance(value, int) and value.bit_length() > MAX_EXACT_BITS:
+        try:
+            return float(value)
+        except OverflowError:
+            return math.inf if value > 0 else -math.inf
+    return value
+
+
 def op_plius(v1, v2) -> Any:
-    return v1 + v2
+    return bounded(v1 + v2)
 
 
 def op_plius_eq(v1, v2) -> Any:
@@ -389,11 +448,28 @@ def op_skaic_su_trupm_eq(v1, v2) -> Any:
 
 
 def op_dalint(v1, v2) -> Any:
-    return v1 / v2
+    return divide(v1, v2)
+
+
+def divide(v1, v2) -> Any:
+    """`v1 / v2` of the integers out of the float range as well, a too large quotient gives a signed infinity"""
+    try:
+        return v1 / v2
+    except OverflowError:
+        pass
+    # one of them is an integer over the float range
+    if isinstance(v1, float) and not math.isfinite(v1):
+        return v1 if v2 > 0 else -v1
+    if isinstance(v2, float) and not math.isfinite(v2):
+        return 0.0 if math.isinf(v2) else v2
+    try:
+        return float(Fraction(v1) / Fraction(v2))
+    except OverflowError:
+        return math.inf if (v1 > 0) == (v2 > 0) else -math.inf
 
 
 def op_daugint(v1, v2) -> Any:
-    return v1 * v2
+    return bounded(v1 * v2)
 
 
 def op_daugint_eq(v1, v2) -> Any:
@@ -405,7 +481,7 @@ def op_dalint_eq(v1, v2) -> Any:
 
 
 def op_minus(v1, v2) -> Any:
-    return v1 - v2
+    return bounded(v1 - v2)
 
 
 def op_minus_eq(v1, v2) -> Any:
@@ -413,7 +489,32 @@ def op_minus_eq(v1, v2) -> Any:
 
 
 def op_laipsnis(nodes: List[ResultNode]) -> Any:
-    return nodes[0].value ** nodes[1].value
+    return op_pow(nodes[0].value, nodes[1].value)
+
+
+def op_pow(base, exp) -> Any:
+    """
+        `base ** exp` with the cost bounded by the result size: if the exact integer result may exceed
+        `MAX_EXACT_BITS` it is calculated in floats, a float overflow gives a signed infinity
+        """
+    if isinstance(base, int) and isinstance(exp, int):
+        if exp <= 0 or abs(base) <= 1 or abs(base).bit_length() * exp <= MAX_EXACT_BITS:
+            return base ** exp
+    try:
+        return float(base) ** exp
+    except OverflowError:
+        if base < 0 and isinstance(exp, int) and exp % 2 == 1:
+            return -math.inf
+        return math.inf
+
+
+def number_to_str(value) -> str:
+    value = bounded(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if value == round(value):
+        return str(round(value))
+    return str(value)
 
 
 def op_laipsnis_eq(nodes: List[ResultNode]) -> Any:
@@ -0,0 +1,97 @@
+import math
+from collections import Counter
+from typing import Dict, Optional, List
+
+import nltk
+from nltk.grammar import Production, ProbabilisticProduction
+from nltk.parse.chart import LeafEdge
+
+from sage.cfg.optimizer import grammar_to_str
+
+NO_TREE = float("-inf")
+
+
+def plain(pr: Production) -> Production:
+    return Production(pr.lhs(), pr.rhs())
+
+
+def load_logprobs(file: str) -> Dict[Production, float]:
+    """:return: log2 probabilities of the productions of the weighted grammar made by `sage.cfg.train_pcfg`"""
+    grammar = nltk.data.load(file, format="pcfg")
+    return {plain(pr): pr.logprob() for pr in grammar.productions()}
+
+
+def complete_logprobs(grammar: nltk.CFG, logprobs: Dict[Production, float]) -> Dict[Production, float]:
+    """
+        adds the productions of the grammar missing in the weights - the collapsed numerals, the rules added after
+        the training - with the uniform probability of the alternatives of their nonterminal
+        """
+    res = dict()
+    for pr in grammar.productions():
+        p = plain(pr)
+        lp = logprobs.get(p)
+        if lp is None:
+            lp = -math.log2(len(grammar.productions(lhs=pr.lhs())))
+        res[p] = lp
+    return res
+
+
+def estimate(grammar: nltk.CFG, counts: Counter, alpha: float = 1.0) -> nltk.PCFG:
+    """relative frequencies of the productions with add-`alpha` smoothing"""
+    res = []
+    for lhs in dict.fromkeys(pr.lhs() for pr in grammar.productions()):
+        prods = grammar.productions(lhs=lhs)
+        total = sum(counts[plain(pr)] for pr in prods) + alpha * len(prods)
+        for pr in prods:
+            res.append(ProbabilisticProduction(lhs, pr.rhs(), prob=(counts[plain(pr)] + alpha) / total))
+    return nltk.PCFG(grammar.start(), res)
+
+
+def pcfg_to_str(grammar: nltk.PCFG) -> str:
+    return grammar_to_str(grammar, weight=lambda pr: " [%.12f]" % pr.prob())
+
+
+def best_tree(chart, start: nltk.Nonterminal, logprobs: Dict[Production, float]) -> Optional[nltk.Tree]:
+    """
+        Viterbi search over the packed forest of the chart: the tree with the highest product of the production
+        probabilities. Cycles are only among the edges of the same span - unit and empty productions - so the spans
+        are scored from the shortest and the edges of a span are relaxed until the scores do not improve
+        :return: the best tree of `start` over the whole input or None
+        """
+    spans: Dict[int, List] = dict()
+    for e in chart.edges():
+        if e.is_complete() and not isinstance(e, LeafEdge):
+            spans.setdefault(e.end() - e.start(), []).append(e)
+    best: Dict = dict()
+    for length in sorted(spans):
+        while relax(chart, spans[length], logprobs, best):
+            pass
+    roots = [e for e in chart.select(start=0, end=chart.num_leaves(), is_complete=True, lhs=start) if e in best]
+    if not roots:
+        return None
+    return build_tree(max(roots, key=lambda e: score(e, best)), best)
+
+
+def score(edge, best: Dict) -> float:
+    if isinstance(edge, LeafEdge):
+        return 0.0
+    return best[edge][0] if edge in best else NO_TREE
+
+
+def relax(chart, edges: List, logprobs: Dict[Production, float], best: Dict) -> bool:
+    """:return: True if a score of the edges improved"""
+    res = False
+    for e in edges:
+        lp = logprobs.get(Production(e.lhs(), e.rhs()), NO_TREE)
+        for cpl in chart.child_pointer_lists(e):
+            s = lp + sum(score(ch, best) for ch in cpl)
+            if s > score(e, best):
+                best[e] = (s, cpl)
+                res = True
+    return res
+
+
+def build_tree(edge, best: Dict):
+    if isinstance(edge, LeafEdge):
+        return edge.lhs()
+    return nltk.Tree(edge.lhs().symbol(), [build_tree(ch, best) for ch in best[edge][1]])
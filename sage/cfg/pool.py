@@ -0,0 +1,182 @@
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, Tuple, Any
+
+from sage.backoff import Backoff
+from sage.cfg.budget import TooComplex
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import Calculator
+from sage.cfg.parser import EvaluationLimit
+from sage.logger import logger
+
+READY = "ready"
+
+# (understood, (result, latex) or None if the expression is not complete)
+Calculation = Tuple[bool, Optional[Tuple[str, str]]]
+
+
+class CalcState:
+    """grammar and evaluator of a worker process, loaded once"""
+
+    def __init__(self, calc_args: dict, eval_time_limit: float):
+        self.cfg = Calculator(**calc_args)
+        self.evaluator = Evaluator(leaves_map=self.cfg.leaves_map(), time_limit=eval_time_limit)
+
+
+def calculate(state: CalcState, txt: str) -> Calculation:
+    """parses and evaluates the text the same way `CalculatorBot.process` does"""
+    tree, ok = state.cfg.parse(txt)
+    if not ok or tree is None:
+        return ok, None
+    return True, state.evaluator.evaluate(tree)
+
+
+def worker_main(conn, calc_args: dict, eval_time_limit: float, job: Callable[[CalcState, Any], Any]):
+    try:
+        state = CalcState(calc_args, eval_time_limit)
+    except BaseException as err:
+        conn.send(RuntimeError("Worker failed to start: %s: %s" % (type(err).__name__, err)))
+        return
+    conn.send(READY)
+    while True:
+        arg = conn.recv()
+        if arg is None:
+            break
+        try:
+            res = (True, job(state, arg))
+        except BaseException as err:
+            res = (False, err)
+        try:
+            conn.send(res)
+        except BaseException as err:
+            # unpicklable result or error
+            conn.send((False, RuntimeError("%s: %s" % (type(err).__name__, err))))
+
+
+class CalculatorPool:
+    """
+        Warm worker processes calculating the texts off the caller's thread, every worker loads the grammar once.
+        `submit` returns a future. A job running longer than `timeout` kills its worker, the job fails with
+        `EvaluationLimit`, and a fresh worker takes its place. While a worker fails to start, the jobs fail with the
+        start error and the start is retried with a backoff. The exceeded parse limits of the workers are counted in
+        the budget of `calc_args`
+        """
+
+    def __init__(self, workers: int, calc_args: dict, eval_time_limit: float = 1.0, timeout: float = 5.0,
+                 job: Callable[[CalcState, Any], Any] = calculate, retry_delay: float = 1.0,
+                 max_retry_delay: float = 60.0):
+        logger.info("Init calculator pool of %d workers" % workers)
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.__args = (calc_args, eval_time_limit, job)
+        self.__budget = calc_args.get("budget")
+        self.__ctx = multiprocessing.get_context("spawn")
+        self.__jobs: queue.Queue = queue.Queue()
+        self.__threads = [threading.Thread(target=self.__serve, daemon=True, name="calc-pool-%d" % i)
+                          for i in range(workers)]
+        self.__ready = threading.Semaphore(0)
+        for th in self.__threads:
+            th.start()
+
+    def wait_ready(self):
+        """blocks until all the workers have loaded the grammar or failed to"""
+        for _ in self.__threads:
+            self.__ready.acquire()
+        for _ in self.__threads:
+            self.__ready.release()
+
+    def submit(self, arg) -> Future:
+        res = Future()
+        self.__jobs.put((arg, res))
+        return res
+
+    def close(self):
+        for _ in self.__threads:
+            self.__jobs.put(None)
+        for th in self.__threads:
+            th.join()
+
+    def __start(self):
+        conn, child_conn = self.__ctx.Pipe()
+        proc = self.__ctx.Process(target=worker_main, args=(child_conn, *self.__args), daemon=True)
+        proc.start()
+        child_conn.close()
+        try:
+            msg = conn.recv()
+        except EOFError:
+            msg = RuntimeError("Worker died while starting")
+        if msg != READY:
+            proc.join()
+            raise msg if isinstance(msg, BaseException) else RuntimeError("Worker failed to start")
+        return proc, conn
+
+    def __try_start(self, backoff: Backoff):
+        """:return: (process, connection) or None if the worker failed to start"""
+        try:
+            res = self.__start()
+        except BaseException as err:
+            backoff.failed(err)
+            logger.error("Calculator worker failed to start, retry in %.1fs: %s" % (backoff.wait(), err))
+            return None
+        backoff.succeeded()
+        return res
+
+    def __serve(self):
+        backoff = Backoff(self.retry_delay, self.max_retry_delay)
+        worker = self.__try_start(backoff)
+        self.__ready.release()
+        while True:
+            if worker is None and backoff.wait() == 0:
+                worker = self.__try_start(backoff)
+                continue
+            try:
+                item = self.__jobs.get(timeout=None if worker is not None else backoff.wait())
+            except queue.Empty:
+                continue
+            if item is None:
+                if worker is not None:
+                    worker[1].send(None)
+                    worker[0].join()
+                return
+            worker = self.__serve_job(worker, item, backoff)
+
+    def __serve_job(self, worker, item, backoff: Backoff):
+        """:return: the worker to serve the next job, None if it failed to start"""
+        arg, fut = item
+        if not fut.set_running_or_notify_cancel():
+            return worker
+        if worker is None:
+            fut.set_exception(backoff.error)
+            return None
+        proc, conn = worker
+        if self.__run(proc, conn, arg, fut):
+            return worker
+        proc.kill()
+        proc.join()
+        return self.__try_start(backoff)
+
+    def __run(self, proc, conn, arg, fut: Future) -> bool:
+        """:return: False if the worker is stuck or dead"""
+        start = time.monotonic()
+        try:
+            conn.send(arg)
+            if not conn.poll(self.timeout):
+                logger.warning("Killing worker %d, job `%s` took over %.2fs" % (proc.pid, arg, self.timeout))
+                fut.set_exception(EvaluationLimit(time.monotonic() - start))
+                return False
+            ok, res = conn.recv()
+        except (EOFError, OSError) as err:
+            logger.error("Worker %d died: %s" % (proc.pid, err))
+            fut.set_exception(RuntimeError("Worker died"))
+            return False
+        if ok:
+            fut.set_result(res)
+        else:
+            if isinstance(res, TooComplex) and self.__budget is not None:
+                self.__budget.count(res.reason)
+            fut.set_exception(res)
+        return True
@@ -0,0 +1,204 @@
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Dict
+
+import nltk
+from nltk.grammar import Production
+from nltk.parse.chart import LeafEdge
+
+from sage.cfg.benchmark import load_corpus
+from sage.cfg.corpus import generate_corpus
+from sage.cfg.grammar import prepare_grammar_data
+from sage.logger import logger
+
+SORT_KEYS = ("edges", "parses", "time_ms")
+
+
+class Stats:
+    def __init__(self):
+        self.edges = 0
+        self.complete = 0
+        self.parses = 0
+        self.time_ms = 0.0
+
+    def add(self, other: "Stats"):
+        self.edges += other.edges
+        self.complete += other.complete
+        self.parses += other.parses
+        self.time_ms += other.time_ms
+
+    def to_dict(self) -> dict:
+        return {"edges": self.edges, "complete": self.complete, "parses": self.parses, "time_ms": self.time_ms}
+
+
+def production_of(edge) -> Production:
+    return Production(edge.lhs(), edge.rhs())
+
+
+class ParseCounter:
+    """
+        Counts parses of the chart without building the trees: an edge takes part in
+        `inside(edge) * outside(edge)` parses - derivations below it times contexts above it.
+        Cyclic derivations add nothing
+        """
+
+    def __init__(self, chart, start: nltk.Nonterminal):
+        self.chart = chart
+        self.complete = [e for e in chart.edges() if e.is_complete() and not isinstance(e, LeafEdge)]
+        self.roots = set(chart.select(start=0, end=chart.num_leaves(), is_complete=True, lhs=start))
+        self.__inside: Dict = dict()
+        self.__outside: Dict = dict()
+        self.__parents: Dict = defaultdict(list)
+        for e in self.complete:
+            for cpl in chart.child_pointer_lists(e):
+                for i, ch in enumerate(cpl):
+                    if not isinstance(ch, LeafEdge):
+                        self.__parents[ch].append((e, cpl, i))
+
+    def inside(self, edge) -> int:
+        if isinstance(edge, LeafEdge):
+            return 1
+        if edge in self.__inside:
+            return self.__inside[edge]
+        self.__inside[edge] = 0
+        res = 0
+        for cpl in self.chart.child_pointer_lists(edge):
+            res += self.__product(cpl, -1)
+        self.__inside[edge] = res
+        return res
+
+    def outside(self, edge) -> int:
+        if edge in self.__outside:
+            return self.__outside[edge]
+        self.__outside[edge] = 0
+        res = 1 if edge in self.roots else 0
+        for parent, cpl, i in self.__parents[edge]:
+            res += self.outside(parent) * self.__product(cpl, i)
+        self.__outside[edge] = res
+        return res
+
+    def __product(self, children, skip: int) -> int:
+        res = 1
+        for j, ch in enumerate(children):
+            if j != skip:
+                res *= self.inside(ch)
+        return res
+
+
+class ChartProfiler:
+    """
+        Parses sentences into the full chart and collects, per production:
+        `edges` - chart edges created (complete and incomplete), `complete` - complete ones,
+        `parses` - occurrences of the production in all the parse trees, counted without building the trees,
+        `time_ms` - time spent applying the chart rules to the edges of the production
+        """
+
+    def __init__(self, grammar: nltk.CFG, chunker=None):
+        self.grammar = grammar
+        self.chunker = chunker
+        self.parser = nltk.ChartParser(grammar)
+        self.stats: Dict[Production, Stats] = defaultdict(Stats)
+        self.sentences = []
+
+    def profile(self, txt: str):
+        tokens = txt.split()
+        if self.chunker is not None:
+            tokens = self.chunker.chunk(tokens)
+        try:
+            chart, took = self.__parse(tokens)
+        except ValueError as err:
+            logger.warning("Skip `%s`: %s" % (txt, err))
+            return
+        parses = self.__count_parses(chart)
+        self.sentences.append({"text": txt, "edges": chart.num_edges(), "parses": parses, "time_ms": took})
+
+    def __parse(self, tokens):
+        """the agenda loop of `nltk.ChartParser.chart_parse` timing every edge"""
+        p = self.parser
+        p._grammar.check_coverage(tokens)
+        chart = p._chart_class(tokens)
+        start_all = time.perf_counter()
+        for axiom in p._axioms:
+            for _ in axiom.apply(chart, p._grammar):
+                pass
+        agenda = chart.edges()
+        agenda.reverse()
+        while agenda:
+            edge = agenda.pop()
+            start = time.perf_counter()
+            for rule in p._inference_rules:
+                agenda.extend(rule.apply(chart, p._grammar, edge))
+            if not isinstance(edge, LeafEdge):
+                self.stats[production_of(edge)].time_ms += (time.perf_counter() - start) * 1000
+        for edge in chart.edges():
+            if not isinstance(edge, LeafEdge):
+                s = self.stats[production_of(edge)]
+                s.edges += 1
+                s.complete += edge.is_complete()
+        return chart, (time.perf_counter() - start_all) * 1000
+
+    def __count_parses(self, chart) -> int:
+        counter = ParseCounter(chart, self.grammar.start())
+        for e in counter.complete:
+            self.stats[production_of(e)].parses += counter.inside(e) * counter.outside(e)
+        return sum(counter.inside(e) for e in counter.roots)
+
+    def by_nonterminal(self) -> Dict[str, Stats]:
+        res: Dict[str, Stats] = defaultdict(Stats)
+        for pr, s in self.stats.items():
+            res[pr.lhs().symbol()].add(s)
+        return res
+
+
+def print_top(title: str, stats: Dict, sort: str, top: int):
+    print("%-60s %10s %10s %14s %10s" % (title, "edges", "complete", "parses", "time_ms"))
+    for k, s in sorted(stats.items(), key=lambda kv: getattr(kv[1], sort), reverse=True)[:top]:
+        print("%-60s %10d %10d %14d %10.2f" % (str(k)[:60], s.edges, s.complete, s.parses, s.time_ms))
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Reports the chart edges, parses and time per production and "
+                                                 "nonterminal to find expensive ambiguity of the grammar",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--corpus", nargs='?', default='',
+                        help="File with a sentence per line, sentences of sage/cfg/cases.py by default")
+    parser.add_argument("--generate", nargs='?', type=int, default=0,
+                        help="Use so many sentences generated from the grammar instead of the corpus")
+    parser.add_argument("--chunk_numbers", default=True, action=argparse.BooleanOptionalAction,
+                        help="Collapse numerals before parsing")
+    parser.add_argument("--sort", nargs='?', default='edges', choices=SORT_KEYS, help="Sort key")
+    parser.add_argument("--top", nargs='?', type=int, default=30, help="Rows to show")
+    parser.add_argument("--out", nargs='?', default='', help="Save the full report to the json file")
+    args = parser.parse_args(args=param)
+
+    data = prepare_grammar_data(args.grammar, chunk_numbers=args.chunk_numbers)
+    if args.generate:
+        corpus = [c["text"] for c in generate_corpus(data["grammar"], args.generate)]
+    else:
+        corpus = load_corpus(args.corpus)
+    profiler = ChartProfiler(data.get("parse_grammar", data["grammar"]), chunker=data.get("chunker"))
+    for txt in corpus:
+        profiler.profile(txt)
+    logger.info("Profiled %d sentences" % len(profiler.sentences))
+
+    print_top("nonterminal", profiler.by_nonterminal(), args.sort, args.top)
+    print()
+    print_top("production", profiler.stats, args.sort, args.top)
+    print()
+    worst = sorted(profiler.sentences, key=lambda s: s[args.sort], reverse=True)[:min(args.top, 10)]
+    for s in worst:
+        print("%8d edges %12d parses %10.2f ms  %s" % (s["edges"], s["parses"], s["time_ms"], s["text"]))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"nonterminals": {k: s.to_dict() for k, s in profiler.by_nonterminal().items()},
+                       "productions": {str(k): s.to_dict() for k, s in profiler.stats.items()},
+                       "sentences": profiler.sentences}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
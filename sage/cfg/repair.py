@@ -0,0 +1,114 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from sage.logger import logger
+
+
+def deletes(word: str, distance: int) -> Set[str]:
+    """:return: the word and all its variants with up to `distance` characters deleted"""
+    res, level = {word}, {word}
+    for _ in range(distance):
+        level = {w[:i] + w[i + 1:] for w in level for i in range(len(w))}
+        res |= level
+    return res
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+        :return: Damerau-Levenshtein (optimal string alignment) distance or `limit + 1` if it is over the limit,
+            only the band of `limit` cells around the diagonal is calculated
+        """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    prev2, prev = None, [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [over] * (len(b) + 1)
+        if i <= limit:
+            cur[0] = i
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        for j in range(lo, hi + 1):
+            v = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                v = min(v, prev2[j - 2] + 1)
+            cur[j] = min(v, over)
+        if min(cur[lo - 1:hi + 1]) > limit:
+            return over
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def allowed_distance(word: str, max_distance: int) -> int:
+    # short words have too many close neighbours: 1 edit from 4 characters, 2 edits from 8
+    return min(max_distance, len(word) // 4)
+
+
+class RepairIndex:
+    """
+        Deletion neighbourhood index of the grammar leaves: every leaf is stored under all its variants with up to
+        `max_distance` deleted characters. Two words within the edit distance share a variant, so a lookup only
+        generates the variants of the word and checks the few leaves found under them
+        """
+
+    def __init__(self, leaves: Iterable[str], max_distance: int = 2):
+        self.max_distance = max_distance
+        self.__leaves = set(leaves)
+        self.__index: Dict[str, List[str]] = dict()
+        for leaf in sorted(self.__leaves):
+            for d in deletes(leaf, max_distance):
+                self.__index.setdefault(d, []).append(leaf)
+        self.__set_cache()
+        logger.info("Repair index: %d leaves, %d keys" % (len(self.__leaves), len(self.__index)))
+
+    def __set_cache(self):
+        # ASR repeats the same unknown words
+        self.__nearest = lru_cache(maxsize=10000)(self.__find)
+
+    def __getstate__(self):
+        # the cache holds a closure - recreated after unpickling
+        res = self.__dict__.copy()
+        del res["_RepairIndex__nearest"]
+        return res
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__set_cache()
+
+    def __contains__(self, word: str):
+        return word in self.__leaves
+
+    def nearest(self, word: str) -> Optional[str]:
+        """:return: the closest leaf within the allowed distance, None if there is none or the closest is not unique"""
+        if word in self.__leaves:
+            return word
+        return self.__nearest(word)
+
+    def __find(self, word: str) -> Optional[str]:
+        limit = allowed_distance(word, self.max_distance)
+        if limit == 0:
+            return None
+        candidates = set()
+        for d in deletes(word, limit):
+            candidates.update(self.__index.get(d, []))
+        best, res = limit + 1, []
+        for leaf in candidates:
+            dist = edit_distance(word, leaf, limit)
+            if dist < best:
+                best, res = dist, [leaf]
+            elif dist == best:
+                res.append(leaf)
+        if len(res) != 1 or best > limit:
+            return None
+        return res[0]
+
+    def repair(self, tokens: List[str]) -> List[str]:
+        """replaces the unknown tokens with their nearest leaves, the tokens without one are left as they are"""
+        res = []
+        for t in tokens:
+            if t not in self.__leaves:
+                fixed = self.nearest(t)
+                if fixed is not None:
+                    logger.info("Repaired `%s` -> `%s`" % (t, fixed))
+                    t = fixed
+            res.append(t)
+        return res
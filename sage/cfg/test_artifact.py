@@ -0,0 +1,75 @@
+import pickle
+
+import pytest
+
+from sage.cfg.artifact import save_artifact, load_artifact, ARTIFACT_VERSION
+from sage.cfg.grammar import Calculator, prepare_grammar_data
+
+
+def test_save_load(tmp_path):
+    out = str(tmp_path / "grammar.pkl")
+    save_artifact(prepare_grammar_data("data/calc/grammar.cfg"), cfg_file="data/calc/grammar.cfg", out_file=out)
+    data = load_artifact(out, cfg_file="data/calc/grammar.cfg")
+    assert data is not None
+    cfg = Calculator(file="data/calc/grammar.cfg", compiled_file=out)
+    assert cfg.leaves_map() == data["leaves_map"]
+    tree, ok = cfg.parse("du plius trys šimtai")
+    assert ok
+    assert tree is not None
+
+
+def test_load_missing(tmp_path):
+    assert load_artifact(str(tmp_path / "grammar.pkl"), cfg_file="data/calc/grammar.cfg") is None
+
+
+def test_load_outdated(tmp_path):
+    cfg_file = tmp_path / "grammar.cfg"
+    cfg_file.write_text("S -> 'du'\n")
+    out = str(tmp_path / "grammar.pkl")
+    save_artifact({}, cfg_file=str(cfg_file), out_file=out)
+    assert load_artifact(out, cfg_file=str(cfg_file)) == {}
+    cfg_file.write_text("S -> 'trys'\n")
+    assert load_artifact(out, cfg_file=str(cfg_file)) is None
+
+
+def test_load_other_version(tmp_path):
+    out = tmp_path / "grammar.pkl"
+    out.write_bytes(pickle.dumps({"version": ARTIFACT_VERSION + 1, "hash": "", "data": {}}))
+    assert load_artifact(str(out), cfg_file="data/calc/grammar.cfg") is None
+
+
+def test_load_broken(tmp_path):
+    out = tmp_path / "grammar.pkl"
+    out.write_bytes(b"not a pickle")
+    assert load_artifact(str(out), cfg_file="data/calc/grammar.cfg") is None
+    save_artifact({"a": 1}, cfg_file="data/calc/grammar.cfg", out_file=str(out))
+    out.write_bytes(out.read_bytes()[:-3])
+    assert load_artifact(str(out), cfg_file="data/calc/grammar.cfg") is None
+    cfg = Calculator(file="data/calc/grammar.cfg", compiled_file=str(out))
+    assert cfg.parse("du plius trys")[1]
+
+
+def test_header_checked_first(tmp_path):
+    out = tmp_path / "grammar.pkl"
+    out.write_bytes(pickle.dumps({"version": ARTIFACT_VERSION - 1, "hash": ""}) + b"data of other code")
+    assert load_artifact(str(out), cfg_file="data/calc/grammar.cfg") is None
+
+
+def test_save_replaces(tmp_path):
+    out = tmp_path / "grammar.pkl"
+    save_artifact({"a": 1}, cfg_file="data/calc/grammar.cfg", out_file=str(out))
+    with pytest.raises(Exception):
+        save_artifact({"a": lambda: 1}, cfg_file="data/calc/grammar.cfg", out_file=str(out))
+    assert load_artifact(str(out), cfg_file="data/calc/grammar.cfg") == {"a": 1}
+    assert [p.name for p in tmp_path.iterdir()] == ["grammar.pkl"]
+
+
+def test_repair_index_on_demand(tmp_path):
+    assert "repair_index" not in prepare_grammar_data("data/calc/grammar.cfg")
+    out = str(tmp_path / "grammar.pkl")
+    save_artifact(prepare_grammar_data("data/calc/grammar.cfg", repair_index=True), cfg_file="data/calc/grammar.cfg",
+                  out_file=out)
+    cfg = Calculator(file="data/calc/grammar.cfg", compiled_file=out, engine="int", repair_words=True)
+    tree, ok = cfg.parse("du pliuss trys")
+    assert ok
+    assert tree is not None
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from sage.cfg.batch import main, percentile, read_utterances, Worker, TOO_COMPLEX
+from sage.cfg.budget import ParseBudget
+
+texts = ["du plius trys", "du plius olia", "du plius", "penki kart šeši"]
+
+
+@pytest.mark.parametrize("values,p,exp", [([], 50, 0), ([1], 99, 1), ([3, 1, 2], 50, 2), (list(range(1, 101)), 99, 99),
+                                          (list(range(1, 101)), 100, 100), ([1, 2], 0, 1)])
+def test_percentile(values, p, exp):
+    assert percentile(values, p) == exp
+
+
+def test_read_jsonl(tmp_path):
+    file = tmp_path / "in.jsonl"
+    file.write_text("\n".join(json.dumps({"txt": t}) for t in texts) + "\n\n", encoding="utf-8")
+    assert read_utterances(str(file), "txt") == texts
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch(tmp_path, capsys, workers):
+    file, out = tmp_path / "in.txt", tmp_path / "out.jsonl"
+    file.write_text("\n".join(texts), encoding="utf-8")
+    main(["--input", str(file), "--out", str(out), "--workers", str(workers), "--chunksize", "1",
+          "--grammar_compiled", ""])
+    res = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert [r["text"] for r in res] == texts
+    assert [r["status"] for r in res] == ["ok", "unknown_word", "no_parse", "ok"]
+    assert [r.get("result") for r in res] == ["5", None, None, "30"]
+    assert res[1]["error"] == "olia"
+    assert "unknown_word" in capsys.readouterr().err
+
+
+def test_worker_budget():
+    worker = Worker("data/calc/grammar.cfg", "", "int", ParseBudget(max_tokens=2))
+    res = worker.process((0, "du plius trys"))
+    assert res["status"] == TOO_COMPLEX
+    assert res["error"] == "Too complex: tokens limit exceeded (3)"
+    assert worker.process((1, "du"))["status"] == "ok"
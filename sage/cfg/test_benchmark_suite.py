@@ -0,0 +1,37 @@
+import json
+
+from sage.cfg.benchmark_suite import compare, load_baseline, save_baseline
+
+
+def bucket(count, parse_ms, eval_ms=1.0):
+    return {"count": count, "parse_ms": parse_ms, "eval_ms": eval_ms, "result_ms": 1.0, "eq_ms": 1.0}
+
+
+def test_compare():
+    baseline = {"a": bucket(10, 1.0), "b": bucket(2, 1.0), "c": bucket(10, 0.0), "d": bucket(10, 1.0)}
+    current = {"a": bucket(10, 1.6), "b": bucket(2, 10.0), "c": bucket(10, 1.0, eval_ms=1.4), "d": bucket(10, 1.5)}
+    res = compare(current, baseline, tolerance=0.5, min_count=5)
+    assert len(res) == 1
+    assert res[0].startswith("a parse_ms")
+
+
+def test_compare_scaled():
+    baseline = {"a": bucket(10, 1.0)}
+    current = {"a": bucket(10, 2.5, eval_ms=2.5)}
+    assert compare(current, baseline, tolerance=0.5, min_count=5, scale=2.0) == []
+    assert len(compare(current, baseline, tolerance=0.5, min_count=5)) == 2
+
+
+def test_compare_missing_bucket():
+    assert compare({}, {"a": bucket(10, 1.0)}, tolerance=0.5, min_count=5) == []
+
+
+def test_baseline_file(tmp_path):
+    file = str(tmp_path / "baseline.json")
+    config = {"size": 10, "seed": 1}
+    save_baseline(file, config, 50.0, {"a": bucket(10, 1.0)})
+    assert load_baseline(file, config) == ({"a": bucket(10, 1.0)}, 50.0)
+    with open("data/calc/benchmark_baseline.json", encoding="utf-8") as f:
+        recorded = json.load(f)
+    assert recorded["calibration_ms"] > 0
+    assert set(recorded["buckets"]["all"]) == {"count", "parse_ms", "eval_ms", "result_ms", "eq_ms"}
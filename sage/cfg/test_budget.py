@@ -0,0 +1,38 @@
+import pytest
+
+from sage.cfg.budget import ParseBudget, TooComplex, TOKENS, EDGES, TIME
+from sage.cfg.grammar import Calculator
+
+long_sum = " plius ".join(["du", "trys", "penki"] * 5)
+
+
+@pytest.mark.parametrize("engine,first_parse", [("int", True), ("nltk", True), ("nltk", False)])
+@pytest.mark.parametrize("limits,reason", [(dict(max_tokens=5), TOKENS),
+                                           (dict(max_edges=100), EDGES),
+                                           (dict(max_seconds=-1), TIME)])
+def test_too_complex(engine, first_parse, limits, reason):
+    budget = ParseBudget(**limits)
+    cfg = Calculator(file="data/calc/grammar.cfg", engine=engine, first_parse=first_parse, budget=budget)
+    with pytest.raises(TooComplex) as exc_info:
+        cfg.parse(long_sum)
+    assert exc_info.value.reason == reason
+    assert budget.hits()[reason] == 1
+
+
+def test_in_budget():
+    budget = ParseBudget()
+    cfg = Calculator(file="data/calc/grammar.cfg", engine="int", budget=budget)
+    tree, ok = cfg.parse(long_sum)
+    assert ok and tree is not None
+    assert budget.hits() == {TOKENS: 0, EDGES: 0, TIME: 0}
+
+
+def test_session_after_limit():
+    budget = ParseBudget(max_edges=100)
+    cfg = Calculator(file="data/calc/grammar.cfg", engine="int", budget=budget)
+    session = cfg.new_session()
+    cfg.feed(long_sum, session)
+    with pytest.raises(TooComplex):
+        cfg.parse(long_sum, session=session)
+    session.budget = None
+    assert cfg.parse(long_sum, session=session) == Calculator(file="data/calc/grammar.cfg").parse(long_sum)
@@ -0,0 +1,34 @@
+import pytest
+
+from sage.cfg.chunker import NumberChunker
+from sage.cfg.grammar import Calculator
+from sage.cfg.parser import NumberToken
+
+
+@pytest.fixture(scope="module")
+def chunker():
+    cfg = Calculator(file="data/calc/grammar.cfg", chunk_numbers=False)
+    return NumberChunker(cfg.grammar, cfg.leaves_map())
+
+
+@pytest.mark.parametrize("txt,exp",
+                         [("du plius trys", [2, "plius", 3]),
+                          ("trys milijonai keturi šimtai tūkstančių šimtas dešimt", [3400110]),
+                          ("du tūkstančiai šimtas dešimt kart du", [2110, "kart", 2]),
+                          ("du kablelis penki", [2, "kablelis", "penki"]),
+                          ("du penktuoju laipsniu", ["du", "penktuoju", "laipsniu"]),
+                          ("dvi ketvirtosios", ["dvi", "ketvirtosios"]),
+                          ("trys šaknys iš devynių", ["trys", "šaknys", "iš", "devynių"]),
+                          ("šaknis iš dvylikos", ["šaknis", "iš", "dvylikos"]),
+                          ("dešimt minus trys", [10, "minus", 3]),
+                          ])
+def test_chunk(chunker, txt, exp):
+    res = chunker.chunk(txt.split())
+    assert [r.value if isinstance(r, NumberToken) else r for r in res] == exp
+
+
+def test_chunk_token(chunker):
+    res = chunker.chunk("du plius dešimt".split())
+    assert res[0] == "<Sveikas|Sveikas2>"
+    assert res[0].words == ("du",)
+    assert res[2] == "<Sveikas>"
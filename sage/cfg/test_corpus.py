@@ -0,0 +1,36 @@
+import pytest
+
+from sage.cfg.corpus import generate_corpus, bucket, CorpusGenerator, LENGTH_BUCKETS
+from sage.cfg.grammar import Calculator
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    return Calculator(file="data/calc/grammar.cfg", engine="int")
+
+
+@pytest.mark.parametrize("value,exp", [(1, "1-5"), (5, "1-5"), (6, "6-10"), (40, "21-40"), (41, "41+")])
+def test_bucket(value, exp):
+    assert bucket(value, LENGTH_BUCKETS) == exp
+
+
+def test_deterministic(cfg):
+    assert generate_corpus(cfg.grammar, 20, seed=2) == generate_corpus(cfg.grammar, 20, seed=2)
+    assert generate_corpus(cfg.grammar, 20, seed=2) != generate_corpus(cfg.grammar, 20, seed=3)
+
+
+def test_corpus_parses(cfg):
+    corpus = generate_corpus(cfg.grammar, 30, max_tokens=20)
+    assert len(corpus) == 30
+    assert len({c["text"] for c in corpus}) == 30
+    for c in corpus:
+        assert c["tokens"] == len(c["text"].split())
+        tree, ok = cfg.parse(c["text"])
+        assert ok and tree is not None
+
+
+def test_coverage(cfg):
+    gen = CorpusGenerator(cfg.grammar)
+    for _ in range(300):
+        gen.sentence()
+    assert gen.coverage_ratio() > 0.4
@@ -0,0 +1,39 @@
+import pytest
+
+from sage.cfg.cases import result_cases, eq_cases
+from sage.cfg.grammar import Calculator, UnknownWord
+from sage.cfg.parser import ResultParser
+from sage.cfg.test_parser import parse
+
+
+@pytest.fixture(scope="module")
+def cfgs():
+    return Calculator(file="data/calc/grammar.cfg"), Calculator(file="data/calc/grammar.cfg", engine="int")
+
+
+@pytest.mark.parametrize("txt", sorted({c[0] for c in result_cases + eq_cases}) + ["du plius", ""])
+def test_same_tree(cfgs, txt):
+    cfg, cfg_int = cfgs
+    assert cfg_int.parse(txt) == cfg.parse(txt)
+
+
+@pytest.mark.parametrize("txt,exp", result_cases)
+def test_result(cfgs, txt, exp):
+    _, cfg_int = cfgs
+    res, ok = parse(cfg_int, ResultParser(leaves_map=cfg_int.leaves_map()), txt)
+    assert ok
+    assert exp == res
+
+
+def test_unknown_word(cfgs):
+    _, cfg_int = cfgs
+    with pytest.raises(UnknownWord) as exc_info:
+        cfg_int.parse("du plius olia")
+    assert exc_info.value.word == 'olia'
+
+
+def test_wrong_engine():
+    with pytest.raises(ValueError):
+        Calculator(file="data/calc/grammar.cfg", engine="olia")
+    with pytest.raises(ValueError):
+        Calculator(file="data/calc/grammar.cfg", engine="int", first_parse=False)
@@ -0,0 +1,106 @@
+import math
+
+import nltk
+import pytest
+
+from sage.cfg.cases import result_cases, eq_cases
+from sage.cfg.evaluator import Evaluator, render, run, PUSH, APPLY
+from sage.cfg.grammar import Calculator
+from sage.cfg.parser import ResultParser, EqParser, UnknownLeave, EvaluationLimit, op_pow, bounded, divide
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    return Calculator(file="data/calc/grammar.cfg")
+
+
+@pytest.mark.parametrize("txt,exp", result_cases)
+def test_value(cfg, txt, exp):
+    tree, _ = cfg.parse(txt)
+    res, _ = Evaluator(leaves_map=cfg.leaves_map()).evaluate(tree)
+    assert exp == res
+
+
+@pytest.mark.parametrize("txt,exp", eq_cases)
+def test_eq(cfg, txt, exp):
+    tree, _ = cfg.parse(txt)
+    res = Evaluator(leaves_map=cfg.leaves_map()).calculate(tree)
+    assert exp == render(res.latex)
+
+
+@pytest.mark.parametrize("txt", sorted({c[0] for c in result_cases}))
+def test_same_as_parsers(cfg, txt):
+    tree, _ = cfg.parse(txt)
+    exp = ResultParser(leaves_map=cfg.leaves_map()).parse(tree), EqParser(leaves_map=cfg.leaves_map()).parse(tree)
+    assert Evaluator(leaves_map=cfg.leaves_map()).evaluate(tree) == exp
+
+
+def test_unknown_leave(cfg):
+    tree, _ = cfg.parse("du plius trys")
+    with pytest.raises(UnknownLeave):
+        Evaluator(leaves_map={}).evaluate(tree)
+
+
+@pytest.mark.parametrize("latex,exp", [(2, "2"), ("x", "x"),
+                                       (("\\frac{", (1, " + ", 2.5), "}{", 3, "}"), "\\frac{1 + 2.5}{3}")])
+def test_render(latex, exp):
+    assert render(latex) == exp
+
+
+def test_program(cfg):
+    tree, _ = cfg.parse("du plius trys")
+    program = Evaluator(leaves_map=cfg.leaves_map()).compile(tree)
+    assert [p[0] for p in program].count(PUSH) == len(tree.leaves())
+    assert program[-1][:1] + program[-1][2:] == (APPLY, "S", 1)
+    assert run(program).value == 5
+
+
+def test_deep_tree(cfg):
+    tree = nltk.Tree("VIENETAS", ["du"])
+    for _ in range(5000):
+        tree = nltk.Tree("Israiska", [tree])
+    assert Evaluator(leaves_map=cfg.leaves_map()).evaluate(nltk.Tree("S", [tree])) == ("2", "2")
+
+
+@pytest.mark.parametrize("base,exp,res", [(2, 10, 1024), (2, -1, 0.5), (-2, 3, -8), (2.5, 2, 6.25),
+                                          (2, 1000000, math.inf), (-2, 1000001, -math.inf), (-2, 1000000, math.inf),
+                                          (0.5, 1000000, 0.0)])
+def test_pow(base, exp, res):
+    assert op_pow(base, exp) == res
+
+
+def test_pow_bounded(cfg):
+    tree, _ = cfg.parse("du milijonu")
+    assert Evaluator(leaves_map=cfg.leaves_map()).evaluate(tree) == ("inf", "2^{1000000}")
+
+
+@pytest.mark.parametrize("value,res", [(2, 2), (2 ** 1000, float(2 ** 1000)), (2 ** 10000, math.inf),
+                                       (-2 ** 10000, -math.inf), (2.5, 2.5)])
+def test_bounded(value, res):
+    assert bounded(value) == res
+
+
+def test_mul_bounded(cfg):
+    tree, _ = cfg.parse(" kart ".join(["du tūkstantuoju"] * 15))
+    value, _ = Evaluator(leaves_map=cfg.leaves_map()).evaluate(tree)
+    assert value == "inf"
+
+
+@pytest.mark.parametrize("v1,v2,res", [(2 ** 2000, 3, math.inf), (-2 ** 2000, 3, -math.inf), (2 ** 2000, -3, -math.inf),
+                                       (3, 2 ** 2000, 0.0), (2 ** 2000, 2 ** 1999, 2.0), (2.5, 2 ** 2000, 0.0),
+                                       (math.inf, -2 ** 2000, -math.inf), (2 ** 2000, math.inf, 0.0), (6, 3, 2.0)])
+def test_divide(v1, v2, res):
+    assert divide(v1, v2) == res
+
+
+def test_div_bounded(cfg):
+    tree, _ = cfg.parse("du tūkstantuoju kart du tūkstantuoju dalinti iš trys")
+    value, _ = Evaluator(leaves_map=cfg.leaves_map()).evaluate(tree)
+    assert value == "inf"
+    assert ResultParser(leaves_map=cfg.leaves_map()).parse(tree) == "inf"
+
+
+def test_time_limit(cfg):
+    tree, _ = cfg.parse("du plius trys")
+    with pytest.raises(EvaluationLimit):
+        Evaluator(leaves_map=cfg.leaves_map(), time_limit=-1).evaluate(tree)
@@ -1,6 +1,8 @@
 import pytest
 
-from sage.cfg.grammar import extract_unknown_word, Calculator, UnknownWord
+from sage.cfg.cases import result_cases
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import extract_unknown_word, Calculator, UnknownWord, shallowest_parse
 
 
 def test_unknown_word():
@@ -24,3 +26,33 @@ def test_raise_error():
     with pytest.raises(UnknownWord) as exc_info:
         cfg.parse("olia")
     assert exc_info.value.word == 'olia'
+
+
+@pytest.mark.parametrize("txt", ["du", "du plius du kart penki", "skliausteliuose du plius du kart penki",
+                                 "du plius du kart penki visa tai apskliausta plius devyni kart du",
+                                 "trys milijonai keturi šimtai tūkstančių šimtas dešimt", "du plius"])
+def test_first_parse_same_as_all(txt):
+    cfg = Calculator(file="data/calc/grammar.cfg")
+    cfg_all = Calculator(file="data/calc/grammar.cfg", first_parse=False)
+    assert cfg.parse(txt) == cfg_all.parse(txt)
+
+
+@pytest.fixture(scope="module")
+def cfg_all():
+    return Calculator(file="data/calc/grammar.cfg", first_parse=False)
+
+
+@pytest.fixture(scope="module")
+def cfg_shallowest():
+    return Calculator(file="data/calc/grammar.cfg", first_parse=False, select_parse=shallowest_parse)
+
+
+@pytest.mark.parametrize("txt,exp", result_cases)
+def test_select_parse(cfg_all, cfg_shallowest, txt, exp):
+    evaluator = Evaluator(leaves_map=cfg_all.leaves_map())
+    tree, ok = cfg_shallowest.parse(txt)
+    assert ok
+    assert tree is not None
+    tree_all, _ = cfg_all.parse(txt)
+    assert evaluator.evaluate(tree) == evaluator.evaluate(tree_all)
+    assert evaluator.evaluate(tree)[0] == exp
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+from sage.cfg.cases import result_cases, eq_cases
+from sage.cfg.grammar import Calculator, UnknownWord
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    return Calculator(file="data/calc/grammar.cfg", engine="int")
+
+
+def partials(txt):
+    words = txt.split()
+    return [" ".join(words[:i]) for i in range(1, len(words) + 1)]
+
+
+@pytest.mark.parametrize("txt", sorted({c[0] for c in result_cases + eq_cases}))
+def test_growing(cfg, txt):
+    session = cfg.new_session()
+    for p in partials(txt):
+        cfg.feed(p, session)
+    assert cfg.parse(txt, session=session) == cfg.parse(txt)
+
+
+def test_revised(cfg):
+    rnd = random.Random(1)
+    sentences = sorted({c[0] for c in result_cases + eq_cases})
+    session = cfg.new_session()
+    for _ in range(100):
+        txt = rnd.choice(sentences)
+        for p in partials(txt):
+            if rnd.random() < 0.3:
+                cfg.feed(p + " " + rnd.choice(sentences), session)
+            cfg.feed(p, session)
+        assert cfg.parse(txt, session=session) == cfg.parse(txt)
+
+
+def test_unknown_word(cfg):
+    session = cfg.new_session()
+    cfg.feed("du plius olia", session)
+    with pytest.raises(UnknownWord) as exc_info:
+        cfg.parse("du plius olia", session=session)
+    assert exc_info.value.word == 'olia'
+    assert cfg.parse("du plius du", session=session) == cfg.parse("du plius du")
+
+
+def test_no_session_nltk():
+    assert Calculator(file="data/calc/grammar.cfg").new_session() is None
@@ -0,0 +1,102 @@
+import math
+import random
+
+import nltk
+import pytest
+
+from sage.cfg.export_lm import main, sentences
+from sage.cfg.lm import BOS, EOS, NgramModel, WordGraph, word_pairs
+
+small = nltk.CFG.fromstring("""
+S -> A 'c' | 'x' S
+A -> 'a' B |
+B -> 'b' |
+""")
+
+
+def test_word_pairs():
+    assert word_pairs(small) == {(BOS, "a"), (BOS, "c"), (BOS, "x"), ("x", "x"), ("x", "a"), ("x", "c"), ("a", "b"),
+                                 ("a", "c"), ("b", "c"), ("c", EOS)}
+
+
+def test_word_graph():
+    graph = WordGraph(small)
+    assert graph.words == ["a", "b", "c", "x"]
+    assert graph.accepts("x x a b c".split())
+    assert graph.accepts(["c"])
+    assert not graph.accepts("a b".split())
+    assert not graph.accepts("b c".split())
+    assert graph.symbols() == "<eps> 0\na 1\nb 2\nc 3\nx 4\n"
+    fst = graph.to_fst().splitlines()
+    assert "0 1 a a %.6f" % math.log(3) in fst
+    assert "3 %.6f" % 0 in fst
+
+
+def test_word_graph_accepts_grammar():
+    grammar = nltk.data.load("data/calc/grammar.cfg", format="cfg")
+    graph = WordGraph(grammar)
+    for tokens in sentences(grammar, 200, seed=3, max_tokens=30):
+        assert graph.accepts(tokens)
+    rnd = random.Random(1)
+    assert all(graph.accepts(t) or len(t) == 10 for t in (graph.sample(rnd, 10) for _ in range(50)))
+
+
+def read_arpa(text: str):
+    probs, bows = dict(), dict()
+    for line in text.splitlines():
+        parts = line.split("\t")
+        if len(parts) < 2:
+            continue
+        ng = tuple(parts[1].split())
+        probs[ng] = float(parts[0])
+        if len(parts) == 3:
+            bows[ng] = float(parts[2])
+    return probs, bows
+
+
+def arpa_prob(probs, bows, ng) -> float:
+    if ng in probs:
+        return 10 ** probs[ng]
+    return 10 ** bows.get(ng[:-1], 0) * arpa_prob(probs, bows, ng[1:])
+
+
+@pytest.fixture(scope="module")
+def model():
+    res = NgramModel(order=3, vocab=["a", "b", "c", "x", "y"])
+    for s in ["x a b c", "c", "x x c", "a c", "x a c"]:
+        res.add(s.split())
+    return res
+
+
+@pytest.mark.parametrize("h", [(BOS,), (BOS, "x"), ("x", "a"), ("a", "b"), ("y", "y"), ("b", "c"), ("x",)])
+def test_ngram_normalized(model, h):
+    words = ["a", "b", "c", "x", "y", EOS]
+    assert sum(model.prob(h + (w,)) for w in words) == pytest.approx(1)
+    probs, bows = read_arpa(model.to_arpa())
+    for w in words:
+        assert arpa_prob(probs, bows, h + (w,)) == pytest.approx(model.prob(h + (w,)), rel=1e-4)
+
+
+def test_arpa_header(model):
+    text = model.to_arpa()
+    assert text.startswith("\\data\\\nngram 1=7\n")
+    assert "-99.000000\t<s>\t" in text
+    assert text.endswith("\\end\\\n")
+    assert math.isfinite(model.logprob(["y", "y"]))
+
+
+@pytest.mark.parametrize("fmt", ["fst", "arpa"])
+def test_main(tmp_path, fmt):
+    out, symbols = tmp_path / "out", tmp_path / "words.txt"
+    main(["--format", fmt, "--out", str(out), "--symbols", str(symbols), "--size", "1000", "--validate", "20",
+          "--min_in_grammar", "0"])
+    assert out.stat().st_size > 0
+    assert symbols.exists() == (fmt == "fst")
+
+
+def test_main_in_grammar(tmp_path):
+    out, symbols = tmp_path / "out", tmp_path / "words.txt"
+    main(["--out", str(out), "--size", "1000", "--validate", "50"])
+    assert not symbols.exists()
+    with pytest.raises(SystemExit):
+        main(["--format", "fst", "--out", str(out), "--symbols", str(symbols), "--validate", "50"])
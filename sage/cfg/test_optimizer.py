@@ -0,0 +1,111 @@
+import nltk
+import pytest
+from nltk import Nonterminal
+
+from sage.cfg.grammar import Calculator
+from sage.cfg.corpus import generate_corpus
+from sage.cfg.optimize_grammar import protected_labels, verify
+from sage.cfg.optimizer import Optimizer, remove_useless, merge_equivalent, unfold_helpers, grammar_to_str, \
+    is_helper, has_helpers
+
+grammar = nltk.CFG.fromstring("""
+S -> E | E 'visa' | Dead
+E -> E 'plus' T | E 'minus' T | T
+T -> T 'kart' F 'ir' | T 'kart' F | F
+F -> 'n' | 'x' Op | 'y' Op
+Op -> 'a' 'b' 'c' | 'a' 'b' 'd'
+Dead -> Dead 'x'
+Lost -> 'n'
+""")
+
+
+def test_remove_useless():
+    res = remove_useless(grammar.productions(), grammar.start())
+    lhs = {pr.lhs().symbol() for pr in res}
+    assert "Dead" not in lhs
+    assert "Lost" not in lhs
+    assert all(Nonterminal("Dead") not in pr.rhs() for pr in res)
+
+
+def test_merge_equivalent():
+    g = nltk.CFG.fromstring("""
+    S -> A B | C
+    A -> C 'x' | 'y'
+    B -> C 'x' | 'y'
+    C -> 'z'
+    """)
+    res = merge_equivalent(g.productions(), {"S"})
+    assert {pr.lhs().symbol() for pr in res} == {"S", "A", "C"}
+    assert nltk.grammar.Production(Nonterminal("S"), [Nonterminal("A"), Nonterminal("A")]) in res
+    assert merge_equivalent(g.productions(), {"S", "B"}) == g.productions()
+
+
+def test_optimize():
+    res = Optimizer(grammar, set()).optimize()
+    assert has_helpers(res)
+    assert not has_helpers(grammar)
+    assert len(res.productions(lhs=Nonterminal("E"))) == 2
+
+
+@pytest.mark.parametrize("txt", ["n", "n visa", "n plus n kart n ir minus n", "x a b c kart y a b d",
+                                 "n kart n kart n ir plus n"])
+def test_same_trees(txt):
+    optimized = Optimizer(grammar, set()).optimize()
+    expected = {str(t) for t in nltk.ChartParser(grammar).parse(txt.split())}
+    got = {str(unfold_helpers(t)) for t in nltk.ChartParser(optimized).parse(txt.split())}
+    assert got == expected
+    assert len(expected) > 0
+
+
+def test_to_str():
+    optimized = Optimizer(grammar, set()).optimize()
+    res = nltk.CFG.fromstring(grammar_to_str(optimized))
+    assert res.start() == grammar.start()
+    assert set(res.productions()) == set(optimized.productions())
+
+
+def test_fails_on_helpers():
+    with pytest.raises(ValueError):
+        Optimizer(nltk.CFG.fromstring("S -> _A\n_A -> 'a'"), set())
+
+
+def test_keeps_labels():
+    g = nltk.data.load("data/calc/grammar.cfg", format="cfg")
+    protected = protected_labels()
+    res = Optimizer(g, protected).optimize()
+    labels = {pr.lhs().symbol() for pr in res.productions()}
+    used = {pr.lhs().symbol() for pr in remove_useless(g.productions(), g.start())}
+    assert used & protected <= labels
+    assert {lb for lb in labels if not is_helper(lb)} <= used
+
+
+@pytest.mark.parametrize("txt", ["penki plius šeši kart septyni", "šaknis iš dvylikos plius du",
+                                 "du šimtai dvidešimt vienas kart keturi", "vienas sveikas viena antroji"])
+def test_calculator(tmp_path, txt):
+    g = nltk.data.load("data/calc/grammar.cfg", format="cfg")
+    file = tmp_path / "grammar.opt.cfg"
+    file.write_text(grammar_to_str(Optimizer(g, protected_labels()).optimize()), encoding="utf-8")
+    for engine in ["int", "nltk"]:
+        expected, _ = Calculator(file="data/calc/grammar.cfg", engine=engine).parse(txt)
+        res, ok = Calculator(file=str(file), engine=engine).parse(txt)
+        assert ok
+        assert str(res) == str(expected)
+
+
+def test_keeps_protected():
+    g = nltk.data.load("data/calc/grammar.cfg", format="cfg")
+    protected = protected_labels()
+    res = Optimizer(g, protected).optimize()
+    for lhs in ["IsraiskaSkl", "Israiskaplus", "DesinysSkl"]:
+        assert set(res.productions(lhs=Nonterminal(lhs))) == set(g.productions(lhs=Nonterminal(lhs)))
+
+
+def test_same_results(tmp_path):
+    g = nltk.data.load("data/calc/grammar.cfg", format="cfg")
+    file = tmp_path / "grammar.opt.cfg"
+    file.write_text(grammar_to_str(Optimizer(g, protected_labels()).optimize()), encoding="utf-8")
+    corpus = ["du plius trys visa tai apskliausta dalinti penki plius vienas plius du"] + \
+             [c["text"] for c in generate_corpus(g, 300)]
+    diffs, speedup = verify("data/calc/grammar.cfg", str(file), "int", corpus)
+    assert diffs == []
+    assert speedup > -1
@@ -0,0 +1,113 @@
+import math
+from collections import Counter
+
+import nltk
+import pytest
+
+from sage.cfg.cases import result_cases
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import Calculator
+from sage.cfg.pcfg import best_tree, estimate, pcfg_to_str, complete_logprobs, plain
+from sage.cfg.train_pcfg import Trainer
+from sage.cfg.budget import ParseBudget
+
+pcfg = nltk.PCFG.fromstring("""
+S -> E [0.8] | E Skip [0.2]
+E -> E 'plus' E [0.2] | E 'kart' E [0.1] | A [0.7]
+A -> 'n' [0.6] | B [0.4]
+B -> A [0.5] | 'm' [0.5]
+Skip -> 'ir' [0.5] | [0.5]
+""")
+
+
+def logprobs(grammar):
+    return {plain(pr): pr.logprob() for pr in grammar.productions()}
+
+
+def prob(tree, grammar) -> float:
+    lp = logprobs(grammar)
+    return sum(lp[pr] for pr in tree.productions())
+
+
+def best(txt, grammar):
+    return best_tree(nltk.ChartParser(grammar).chart_parse(txt.split()), grammar.start(), logprobs(grammar))
+
+
+@pytest.mark.parametrize("txt", ["n", "m", "n plus m", "n plus n kart n", "n kart n plus n plus m", "n ir",
+                                 "n plus m ir"])
+def test_best_tree(txt):
+    trees = list(nltk.ChartParser(pcfg).parse(txt.split()))
+    res = best(txt, pcfg)
+    assert res is not None
+    assert str(res) in {str(t) for t in trees}
+    assert prob(res, pcfg) == pytest.approx(max(prob(t, pcfg) for t in trees))
+
+
+@pytest.mark.parametrize("p,exp", [(0.7, "A"), (0.3, "B")])
+def test_best_tree_weights(p, exp):
+    g = nltk.PCFG.fromstring("""
+    S -> A [%s] | B [%s]
+    A -> 'n' 'n' [1.0]
+    B -> N N [1.0]
+    N -> 'n' [1.0]
+    """ % (p, 1 - p))
+    assert best("n n", g)[0].label() == exp
+
+
+def test_no_tree():
+    chart = nltk.ChartParser(pcfg).chart_parse("n plus".split())
+    assert best_tree(chart, pcfg.start(), logprobs(pcfg)) is None
+
+
+def test_estimate():
+    g = nltk.CFG.fromstring("""
+    S -> A | B
+    A -> 'a'
+    B -> 'b' | 'c' |
+    """)
+    counts = Counter({plain(g.productions()[0]): 3})
+    res = estimate(g, counts, alpha=1.0)
+    probs = {str(plain(pr)): pr.prob() for pr in res.productions()}
+    assert probs["S -> A"] == pytest.approx(0.8)
+    assert probs["B -> 'b'"] == pytest.approx(1 / 3)
+    restored = nltk.PCFG.fromstring(pcfg_to_str(res))
+    assert {str(pr) for pr in restored.productions()} == {str(pr) for pr in res.productions()}
+
+
+def test_complete_logprobs():
+    g = nltk.CFG.fromstring("""
+    S -> A | B
+    A -> 'a'
+    B -> 'b'
+    """)
+    res = complete_logprobs(g, {plain(g.productions()[0]): -3.0})
+    assert res[plain(g.productions()[0])] == -3.0
+    assert res[plain(g.productions()[1])] == pytest.approx(math.log2(0.5))
+    assert res[plain(g.productions()[2])] == 0.0
+
+
+# held out of the training sentences, the first two have two parses: 17 or 45 and 19 or 33
+@pytest.mark.parametrize("txt,exp", [("trys plius vienas kart keturi visa tai apskliausta plius du kart penki", "17"),
+                                     ("vienas plius trys kart du visa tai apskliausta plius keturi kart trys", "19"),
+                                     ("šaknis iš dvylikos plius du", "5.464101615137754"),
+                                     ("du sveiki keturios penktosios", "2.8")])
+def test_calculator(txt, exp):
+    assert txt not in {t for t, _ in result_cases}
+    cfg = Calculator(file="data/calc/grammar.cfg", engine="viterbi", weights="data/calc/grammar.pcfg")
+    tree, ok = cfg.parse(txt)
+    assert ok
+    assert Evaluator(cfg.leaves_map()).evaluate(tree)[0] == exp
+
+
+def test_calculator_needs_weights():
+    with pytest.raises(ValueError):
+        Calculator(file="data/calc/grammar.cfg", engine="viterbi")
+
+
+def test_trainer():
+    trainer = Trainer("data/calc/grammar.cfg", max_parses=50, budget=ParseBudget())
+    trainer.add("du plius trys", "5")
+    trainer.add("du plius trys", "6")
+    trainer.add("du nežinau", None)
+    assert trainer.stats == Counter({"used": 1, "no_parse": 1, "failed": 1})
+    assert trainer.counts[nltk.grammar.Production(nltk.Nonterminal("S"), [nltk.Nonterminal("Israiska")])] == 1
@@ -0,0 +1,92 @@
+import pickle
+import shutil
+import time
+
+import pytest
+
+from sage.cfg.budget import ParseBudget, TooComplex
+from sage.cfg.grammar import UnknownWord
+from sage.cfg.parser import EvaluationLimit
+from sage.cfg.pool import CalculatorPool, CalcState, calculate
+
+calc_args = dict(file="data/calc/grammar.cfg", compiled_file="")
+
+
+def stuck(state: CalcState, txt: str):
+    if txt == "stuck":
+        time.sleep(30)
+    return calculate(state, txt)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    res = CalculatorPool(2, calc_args=calc_args, timeout=5.0)
+    res.wait_ready()
+    yield res
+    res.close()
+
+
+def test_calculate(pool):
+    state = CalcState(calc_args, 1.0)
+    texts = ["du plius trys", "penki kart šeši", "du plius", "plius du"]
+    futures = [pool.submit(t) for t in texts]
+    assert [f.result(timeout=10) for f in futures] == [calculate(state, t) for t in texts]
+    assert futures[0].result()[1][0] == "5"
+
+
+def test_error(pool):
+    with pytest.raises(UnknownWord) as err:
+        pool.submit("du plius olia").result(timeout=10)
+    assert err.value.word == "olia"
+
+
+@pytest.mark.parametrize("err", [TooComplex("edges", 10), EvaluationLimit(1.5), UnknownWord("olia")])
+def test_error_pickle(err):
+    res = pickle.loads(pickle.dumps(err))
+    assert type(res) is type(err)
+    assert res.__dict__ == err.__dict__
+    assert str(res) == str(err)
+
+
+def test_budget_hits_counted():
+    budget = ParseBudget(max_tokens=2)
+    pool = CalculatorPool(1, calc_args=dict(calc_args, budget=budget))
+    try:
+        with pytest.raises(TooComplex):
+            pool.submit("du plius trys").result(timeout=60)
+        assert budget.hits()["tokens"] == 1
+    finally:
+        pool.close()
+
+
+def test_stuck_restarts():
+    pool = CalculatorPool(1, calc_args=calc_args, timeout=0.5, job=stuck)
+    try:
+        with pytest.raises(EvaluationLimit):
+            pool.submit("stuck").result(timeout=60)
+        assert pool.submit("du plius trys").result(timeout=60)[1][0] == "5"
+    finally:
+        pool.close()
+
+
+def test_start_fails_then_recovers(tmp_path):
+    grammar = tmp_path / "grammar.cfg"
+    pool = CalculatorPool(1, calc_args=dict(file=str(grammar), compiled_file=""), retry_delay=0.2,
+                          max_retry_delay=0.5)
+    try:
+        pool.wait_ready()
+        with pytest.raises(RuntimeError) as err:
+            pool.submit("du plius trys").result(timeout=10)
+        assert "failed to start" in str(err.value)
+        shutil.copy("data/calc/grammar.cfg", grammar)
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                res = pool.submit("du plius trys").result(timeout=30)
+                break
+            except RuntimeError:
+                assert time.monotonic() < deadline
+                time.sleep(0.2)
+        assert res[1][0] == "5"
+    finally:
+        pool.close()
@@ -0,0 +1,48 @@
+import nltk
+import pytest
+
+from sage.cfg.profiler import ChartProfiler
+
+grammar = nltk.CFG.fromstring("""
+S -> E
+E -> E 'plus' E | E 'times' E | 'n'
+""")
+
+
+@pytest.mark.parametrize("txt", ["n", "n plus n", "n plus n times n", "n plus n plus n times n plus n"])
+def test_parses(txt):
+    profiler = ChartProfiler(grammar)
+    profiler.profile(txt)
+    expected = list(nltk.ChartParser(grammar).parse(txt.split()))
+    assert profiler.sentences[0]["parses"] == len(expected)
+    counts = dict()
+    for tree in expected:
+        for pr in tree.productions():
+            counts[pr] = counts.get(pr, 0) + 1
+    assert {str(k): v for k, v in counts.items()} == \
+           {str(k): s.parses for k, s in profiler.stats.items() if s.parses}
+
+
+def test_edges():
+    profiler = ChartProfiler(grammar)
+    profiler.profile("n plus n times n")
+    edges = sum(s.edges for s in profiler.stats.values())
+    # plus the leaf edges
+    assert edges + 5 == profiler.sentences[0]["edges"]
+    assert all(s.time_ms >= 0 for s in profiler.stats.values())
+    nts = profiler.by_nonterminal()
+    assert set(nts) == {"S", "E"}
+    assert nts["S"].parses == 2
+
+
+def test_skips_unknown():
+    profiler = ChartProfiler(grammar)
+    profiler.profile("n minus n")
+    assert profiler.sentences == []
+
+
+def test_main(tmp_path):
+    from sage.cfg.profiler import main
+    out = tmp_path / "report.json"
+    main(["--top", "3", "--out", str(out)])
+    assert out.exists()
@@ -0,0 +1,49 @@
+import pickle
+
+import pytest
+
+from sage.cfg.grammar import Calculator, UnknownWord
+from sage.cfg.repair import RepairIndex, deletes, edit_distance
+
+leaves = ["plius", "minus", "kart", "dalinti", "dalinta", "penkiasdešimt", "du", "trys"]
+
+
+def test_deletes():
+    assert deletes("abc", 1) == {"abc", "bc", "ac", "ab"}
+    assert deletes("ab", 2) == {"ab", "a", "b", ""}
+
+
+@pytest.mark.parametrize("a,b,limit,exp", [("kart", "kart", 2, 0), ("kard", "kart", 2, 1), ("plus", "plius", 2, 1),
+                                           ("pilus", "plius", 2, 1), ("abc", "cba", 2, 2), ("abcd", "dcba", 2, 3),
+                                           ("a", "abcd", 2, 3), ("", "ab", 2, 2), ("minus", "plius", 1, 2)])
+def test_edit_distance(a, b, limit, exp):
+    assert edit_distance(a, b, limit) == exp
+
+
+@pytest.mark.parametrize("word,exp", [("plius", "plius"), ("plus", "plius"), ("pliuss", "plius"), ("kard", "kart"),
+                                      ("penkiasdešint", "penkiasdešimt"), ("penkiasdšint", "penkiasdešimt"),
+                                      ("olia", None), ("tu", None), ("<unk>", None),
+                                      ("dalintą", None), ("penkiolika", None)])
+def test_nearest(word, exp):
+    assert RepairIndex(leaves).nearest(word) == exp
+
+
+def test_repair():
+    assert RepairIndex(leaves).repair("du plus trys olia".split()) == "du plius trys olia".split()
+
+
+def test_pickle():
+    index = pickle.loads(pickle.dumps(RepairIndex(leaves)))
+    assert index.nearest("plus") == "plius"
+    assert "kart" in index
+
+
+def test_calculator():
+    cfg = Calculator(file="data/calc/grammar.cfg", repair_words=True)
+    tree, ok = cfg.parse("du pliuss trys")
+    assert ok and tree is not None
+    with pytest.raises(UnknownWord) as exc_info:
+        cfg.parse("du plius olia")
+    assert exc_info.value.word == "olia"
+    with pytest.raises(UnknownWord):
+        Calculator(file="data/calc/grammar.cfg").parse("du pliuss trys")
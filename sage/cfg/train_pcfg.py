@@ -0,0 +1,113 @@
+import argparse
+import itertools
+import json
+import sys
+from collections import Counter
+from typing import List, Tuple, Optional
+
+import nltk
+
+from sage.cfg.budget import ParseBudget
+from sage.cfg.cases import result_cases
+from sage.cfg.evaluator import Evaluator
+from sage.cfg.grammar import prepare_grammar_data, BudgetChartParser
+from sage.cfg.pcfg import estimate, pcfg_to_str, plain
+from sage.logger import logger
+
+
+def read_examples(file: str, field: str, result_field: str) -> List[Tuple[str, Optional[str]]]:
+    """
+        :return: (text, corrected result or None) of the `.jsonl` lines or of the text lines,
+            the result cases of sage/cfg/cases.py if `file` is empty
+        """
+    if not file:
+        return list(result_cases)
+    res = []
+    with open(file, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if file.endswith(".jsonl"):
+                d = json.loads(line)
+                res.append((d[field], d.get(result_field)))
+            else:
+                res.append((line, None))
+    return res
+
+
+class Trainer:
+    """
+        Counts the productions of the parses giving the corrected result, the count of an utterance is split
+        among such parses. All parses are counted if the result is not known
+        """
+
+    def __init__(self, grammar_file: str, max_parses: int, budget: ParseBudget):
+        data = prepare_grammar_data(grammar_file)
+        self.grammar = data["grammar"]
+        self.__chunker = data["chunker"]
+        self.__parser = BudgetChartParser(data["parse_grammar"], budget=budget)
+        self.__evaluator = Evaluator(leaves_map=data["leaves_map"])
+        self.__known = {plain(pr) for pr in self.grammar.productions()}
+        self.max_parses = max_parses
+        self.counts: Counter = Counter()
+        self.stats: Counter = Counter()
+
+    def add(self, txt: str, expected: Optional[str]):
+        try:
+            trees = list(itertools.islice(self.__parser.parse(self.__chunker.chunk(txt.split())), self.max_parses))
+        except BaseException as err:
+            logger.warning("Skip `%s`: %s" % (txt, err))
+            self.stats["failed"] += 1
+            return
+        self.stats["ambiguous"] += len(trees) > 1
+        if expected is not None:
+            trees = [t for t in trees if self.__result(t) == expected]
+        if not trees:
+            self.stats["no_parse"] += 1
+            return
+        self.stats["used"] += 1
+        for t in trees:
+            for pr in t.productions():
+                if pr in self.__known:
+                    self.counts[pr] += 1 / len(trees)
+
+    def __result(self, tree: nltk.Tree) -> Optional[str]:
+        try:
+            return self.__evaluator.evaluate(tree)[0]
+        except BaseException as err:
+            logger.debug("evaluate failed: %s" % err)
+            return None
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="Learns the production probabilities of the grammar from utterances "
+                                                 "with the corrected results, the weighted grammar is used by the "
+                                                 "`viterbi` parse engine",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--input", nargs='?', default='',
+                        help="Text file with an utterance per line or .jsonl, sentences of sage/cfg/cases.py "
+                             "by default")
+    parser.add_argument("--field", nargs='?', default='text', help="Utterance field of .jsonl lines")
+    parser.add_argument("--result_field", nargs='?', default='result', help="Corrected result field of .jsonl lines")
+    parser.add_argument("--out", nargs='?', default='data/calc/grammar.pcfg', help="Weighted grammar file")
+    parser.add_argument("--alpha", nargs='?', type=float, default=0.1, help="Add-alpha smoothing of the counts")
+    parser.add_argument("--max_parses", nargs='?', type=int, default=200, help="Parses of an utterance to count")
+    args = parser.parse_args(args=param)
+
+    trainer = Trainer(args.grammar, args.max_parses, ParseBudget())
+    examples = read_examples(args.input, args.field, args.result_field)
+    for txt, expected in examples:
+        trainer.add(txt, expected)
+    logger.info("Utterances: %d, %s" % (len(examples), dict(trainer.stats)))
+    pcfg = estimate(trainer.grammar, trainer.counts, alpha=args.alpha)
+    with open(args.out, "w", encoding="utf-8") as f:
+        f.write("# Generated from %s by sage.cfg.train_pcfg, do not edit\n\n" % args.grammar)
+        f.write(pcfg_to_str(pcfg))
+    logger.info("Saved %s" % args.out)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
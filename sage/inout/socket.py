@@ -8,15 +8,32 @@ from sage.logger import logger
 
 
 class SocketIO:
-    def __init__(self, msg_func, port):
+    """
+        Socket.IO server, the inputs of a client go to its session in `sessions`, the outputs of a session are sent to
+        its client only
+        """
+
+    def __init__(self, sessions, port, reuse_port: bool = False, websocket_only: bool = False):
+        """
+            :param sessions: `SessionManager`
+            :param reuse_port: share the port with the other worker processes, the kernel spreads the TCP connections
+                over the workers
+            :param websocket_only: serve the websocket transport only, the client must connect with it, the polling
+                handshake is refused. Required by `reuse_port`: the polling requests of a client could land on
+                different workers while a websocket stays on one
+            """
+        if reuse_port and not websocket_only:
+            raise ValueError("reuse_port needs websocket_only")
         self.__port = port
-        logger.info("Init socket IO")
-        self.msg_func = msg_func
-        self.sio = socketio.AsyncServer(cors_allowed_origins='*')
+        self.__reuse_port = reuse_port
+        logger.info("Init socket IO%s" % (", websocket transport only" if websocket_only else ""))
+        self.sessions = sessions
+        self.sio = socketio.AsyncServer(cors_allowed_origins='*', transports=['websocket'] if websocket_only else None)
         self.sio.on("message", self.message)
         self.sio.on("connect", self.connect)
         self.sio.on("disconnect", self.disconnect)
         self.loop = None
+        self.__app_runner = None
 
     def start(self):
         logger.info("Starting at %d" % self.__port)
@@ -24,30 +41,56 @@ class SocketIO:
         self.sio.attach(app)
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
-        server = self.loop.create_server(app.make_handler(), port=self.__port)
+        server = self.loop.create_server(app.make_handler(), port=self.__port, reuse_port=self.__reuse_port)
         self.loop.run_until_complete(server)
         self.loop.run_forever()
         logger.debug("Exit socket listener")
 
+    async def serve(self):
+        """serves on the running loop of the asyncio runner, `send` is its output processor then"""
+        logger.info("Serving at %d" % self.__port)
+        self.loop = asyncio.get_running_loop()
+        app = web.Application()
+        self.sio.attach(app)
+        self.__app_runner = web.AppRunner(app)
+        await self.__app_runner.setup()
+        await web.TCPSite(self.__app_runner, port=self.__port, reuse_port=self.__reuse_port).start()
+
+    async def close(self):
+        if self.__app_runner is not None:
+            await self.__app_runner.cleanup()
+
     async def message(self, sid, data):
         if data['type'] == "AUDIO":
-            self.msg_func(Data(in_type=DataType.AUDIO, who=Sender.USER, data=data['data']))
+            # not wrapped and not queued with the other messages
+            self.sessions.add_audio(sid, data['data'])
         elif data['type'] == "EVENT":
-            self.msg_func(Data(in_type=DataType.EVENT, who=Sender.USER, data=data['data']))
+            self.sessions.add_input(sid, Data(in_type=DataType.EVENT, who=Sender.USER, data=data['data']))
         else:
             logger.info("message: %s, %s " % (sid, data))
-            self.msg_func(Data(in_type=DataType.TEXT, who=Sender.USER, data=data['data']))
+            self.sessions.add_input(sid, Data(in_type=DataType.TEXT, who=Sender.USER, data=data['data']))
+
+    def sender(self, sid: str):
+        """:return: output processor sending to the client `sid`, the threaded runner calls it from its thread"""
 
-    def process(self, d: Data):
-        asyncio.run_coroutine_threadsafe(self.send(d), self.loop)
+        def process(d: Data):
+            asyncio.run_coroutine_threadsafe(self.send(d, sid), self.loop)
 
-    async def send(self, d: Data):
+        return process
+
+    def async_sender(self, sid: str):
+        """:return: output processor of the asyncio runner sending to the client `sid`"""
+
+        async def send(d: Data):
+            await self.send(d, sid)
+
+        return send
+
+    async def send(self, d: Data, sid: str):
         if d.type == DataType.TEXT or d.type == DataType.TEXT_RESULT or d.type == DataType.STATUS \
                 or d.type == DataType.SVG:
-            logger.info("sending msg %s" % d.type)
-            await self.sio.emit('message',
-                                {"type": d.type.to_str(), "data": str(d.data), "data2": str(d.data2),
-                                 "who": d.who.to_str(), "id": d.id})
+            logger.info("sending msg %s to %s" % (d.type, sid))
+            await self.sio.emit('message', d.to_message(), to=sid)
         elif d.who == Sender.RECOGNIZER:
             pass
         else:
@@ -55,10 +98,17 @@ class SocketIO:
 
     async def connect(self, sid, environ):
         logger.info("connect: %s " % sid)
-        self.msg_func(Data(in_type=DataType.EVENT, who=Sender.USER, data="connected"))
+        if not self.sessions.open(sid):
+            return False
+        self.sessions.add_input(sid, Data(in_type=DataType.EVENT, who=Sender.USER, data="connected"))
 
     async def disconnect(self, sid):
         logger.info("disconnect: %s " % sid)
+        self.sessions.close(sid)
+
+    def kick(self, sid: str):
+        """disconnects the client, may be called from any thread"""
+        asyncio.run_coroutine_threadsafe(self.sio.disconnect(sid), self.loop)
 
     def stop(self):
         logger.debug("stopping socket listener loop")
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from sage.inout.worker import OutputWorker, BLOCK, DROP_OLDEST, DROP_NEWEST
+
+
+class Gate:
+    """processor waiting for the gate to open"""
+
+    def __init__(self):
+        self.got = []
+        self.open = threading.Event()
+        self.started = threading.Event()
+
+    def __call__(self, item):
+        self.started.set()
+        self.open.wait(5)
+        self.got.append(item)
+
+
+def fill(overflow: str):
+    gate = Gate()
+    worker = OutputWorker("test", gate, max_size=2, overflow=overflow)
+    worker.start()
+    worker.put(0)
+    assert gate.started.wait(5)
+    for i in range(1, 5):
+        worker.put(i)
+    return gate, worker
+
+
+@pytest.mark.parametrize("overflow,exp,dropped", [(DROP_OLDEST, [0, 3, 4], 2), (DROP_NEWEST, [0, 1, 2], 2)])
+def test_overflow(overflow, exp, dropped):
+    gate, worker = fill(overflow)
+    assert worker.stats() == {"depth": 2, "max_depth": 2, "dropped": dropped}
+    gate.open.set()
+    worker.stop()
+    worker.join()
+    assert gate.got == exp
+    assert worker.stats()["depth"] == 0
+
+
+def test_block():
+    gate = Gate()
+    worker = OutputWorker("test", gate, max_size=1, overflow=BLOCK)
+    worker.start()
+    th = threading.Thread(target=lambda: [worker.put(i) for i in range(5)])
+    th.start()
+    assert gate.started.wait(5)
+    th.join(0.1)
+    assert th.is_alive()
+    gate.open.set()
+    th.join(5)
+    worker.stop()
+    worker.join()
+    assert gate.got == list(range(5))
+    assert worker.stats()["dropped"] == 0
+
+
+def test_failing_processor():
+    got = []
+
+    def process(item):
+        if item == 1:
+            raise ValueError("fail")
+        got.append(item)
+
+    worker = OutputWorker("test", process)
+    worker.start()
+    for i in range(3):
+        worker.put(i)
+    worker.stop()
+    worker.join()
+    assert got == [0, 2]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        OutputWorker("test", print, overflow="drop")
@@ -0,0 +1,155 @@
+import asyncio
+import queue
+import threading
+from typing import Any, Callable, Dict
+
+from sage.logger import logger
+
+BLOCK = "block"
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+def put_or_drop(q, item, overflow: str) -> bool:
+    """
+        puts the item to the `queue.Queue` or `asyncio.Queue` without waiting, drops the oldest queued item or the new
+        one by the `overflow` policy if the queue is full
+        :return: True if an item is dropped
+        """
+    try:
+        q.put_nowait(item)
+        return False
+    except (queue.Full, asyncio.QueueFull):
+        pass
+    if overflow == DROP_OLDEST:
+        try:
+            q.get_nowait()
+        except (queue.Empty, asyncio.QueueEmpty):
+            pass
+        q.put_nowait(item)
+    return True
+
+
+class OutputWorker:
+    """
+        Runs an output processor on its own thread over a bounded queue, so a slow processor does not hold up the
+        others. When the queue is full `put` blocks, drops the oldest queued item or drops the new one by the
+        `overflow` policy
+        """
+
+    def __init__(self, name: str, process: Callable[[Any], None], max_size: int = 500, overflow: str = BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy `%s`" % overflow)
+        logger.info("Init output worker %s, queue %d, %s" % (name, max_size, overflow))
+        self.name = name
+        self.overflow = overflow
+        self.__process = process
+        self.__queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.__lock = threading.Lock()
+        self.__max_depth = 0
+        self.__dropped = 0
+        self.__thread = threading.Thread(target=self.__run, daemon=True, name="output-%s" % name)
+
+    def start(self):
+        self.__thread.start()
+
+    def join(self):
+        self.__thread.join()
+
+    def put(self, item):
+        if self.overflow == BLOCK:
+            self.__queue.put(item)
+        else:
+            with self.__lock:
+                self.__put_or_drop(item)
+        with self.__lock:
+            self.__max_depth = max(self.__max_depth, self.__queue.qsize())
+
+    def __put_or_drop(self, item):
+        if put_or_drop(self.__queue, item, self.overflow):
+            self.__dropped += 1
+            logger.warning("Output %s is full (%s), %s" % (self.name, self.overflow, self.__stats()))
+
+    def stop(self):
+        """the queued items are processed before the worker stops"""
+        self.__queue.put(None)
+
+    def stats(self) -> Dict[str, int]:
+        """:return: the queue depth gauge, its high-water mark and the dropped items"""
+        with self.__lock:
+            return self.__stats()
+
+    def __stats(self) -> Dict[str, int]:
+        return {"depth": self.__queue.qsize(), "max_depth": self.__max_depth, "dropped": self.__dropped}
+
+    def __run(self):
+        while True:
+            item = self.__queue.get()
+            if item is None:
+                break
+            try:
+                self.__process(item)
+            except BaseException as err:
+                logger.error("Output %s failed: %s" % (self.name, err))
+        logger.debug("Exit output worker %s" % self.name)
+
+
+class AsyncOutputWorker:
+    """
+        `OutputWorker` of the asyncio runner: a task on the event loop over a bounded `asyncio.Queue`. A coroutine
+        processor is awaited, a plain one runs in the default executor
+        """
+
+    def __init__(self, name: str, process: Callable[[Any], Any], max_size: int = 500, overflow: str = BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError("Unknown overflow policy `%s`" % overflow)
+        logger.info("Init async output worker %s, queue %d, %s" % (name, max_size, overflow))
+        self.name = name
+        self.overflow = overflow
+        self.__process = process
+        self.__is_async = asyncio.iscoroutinefunction(process)
+        self.__max_size = max_size
+        self.__queue = None
+        self.__task = None
+        self.__max_depth = 0
+        self.__dropped = 0
+
+    def start(self):
+        """starts the task on the running loop"""
+        self.__queue = asyncio.Queue(maxsize=self.__max_size)
+        self.__task = asyncio.create_task(self.__run())
+
+    async def put(self, item):
+        if self.overflow == BLOCK:
+            await self.__queue.put(item)
+        elif put_or_drop(self.__queue, item, self.overflow):
+            self.__dropped += 1
+            logger.warning("Output %s is full (%s), %s" % (self.name, self.overflow, self.stats()))
+        self.__max_depth = max(self.__max_depth, self.__queue.qsize())
+
+    async def stop(self):
+        """the queued items are processed before the worker stops"""
+        await self.__queue.put(None)
+        await self.__task
+
+    def stats(self) -> Dict[str, int]:
+        """:return: the queue depth gauge, its high-water mark and the dropped items"""
+        depth = self.__queue.qsize() if self.__queue is not None else 0
+        return {"depth": depth, "max_depth": self.__max_depth, "dropped": self.__dropped}
+
+    async def __run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self.__queue.get()
+            if item is None:
+                break
+            try:
+                if self.__is_async:
+                    await self.__process(item)
+                else:
+                    await loop.run_in_executor(None, self.__process, item)
+            except Exception as err:
+                # not BaseException - the task stays cancellable
+                logger.error("Output %s failed: %s" % (self.name, err))
+        logger.debug("Exit output worker %s" % self.name)
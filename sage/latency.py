@@ -0,0 +1,28 @@
+import threading
+from typing import Dict
+
+
+class Latency:
+    """Counts the items of a lane and the time they waited"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__count = 0
+        self.__total = 0.0
+        self.__max = 0.0
+
+    def add(self, seconds: float):
+        with self.__lock:
+            self.__count += 1
+            self.__total += seconds
+            self.__max = max(self.__max, seconds)
+
+    def stats(self) -> Dict[str, float]:
+        """:return: the count, the total and the max wait in ms, the totals of the sessions and the workers add up"""
+        with self.__lock:
+            return {"count": self.__count, "total_ms": round(self.__total * 1000, 3),
+                    "max_ms": round(self.__max * 1000, 3)}
+
+
+def latencies(*lanes: str) -> Dict[str, Latency]:
+    return {lane: Latency() for lane in lanes}
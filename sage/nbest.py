@@ -0,0 +1,105 @@
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from sage.cfg.pool import Calculation
+from sage.logger import logger
+
+
+def settle(calculation: Callable[[], Calculation]) -> Callable[[], Calculation]:
+    """runs the calculation once, :return: the calculation returning the same value or raising the same error"""
+    try:
+        res = calculation()
+    except BaseException as err:
+        def fail(error=err):
+            raise error
+
+        return fail
+    return lambda: res
+
+
+def parsed(calculation: Callable[[], Calculation]) -> bool:
+    """:return: True if the settled calculation has a complete expression"""
+    try:
+        ok, value = calculation()
+    except BaseException:
+        return False
+    return ok and value is not None
+
+
+def candidates(txt: str, alternatives: Optional[List[str]], limit: int) -> List[str]:
+    """:return: `txt` and the other unique non empty alternatives, up to `limit` texts"""
+    res = [txt]
+    for t in alternatives or []:
+        if t.strip() and t not in res:
+            res.append(t)
+    return res[:max(1, limit)]
+
+
+class NBestChooser:
+    """
+        Collects the settled calculations of the ranked hypotheses. `answer` gets the highest ranked hypothesis with
+        a complete expression as soon as all the better ranked ones have failed, or the top hypothesis if all fail.
+        After `expire` the unfinished hypotheses count as failed, only the top one is still waited for
+        """
+
+    def __init__(self, count: int, answer: Callable[[int, Callable[[], Calculation]], None],
+                 deadline: Optional[float] = None):
+        """:param deadline: seconds to `expire` after, the caller expires the chooser if None"""
+        self.__results: List[Optional[Callable[[], Calculation]]] = [None] * count
+        self.__answer = answer
+        self.__decided = False
+        self.__expired = False
+        self.__lock = threading.Lock()
+        self.__timer = None
+        if deadline is not None and count > 1:
+            self.__timer = threading.Timer(deadline, self.expire)
+            self.__timer.daemon = True
+            self.__timer.start()
+
+    def decided(self) -> bool:
+        with self.__lock:
+            return self.__decided
+
+    def set(self, rank: int, calculation: Callable[[], Calculation]):
+        """:param calculation: settled calculation of the hypothesis"""
+        with self.__lock:
+            if self.__decided:
+                return
+            self.__results[rank] = calculation
+            chosen = self.__choose()
+        self.__give(chosen)
+
+    def expire(self):
+        with self.__lock:
+            if self.__decided:
+                return
+            got = sum(r is not None for r in self.__results)
+            logger.debug("N-best expired, got %d of %d" % (got, len(self.__results)))
+            self.__expired = True
+            chosen = self.__choose()
+        self.__give(chosen)
+
+    def __choose(self) -> Optional[Tuple[int, Callable[[], Calculation]]]:
+        for rank, calculation in enumerate(self.__results):
+            if calculation is None:
+                if self.__expired:
+                    continue
+                return None
+            if parsed(calculation):
+                return self.__decide(rank, calculation)
+        if self.__results[0] is None:
+            return None
+        return self.__decide(0, self.__results[0])
+
+    def __decide(self, rank: int, calculation: Callable[[], Calculation]) -> Tuple[int, Callable[[], Calculation]]:
+        self.__decided = True
+        if self.__timer is not None:
+            self.__timer.cancel()
+        return rank, calculation
+
+    def __give(self, chosen: Optional[Tuple[int, Callable[[], Calculation]]]):
+        if chosen is None:
+            return
+        if chosen[0] > 0:
+            logger.info("Took hypothesis %d" % chosen[0])
+        self.__answer(*chosen)
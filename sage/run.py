@@ -1,170 +1,313 @@
 import argparse
+import asyncio
+import functools
+import itertools
+import os
 import queue
 import signal
 import sys
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from sage.api.data import Data, DataType, Sender
 from sage.aplayer.player import Player
 from sage.asr.kaldi import Kaldi
+from sage.asr.kaldi_async import AsyncKaldi
+from sage.async_runner import AsyncRunner, new_event_loop
 from sage.audio2face.player import A2FPlayer
 from sage.bot import CalculatorBot
+from sage.cache import ResultCache
+from sage.cfg.budget import ParseBudget
+from sage.cfg.evaluator import Evaluator
 from sage.cfg.grammar import Calculator
-from sage.cfg.parser import ResultParser, EqParser
+from sage.cfg.pool import CalculatorPool
 from sage.inout.socket import SocketIO
 from sage.inout.terminal import TerminalInput, TerminalOutput
 from sage.inout.voice import VoiceOutput, PCPlayer
+from sage.inout.worker import OutputWorker, BLOCK, OVERFLOW_POLICIES, DROP_OLDEST
+from sage.latency import latencies
 from sage.latex.wrapper import LatexWrapper
 from sage.logger import logger
 from sage.number2text.replacer import Replacer
+from sage.session import AsyncSession, SessionManager, ThreadSession
+from sage.supervisor import MetricsReporter, Supervisor
+from sage.supersede import Generations, is_speech
 from sage.tts.intelektika import IntelektikaTTS
 
 
+# input lanes of `Runner`, the lower first
+PRIORITY_CONTROL = 0
+PRIORITY_TEXT = 1
+PRIORITY_STOP = 2
+
+
 class Runner:
-    def __init__(self, bot, audio_rec):
+    def __init__(self, bot, audio_rec, generations: Generations = None):
+        """:param generations: utterance numbering shared with the bot, a newer text drops the work of the older"""
         logger.info("Init runner")
         self.__bot = bot
-        self.__outputs = []
-        self.__input_queue: queue.Queue[Data] = queue.Queue(maxsize=500)
-        self.__output_queue: queue.Queue[Data] = queue.Queue(maxsize=500)
+        self.__workers = []
+        # (priority, seq, time, data), the events go ahead of the queued texts
+        self.__input_queue: queue.PriorityQueue = queue.PriorityQueue(maxsize=500)
+        self.__seq = itertools.count()
+        # (generation, data)
+        self.__output_queue: queue.Queue = queue.Queue(maxsize=500)
         self.__audio_rec = audio_rec
+        self.__generations = generations if generations is not None else Generations()
+        self.__latest_text = None
+        # a burst of partial hypotheses is parsed ahead only from the latest one
+        self.__latest_partial = None
+        self.__latency = latencies("audio", "control", "input")
 
     def start(self):
         self.add_output_processor(self.resend_recognized)
+        for w in self.__workers:
+            w.start()
         th_out = threading.Thread(target=self.start_output, daemon=True)
         th_out.start()
         while True:
-            inp = self.__input_queue.get()
+            _, _, t, inp = self.__input_queue.get()
             if inp is None:
                 break
+            self.__latency["control" if inp.type == DataType.EVENT else "input"].add(time.monotonic() - t)
             if inp.type == DataType.TEXT:
-                self.__bot.process(inp.data)
-            elif inp.type == DataType.AUDIO:
-                logger.debug("got audio %d" % len(inp.data))
-                self.__audio_rec.add(inp.data)
+                self.__process_text(inp)
+            elif inp.type == DataType.TEXT_PARTIAL:
+                self.__process_partial(inp)
             elif inp.type == DataType.EVENT:
                 logger.debug("got event %s" % inp.data)
                 self.__bot.process_event(inp)
-                self.__audio_rec.event(inp.data)
             else:
                 logger.warning("Don't know what to do with %s - %s" % (inp.type, inp.data))
         th_out.join()
-        logger.debug("Exit run loop")
+        for w in self.__workers:
+            w.join()
+        logger.info("Exit run loop, latency %s" % self.latency_stats())
+
+    def __process_text(self, inp: Data):
+        if inp.id != self.__latest_text:
+            # a newer text is queued
+            self.__generations.drop("queued")
+            return
+        self.__bot.process(inp.data, alternatives=inp.internal)
+
+    def __process_partial(self, inp: Data):
+        if inp.id != self.__latest_partial:
+            # a newer partial or the final text is queued
+            self.__generations.drop("partial")
+            return
+        self.__bot.process_partial(inp.data)
 
     def start_output(self):
+        """passes the outputs to the queues of the processors"""
         while True:
-            inp = self.__output_queue.get()
-            if inp is None:
+            item = self.__output_queue.get()
+            if item is None:
                 break
-            for out_proc in self.__outputs:
-                out_proc(inp)
+            for w in self.__workers:
+                w.put(item)
+        for w in self.__workers:
+            w.stop()
+
+    def __output(self, name: str, proc, item, speech: bool):
+        gen, inp = item
+        if speech and is_speech(inp) and not self.__generations.is_current(gen):
+            # the answer to an older text is not spoken after the user has said a newer one
+            self.__generations.drop("speech %s" % name)
+            return
+        proc(inp)
 
     def add_input(self, d: Data):
-        self.__input_queue.put(d)
+        if d.type == DataType.AUDIO:
+            self.add_audio(d.data)
+            return
+        if d.type == DataType.EVENT:
+            # the recognizer gets the event on the caller's thread in order with the audio, so its `event` must not
+            # block: the thread is the Socket.IO loop shared by all the sessions
+            self.__audio_rec.event(d.data)
+            self.__put(PRIORITY_CONTROL, d)
+            return
+        if d.type == DataType.TEXT:
+            self.__latest_text = d.id
+            self.__latest_partial = None
+            self.__generations.next()
+        elif d.type == DataType.TEXT_PARTIAL:
+            self.__latest_partial = d.id
+        self.__put(PRIORITY_TEXT, d)
+
+    def add_audio(self, data: bytes):
+        """passes the audio to the recognizer on the caller's thread, not queued behind the texts and the events"""
+        start = time.monotonic()
+        logger.debug("got audio %d" % len(data))
+        self.__audio_rec.add(data)
+        self.__latency["audio"].add(time.monotonic() - start)
+
+    def __put(self, priority: int, d: Optional[Data]):
+        self.__input_queue.put((priority, next(self.__seq), time.monotonic(), d))
+
+    def latency_stats(self) -> dict:
+        """:return: the waits of the audio, the events and the texts in the lanes"""
+        return {lane: latency.stats() for lane, latency in self.__latency.items()}
 
     def add_output(self, d: Data):
-        self.__output_queue.put(d)
+        self.__output_queue.put((self.__generations.current(), d))
 
-    def add_output_processor(self, proc):
-        self.__outputs.append(proc)
+    def add_output_processor(self, proc, max_size: int = 500, overflow: str = BLOCK, speech: bool = False):
+        """
+            the processor runs on its own thread, `overflow` - policy of its full queue, see `OutputWorker`
+            :param speech: the processor speaks the answers, the answers to the older texts are not passed to it
+            """
+        name = getattr(proc, "__qualname__", str(proc))
+        self.__workers.append(OutputWorker(name, lambda item: self.__output(name, proc, item, speech),
+                                           max_size=max_size, overflow=overflow))
+
+    def output_stats(self) -> dict:
+        """:return: queue gauges of the output processors"""
+        return {w.name: w.stats() for w in self.__workers}
+
+    def stats(self) -> dict:
+        """:return: the stats to report"""
+        return {"outputs": self.output_stats(), "dropped": self.__generations.dropped(),
+                "latency": self.latency_stats()}
 
     def stop(self):
-        self.__input_queue.put(None)
+        self.__put(PRIORITY_STOP, None)
         self.__output_queue.put(None)
 
     def resend_recognized(self, d: Data):
         if d.type == DataType.TEXT_RESULT and d.who == Sender.RECOGNIZER:
             logger.debug("resend recognized text as user input")
-            self.add_input(Data(in_type=DataType.TEXT, who=Sender.USER, data=d.data))
+            # internal - ranked hypotheses of the recognizer
+            self.add_input(Data(in_type=DataType.TEXT, who=Sender.USER, data=d.data, internal=d.internal))
+        if d.type == DataType.TEXT and d.who == Sender.RECOGNIZER and d.internal:
+            # partial hypothesis, the bot parses it ahead
+            self.add_input(Data(in_type=DataType.TEXT_PARTIAL, who=Sender.RECOGNIZER, data=d.internal))
         if d.type == DataType.EVENT and d.who == Sender.RECOGNIZER:
             logger.debug("resend recognizer events")
             self.add_input(Data(in_type=DataType.EVENT, who=Sender.RECOGNIZER, data=d.data))
 
 
-def main(param):
-    parser = argparse.ArgumentParser(description="This app starts voice to voice bot",
-                                     epilog="" + sys.argv[0] + "",
-                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+def make_pool(args, calc_args: dict):
+    if args.calc_workers <= 0:
+        return None
+    return CalculatorPool(args.calc_workers, calc_args=calc_args, eval_time_limit=args.eval_time_limit,
+                          timeout=args.calc_timeout)
 
-    parser.add_argument("--tts_key", nargs='?', default='intelektika', help="TTS key")
-    parser.add_argument("--use_audio_player", default=False, action=argparse.BooleanOptionalAction,
-                        help="Use audio player for audio input data processing")
-    parser.add_argument("--use_pc_player", default=False, action=argparse.BooleanOptionalAction,
-                        help="output audio to PC instead of Audio2Face")
-    parser.add_argument("--latex_url", nargs='?', default='http://localhost:5030/renderLatex',
-                        help="URL of Latex equation maker")
-    parser.add_argument("--kaldi_url", nargs='?', default='ws://localhost:9090/client/ws/speech',
-                        help="URL of Kaldi Online wrapper")
-    parser.add_argument("--number_to_text_url", nargs='?',
-                        default='https://sinteze-test.intelektika.lt/number-replacer/num2text',
-                        help="URL of Number Replace service")
-    parser.add_argument("--tts_url", nargs='?',
-                        default='https://sinteze.intelektika.lt/synthesis.service/prod/synthesize',
-                        help="URL of TTS service")
-    parser.add_argument("--a2f_url", nargs='?', default='localhost:50051', help="URL of Audio2Face GRPC server")
-    parser.add_argument("--a2f_name", nargs='?', default='SomeFace', help="Name of face instance for Audio2Face")
-    parser.add_argument("--port", nargs='?', default=8007, help="Service port for socketio clients")
-    parser.add_argument("--greet_on_connect", default=True, action=argparse.BooleanOptionalAction,
-                        help="do greet client on connecting")
-    args = parser.parse_args(args=param)
 
-    def out_func(d: Data):
-        runner.add_output(d)
+class Services:
+    """
+        The parts shared by the sessions: the grammar with its parse budget, the calculator pool, the result cache and
+        the outputs
+        """
 
-    if args.use_audio_player:
-        rec = Player()
-    else:
-        rec = Kaldi(url=args.kaldi_url, msg_func=out_func)
+    def __init__(self, args):
+        self.__args = args
+        self.budget = ParseBudget(max_tokens=args.parse_max_tokens, max_edges=args.parse_max_edges,
+                                  max_seconds=args.parse_time_limit)
+        calc_args = dict(file=args.grammar, compiled_file=args.grammar_compiled, engine=args.parse_engine,
+                         budget=self.budget, weights=args.grammar_weights, repair_words=args.repair_words)
+        self.grammar = Calculator(**calc_args)
+        self.pool = make_pool(args, calc_args)
+        # the answers to the pool results, as many as the results coming back at once
+        self.answers = ThreadPoolExecutor(max_workers=args.calc_workers, thread_name_prefix="answer") \
+            if self.pool is not None else None
+        self.cache = ResultCache(max_size=args.cache_size, ttl=args.cache_ttl)
+        self.evaluator = Evaluator(leaves_map=self.grammar.leaves_map(), time_limit=args.eval_time_limit)
+        self.eq_maker = LatexWrapper(url=args.latex_url)
+        self.number_to_text_changer = Replacer(url=args.number_to_text_url)
+        self.terminal = TerminalOutput()
+        # one voice player for all the sessions
+        self.voice = one_at_a_time(make_voice(args).process)
 
-    grammar = Calculator(file="data/calc/grammar.cfg")
-    leaves_map = grammar.leaves_map()
-    runner = Runner(
-        bot=CalculatorBot(out_func=out_func, cfg=grammar, parser=ResultParser(leaves_map=leaves_map),
-                          eq_parser=EqParser(leaves_map=leaves_map),
-                          eq_maker=LatexWrapper(url=args.latex_url),
-                          number_to_text_changer=Replacer(url=args.number_to_text_url),
-                          greet_on_connect=args.greet_on_connect),
-        audio_rec=rec)
+    def new_bot(self, out_func, generations: Generations) -> CalculatorBot:
+        """:return: bot of a session, its parse session and status are its own"""
+        args = self.__args
+        return CalculatorBot(out_func=out_func, cfg=self.grammar, evaluator=self.evaluator, eq_maker=self.eq_maker,
+                             number_to_text_changer=self.number_to_text_changer,
+                             greet_on_connect=args.greet_on_connect, pool=self.pool, cache=self.cache,
+                             nbest=args.asr_nbest, nbest_deadline=args.nbest_deadline, generations=generations,
+                             answers=self.answers)
 
-    def in_func(d: Data):
-        runner.add_input(d)
+    def add_outputs(self, runner, send):
+        """:param send: output processor sending to the client of the session"""
+        runner.add_output_processor(self.terminal.process)
+        runner.add_output_processor(send)
+        runner.add_output_processor(self.voice, max_size=self.__args.voice_queue_size,
+                                    overflow=self.__args.voice_overflow, speech=True)
 
-    workers = []
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.answers.shutdown()
 
-    def start_thread(method):
-        thread = threading.Thread(target=method, daemon=True)
-        thread.start()
-        workers.append(thread)
 
-    # terminal = TerminalInput(msg_func=in_func)
-    # threading.Thread(target=terminal.start, daemon=True).start()
-    terminal_out = TerminalOutput()
-    runner.add_output_processor(terminal_out.process)
+def one_at_a_time(proc):
+    """:return: `proc` run by one thread at a time"""
+    lock = threading.Lock()
 
-    start_thread(rec.start)
+    @functools.wraps(proc)
+    def process(d: Data):
+        with lock:
+            proc(d)
 
-    ws_service = SocketIO(msg_func=in_func, port=args.port)
-    start_thread(ws_service.start)
+    return process
 
-    runner.add_output_processor(ws_service.process)
 
+def make_voice(args) -> VoiceOutput:
     tts = IntelektikaTTS(url=args.tts_url, key=args.tts_key,
                          voice="laimis")
     if args.use_pc_player:
         player = PCPlayer()
     else:
         player = A2FPlayer(url=args.a2f_url, face_name=args.a2f_name)
-    voice_out = VoiceOutput(tts=tts, player=player)
-    runner.add_output_processor(voice_out.process)
+    return VoiceOutput(tts=tts, player=player)
+
+
+def watch_sessions(args, sessions: SessionManager, services: Services, report: Optional[MetricsReporter]):
+    """starts the cleanup of the idle sessions and the metrics reports of a `--workers` process"""
+    threading.Thread(target=sessions.watch, args=(args.session_idle_timeout / 10,), daemon=True).start()
+    if report is not None:
+        report.start(lambda: {"sessions": sessions.stats(), "runners": sessions.runner_stats(),
+                              "cache": services.cache.stats(), "parse_budget": services.budget.hits()},
+                     args.metrics_interval)
+
+
+def run_threads(args, report: MetricsReporter = None):
+    """
+        runs a `Runner` with its own recognizer and bot on threads for every connected client
+        :param report: reports the metrics of a `--workers` process to the supervisor
+        """
+    services = Services(args)
+
+    def new_session(sid: str) -> ThreadSession:
+        def out_func(d: Data):
+            runner.add_output(d)
+
+        if args.use_audio_player:
+            rec = Player()
+        else:
+            rec = Kaldi(url=args.kaldi_url, msg_func=out_func, nbest=args.asr_nbest)
+        generations = Generations()
+        runner = Runner(bot=services.new_bot(out_func, generations), audio_rec=rec, generations=generations)
+        services.add_outputs(runner, ws_service.sender(sid))
+        return ThreadSession(runner, rec)
+
+    sessions = SessionManager(new_session, max_sessions=args.max_sessions, idle_timeout=args.session_idle_timeout,
+                              on_idle=lambda sid: ws_service.kick(sid))
+    ws_service = SocketIO(sessions=sessions, port=args.port, reuse_port=report is not None,
+                          websocket_only=args.websocket_only)
+    watch_sessions(args, sessions, services, report)
+    ws_thread = threading.Thread(target=ws_service.start, daemon=True)
+    ws_thread.start()
 
     exit_c = 0
 
     def stop_runner(signum, frame):
         nonlocal exit_c
         if exit_c == 0:
-            rec.stop()
             ws_service.stop()
-            runner.stop()
         else:
             exit(1)
         exit_c = exit_c + 1
@@ -172,12 +315,168 @@ def main(param):
     signal.signal(signal.SIGINT, stop_runner)
     signal.signal(signal.SIGTERM, stop_runner)
 
-    runner.start()
-    for w in workers:
-        w.join()
+    ws_thread.join()
+    for session in sessions.stop():
+        session.join()
+    services.close()
     logger.info("Exit sage")
 
 
+def run_async(args, report: MetricsReporter = None):
+    """
+        runs an `AsyncRunner` for every connected client: the socket server, the Kaldi clients and the message
+        dispatch on one event loop, the bots and the blocking HTTP calls of the output processors in executors
+        """
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    services = Services(args)
+
+    def new_session(sid: str) -> AsyncSession:
+        def out_func(d: Data):
+            runner.add_output(d)
+
+        if args.use_audio_player:
+            rec = Player()
+            threading.Thread(target=rec.start, daemon=True).start()
+        else:
+            rec = AsyncKaldi(url=args.kaldi_url, msg_func=out_func, nbest=args.asr_nbest)
+        generations = Generations()
+        runner = AsyncRunner(bot=services.new_bot(out_func, generations), audio_rec=rec, generations=generations)
+        services.add_outputs(runner, ws_service.async_sender(sid))
+        return AsyncSession(runner, rec)
+
+    sessions = SessionManager(new_session, max_sessions=args.max_sessions, idle_timeout=args.session_idle_timeout,
+                              on_idle=lambda sid: ws_service.kick(sid))
+    ws_service = SocketIO(sessions=sessions, port=args.port, reuse_port=report is not None,
+                          websocket_only=args.websocket_only)
+    watch_sessions(args, sessions, services, report)
+    stopped = asyncio.Event()
+
+    async def serve():
+        await ws_service.serve()
+        await stopped.wait()
+        await ws_service.close()
+        await asyncio.gather(*[session.wait() for session in sessions.stop()])
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopped.set)
+    loop.run_until_complete(serve())
+    services.close()
+    logger.info("Exit sage")
+
+
+def run_worker(report: MetricsReporter, args):
+    """a process of `--workers`"""
+    if hasattr(os, "setpgrp"):
+        # Ctrl+C of the terminal goes to the supervisor only, it stops the workers
+        os.setpgrp()
+    if args.asyncio:
+        run_async(args, report)
+    else:
+        run_threads(args, report)
+
+
+def run_workers(args):
+    """
+        runs `--workers` processes sharing the port, the kernel spreads the client connections over them. A crashed
+        worker is restarted, its clients reconnect to the others
+        """
+    supervisor = Supervisor(run_worker, args=(args,), count=args.workers, log_interval=args.metrics_interval)
+
+    def stop(signum, frame):
+        supervisor.stop()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    supervisor.start()
+    supervisor.watch()
+    logger.info("Exit sage")
+
+
+def main(param):
+    parser = argparse.ArgumentParser(description="This app starts voice to voice bot",
+                                     epilog="" + sys.argv[0] + "",
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+
+    parser.add_argument("--tts_key", nargs='?', default='intelektika', help="TTS key")
+    parser.add_argument("--use_audio_player", default=False, action=argparse.BooleanOptionalAction,
+                        help="Use audio player for audio input data processing")
+    parser.add_argument("--use_pc_player", default=False, action=argparse.BooleanOptionalAction,
+                        help="output audio to PC instead of Audio2Face")
+    parser.add_argument("--latex_url", nargs='?', default='http://localhost:5030/renderLatex',
+                        help="URL of Latex equation maker")
+    parser.add_argument("--kaldi_url", nargs='?', default='ws://localhost:9090/client/ws/speech',
+                        help="URL of Kaldi Online wrapper")
+    parser.add_argument("--number_to_text_url", nargs='?',
+                        default='https://sinteze-test.intelektika.lt/number-replacer/num2text',
+                        help="URL of Number Replace service")
+    parser.add_argument("--tts_url", nargs='?',
+                        default='https://sinteze.intelektika.lt/synthesis.service/prod/synthesize',
+                        help="URL of TTS service")
+    parser.add_argument("--a2f_url", nargs='?', default='localhost:50051', help="URL of Audio2Face GRPC server")
+    parser.add_argument("--a2f_name", nargs='?', default='SomeFace', help="Name of face instance for Audio2Face")
+    parser.add_argument("--port", nargs='?', default=8007, help="Service port for socketio clients")
+    parser.add_argument("--grammar", nargs='?', default='data/calc/grammar.cfg', help="Grammar file")
+    parser.add_argument("--grammar_compiled", nargs='?', default='data/calc/grammar.pkl',
+                        help="Precompiled grammar artifact, see sage.cfg.compile_grammar")
+    parser.add_argument("--parse_engine", nargs='?', default='int', choices=['int', 'nltk', 'viterbi'],
+                        help="Grammar parser implementation, `viterbi` takes the most probable parse")
+    parser.add_argument("--grammar_weights", nargs='?', default='data/calc/grammar.pcfg',
+                        help="Weighted grammar of the `viterbi` engine, see sage.cfg.train_pcfg")
+    parser.add_argument("--repair_words", default=True, action=argparse.BooleanOptionalAction,
+                        help="Replace the words unknown to the grammar with the nearest known words")
+    parser.add_argument("--parse_max_tokens", nargs='?', type=int, default=100,
+                        help="Longer texts are not parsed")
+    parser.add_argument("--parse_max_edges", nargs='?', type=int, default=200000,
+                        help="Parsing stops if the chart gets more edges")
+    parser.add_argument("--parse_time_limit", nargs='?', type=float, default=2.0,
+                        help="Seconds allowed for parsing a text")
+    parser.add_argument("--eval_time_limit", nargs='?', type=float, default=1.0,
+                        help="Seconds allowed for evaluating an expression")
+    parser.add_argument("--calc_workers", nargs='?', type=int, default=0,
+                        help="Processes calculating the texts off the runner thread, 0 - calculate inline")
+    parser.add_argument("--calc_timeout", nargs='?', type=float, default=5.0,
+                        help="Seconds allowed for a worker process to calculate a text, the worker is restarted after")
+    parser.add_argument("--cache_size", nargs='?', type=int, default=1000,
+                        help="Answers of the repeated texts to keep, 0 - no cache")
+    parser.add_argument("--cache_ttl", nargs='?', type=float, default=3600.0,
+                        help="Seconds to keep a cached answer")
+    parser.add_argument("--asr_nbest", nargs='?', type=int, default=3,
+                        help="Recognizer hypotheses to try, the first one with a complete expression is answered")
+    parser.add_argument("--nbest_deadline", nargs='?', type=float, default=2.0,
+                        help="Seconds to wait for the better ranked hypotheses")
+    parser.add_argument("--voice_queue_size", nargs='?', type=int, default=10,
+                        help="Answers waiting to be spoken")
+    parser.add_argument("--voice_overflow", nargs='?', default=DROP_OLDEST, choices=OVERFLOW_POLICIES,
+                        help="What to do with a new answer when the voice queue is full")
+    parser.add_argument("--max_sessions", nargs='?', type=int, default=10,
+                        help="Clients served at once, a session per client: its recognizer, bot and outputs")
+    parser.add_argument("--session_idle_timeout", nargs='?', type=float, default=600.0,
+                        help="Close the session of a client without input for the seconds")
+    parser.add_argument("--workers", nargs='?', type=int, default=1,
+                        help="Processes sharing the port, every one serves up to max_sessions clients. Needs "
+                             "--websocket_only")
+    parser.add_argument("--websocket_only", default=False, action=argparse.BooleanOptionalAction,
+                        help="Serve only the websocket transport of Socket.IO, the client must connect with "
+                             "transports: ['websocket']")
+    parser.add_argument("--metrics_interval", nargs='?', type=float, default=60.0,
+                        help="Seconds between the metrics reports of the workers")
+    parser.add_argument("--asyncio", default=False, action=argparse.BooleanOptionalAction,
+                        help="Run the socket server, the recognizer client and the message dispatch on one event loop")
+    parser.add_argument("--greet_on_connect", default=True, action=argparse.BooleanOptionalAction,
+                        help="do greet client on connecting")
+    args = parser.parse_args(args=param)
+    if args.workers > 1:
+        if not args.websocket_only:
+            # the default client starts with the polling transport, its requests would be spread over the workers
+            parser.error("--workers needs --websocket_only and the clients connecting with the websocket transport")
+        run_workers(args)
+    elif args.asyncio:
+        run_async(args)
+    else:
+        run_threads(args)
+
+
 if __name__ == "__main__":
     logger.info("Starting Sage")
     main(sys.argv[1:])
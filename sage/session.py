@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sage.api.data import Data
+from sage.async_runner import maybe_await
+from sage.logger import logger
+from sage.supervisor import add_up
+
+
+class ThreadSession:
+    """A client of the threaded runner: its recognizer and `Runner` on their own threads"""
+
+    def __init__(self, runner, audio_rec):
+        self.__runner = runner
+        self.__audio_rec = audio_rec
+        self.__threads: List[threading.Thread] = []
+
+    def start(self):
+        for method in [self.__audio_rec.start, self.__runner.start]:
+            thread = threading.Thread(target=method, daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def add_input(self, d: Data):
+        self.__runner.add_input(d)
+
+    def add_audio(self, data: bytes):
+        self.__runner.add_audio(data)
+
+    def stop(self):
+        """does not wait, the queued work is finished on the threads of the session"""
+        self.__audio_rec.stop()
+        self.__runner.stop()
+
+    def stats(self) -> dict:
+        return self.__runner.stats()
+
+    def join(self, timeout: float = None):
+        for thread in self.__threads:
+            thread.join(timeout)
+
+
+class AsyncSession:
+    """A client of the asyncio runner: `AsyncRunner` as a task on the running loop"""
+
+    def __init__(self, runner, audio_rec):
+        self.__runner = runner
+        self.__audio_rec = audio_rec
+        self.__task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """must be called on the loop"""
+        self.__task = asyncio.get_running_loop().create_task(self.__run())
+
+    async def __run(self):
+        await self.__runner.run()
+        await maybe_await(self.__audio_rec.stop())
+
+    def add_input(self, d: Data):
+        self.__runner.add_input(d)
+
+    def add_audio(self, data: bytes):
+        self.__runner.add_audio(data)
+
+    def stop(self):
+        """may be called from any thread"""
+        self.__runner.stop()
+
+    def stats(self) -> dict:
+        return self.__runner.stats()
+
+    async def wait(self):
+        if self.__task is not None:
+            await self.__task
+
+
+class SessionManager:
+    """
+        Keeps a session per Socket.IO client id: its own recognizer, bot and output routing. Refuses the clients over
+        `max_sessions`, closes the sessions without input for `idle_timeout` seconds
+        """
+
+    def __init__(self, new_session: Callable[[str], object], max_sessions: int = 10, idle_timeout: float = 600,
+                 on_idle: Callable[[str], None] = None, clock: Callable[[], float] = time.monotonic):
+        """
+            :param new_session: makes the session of the client id, with `start`, `add_input`, `add_audio`, `stop`
+                and `stats`
+            :param on_idle: called with the client id of a closed idle session, e.g. to disconnect the client
+            """
+        if max_sessions <= 0:
+            raise ValueError("max_sessions must be positive")
+        logger.info("Init session manager, max %d sessions, idle timeout %ss" % (max_sessions, idle_timeout))
+        self.__new_session = new_session
+        self.__max_sessions = max_sessions
+        self.__idle_timeout = idle_timeout
+        self.__on_idle = on_idle
+        self.__clock = clock
+        self.__lock = threading.Lock()
+        self.__sessions: Dict[str, object] = {}
+        self.__last_active: Dict[str, float] = {}
+        self.__stopped = threading.Event()
+        self.__rejected = 0
+        self.__idle_closed = 0
+
+    def open(self, sid: str) -> bool:
+        """:return: False if the client is refused"""
+        with self.__lock:
+            if sid in self.__sessions:
+                return True
+            if len(self.__sessions) >= self.__max_sessions or self.__stopped.is_set():
+                self.__rejected += 1
+                logger.warning("Refused session %s, %s" % (sid, self.__stats()))
+                return False
+            session = self.__new_session(sid)
+            self.__sessions[sid] = session
+            self.__last_active[sid] = self.__clock()
+        session.start()
+        logger.info("Opened session %s, %s" % (sid, self.stats()))
+        return True
+
+    def add_input(self, sid: str, d: Data):
+        session = self.__active(sid)
+        if session is None:
+            logger.warning("No session %s, dropped %s" % (sid, d.type))
+            return
+        session.add_input(d)
+
+    def add_audio(self, sid: str, data: bytes):
+        """the fast path of the audio to the recognizer of the session"""
+        session = self.__active(sid)
+        if session is None:
+            logger.debug("No session %s, dropped audio" % sid)
+            return
+        session.add_audio(data)
+
+    def __active(self, sid: str):
+        with self.__lock:
+            session = self.__sessions.get(sid)
+            if session is not None:
+                self.__last_active[sid] = self.__clock()
+        return session
+
+    def close(self, sid: str):
+        with self.__lock:
+            session = self.__sessions.pop(sid, None)
+            self.__last_active.pop(sid, None)
+        if session is not None:
+            session.stop()
+            logger.info("Closed session %s, %s" % (sid, self.stats()))
+
+    def cleanup(self) -> List[str]:
+        """closes the idle sessions, :return: their client ids"""
+        now = self.__clock()
+        with self.__lock:
+            idle = [sid for sid, t in self.__last_active.items() if now - t >= self.__idle_timeout]
+            self.__idle_closed += len(idle)
+        for sid in idle:
+            logger.info("Session %s is idle" % sid)
+            self.close(sid)
+            if self.__on_idle is not None:
+                self.__on_idle(sid)
+        return idle
+
+    def watch(self, interval: float):
+        """calls `cleanup` every `interval` seconds until `stop`"""
+        while not self.__stopped.wait(interval):
+            self.cleanup()
+
+    def stop(self) -> list:
+        """closes all the sessions and refuses the new ones, :return: the closed sessions to wait for"""
+        self.__stopped.set()
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+            self.__sessions.clear()
+            self.__last_active.clear()
+        for session in sessions:
+            session.stop()
+        return sessions
+
+    def stats(self) -> Dict[str, int]:
+        with self.__lock:
+            return self.__stats()
+
+    def runner_stats(self) -> dict:
+        """:return: the sums of the stats of the open sessions"""
+        with self.__lock:
+            sessions = list(self.__sessions.values())
+        res = {}
+        for session in sessions:
+            res = add_up(res, session.stats())
+        return res
+
+    def __stats(self) -> Dict[str, int]:
+        return {"active": len(self.__sessions), "rejected": self.__rejected, "idle_closed": self.__idle_closed}
@@ -0,0 +1,72 @@
+import threading
+from collections import Counter
+from typing import Callable, Dict, List
+
+from sage.api.data import Data, DataType, Sender
+from sage.logger import logger
+
+
+def is_speech(d: Data) -> bool:
+    """:return: True if the output is the answer spoken to the user"""
+    return d.who == Sender.BOT and (d.type == DataType.TEXT or d.type == DataType.TEXT_RESULT)
+
+
+class Superseded(Exception):
+    """Raised when the work of an utterance is dropped for a newer one"""
+
+    def __init__(self, stage: str):
+        self.message = "Superseded at %s" % stage
+        self.stage = stage
+        super().__init__(self.message)
+
+
+class Generations:
+    """
+        Numbers the utterances. The work of an utterance checks that no newer one has arrived and is dropped
+        otherwise. Keeps the counters of the dropped work by the stage
+        """
+
+    def __init__(self):
+        self.__current = 0
+        self.__lock = threading.Lock()
+        self.__cancels: List[Callable[[], None]] = []
+        self.__dropped: Counter = Counter()
+
+    def next(self) -> int:
+        """starts the generation of a newer utterance, cancels the registered work of the older ones"""
+        with self.__lock:
+            self.__current += 1
+            cancels, self.__cancels = self.__cancels, []
+            res = self.__current
+        for cancel in cancels:
+            cancel()
+        return res
+
+    def current(self) -> int:
+        with self.__lock:
+            return self.__current
+
+    def is_current(self, gen: int) -> bool:
+        return gen == self.current()
+
+    def on_next(self, cancel: Callable[[], None]):
+        """registers the cancel of the current work, called when a newer utterance arrives"""
+        with self.__lock:
+            self.__cancels.append(cancel)
+
+    def check(self, gen: int, stage: str):
+        """raises `Superseded` if the generation is not the current one"""
+        if not self.is_current(gen):
+            self.drop(stage)
+            raise Superseded(stage)
+
+    def drop(self, stage: str):
+        with self.__lock:
+            self.__dropped[stage] += 1
+            dropped = dict(self.__dropped)
+        logger.info("Dropped stale work at %s, dropped %s" % (stage, dropped))
+
+    def dropped(self) -> Dict[str, int]:
+        """:return: counters of the dropped work by the stage"""
+        with self.__lock:
+            return dict(self.__dropped)
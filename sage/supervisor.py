@@ -0,0 +1,175 @@
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Set
+
+from sage.backoff import Backoff
+from sage.logger import logger
+
+
+def add_up(a: dict, b: dict) -> dict:
+    """:return: sums of the numbers of the nested dicts, the maximum of the `max_` ones"""
+    res = dict(a)
+    for k, v in b.items():
+        if isinstance(v, dict):
+            res[k] = add_up(res.get(k, {}), v)
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            res[k] = max(res.get(k, v), v) if k.startswith("max_") else res.get(k, 0) + v
+    return res
+
+
+class MetricsReporter:
+    """Sends the metrics of a worker process to its `Supervisor`"""
+
+    def __init__(self, metrics_queue, index: int):
+        self.index = index
+        self.__queue = metrics_queue
+
+    def __call__(self, stats: dict):
+        try:
+            self.__queue.put_nowait((self.index, stats))
+        except queue.Full:
+            pass
+
+    def start(self, stats: Callable[[], dict], interval: float):
+        """reports `stats()` every `interval` seconds from a daemon thread"""
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self(stats())
+
+        threading.Thread(target=run, daemon=True, name="metrics").start()
+
+
+class Supervisor:
+    """
+        Runs `count` worker processes of `target(reporter, *args)`, restarts the crashed ones and sums the metrics
+        they report with their `MetricsReporter`. A worker exiting with 0 is not restarted. The restart delay of a
+        worker doubles while it keeps crashing, a worker crashing `max_restarts` times in a row is given up
+        """
+
+    def __init__(self, target: Callable, args: tuple = (), count: int = 2, restart_delay: float = 1.0,
+                 max_restart_delay: float = 60.0, max_restarts: int = 10, stable_after: float = 60.0,
+                 log_interval: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        """
+            :param target: module level function, it is pickled to the spawned process
+            :param stable_after: seconds a worker runs before its crashes are forgotten
+            """
+        if count <= 0:
+            raise ValueError("count must be positive")
+        logger.info("Init supervisor of %d workers" % count)
+        self.__target = target
+        self.__args = args
+        self.__max_restarts = max_restarts
+        self.__stable_after = stable_after
+        self.__log_interval = log_interval
+        self.__clock = clock
+        self.__ctx = multiprocessing.get_context("spawn")
+        self.__metrics_queue = self.__ctx.Queue()
+        self.__procs: List[multiprocessing.Process] = [None] * count
+        self.__started: List[float] = [0.0] * count
+        self.__backoffs = [Backoff(restart_delay, max_restart_delay, clock=clock) for _ in range(count)]
+        # the workers waiting for the restart, the given up ones
+        self.__crashed: Set[int] = set()
+        self.__given_up: Set[int] = set()
+        self.__metrics: Dict[int, dict] = {}
+        self.__restarts = 0
+        self.__stopping = threading.Event()
+
+    def start(self):
+        for i in range(len(self.__procs)):
+            self.__start(i)
+
+    def __start(self, i: int):
+        proc = self.__ctx.Process(target=self.__target, args=(MetricsReporter(self.__metrics_queue, i),) + self.__args,
+                                  name="sage-worker-%d" % i)
+        proc.start()
+        logger.info("Started worker %d, pid %d" % (i, proc.pid))
+        self.__procs[i] = proc
+        self.__started[i] = self.__clock()
+        self.__metrics.pop(i, None)
+
+    def check(self) -> bool:
+        """
+            collects the reported metrics, restarts the crashed workers whose restart delay has passed, does not wait
+            :return: True while any worker runs or waits for the restart
+            """
+        self.__collect()
+        alive = False
+        for i, proc in enumerate(self.__procs):
+            if proc.exitcode is None:
+                alive = True
+                if self.__clock() - self.__started[i] >= self.__stable_after:
+                    self.__backoffs[i].succeeded()
+            elif proc.exitcode != 0 and i not in self.__given_up:
+                alive = self.__restart(i, proc.exitcode) or alive
+        return alive
+
+    def __restart(self, i: int, exitcode: int) -> bool:
+        """:return: False if the worker is given up"""
+        backoff = self.__backoffs[i]
+        if i not in self.__crashed:
+            self.__crashed.add(i)
+            backoff.failed(RuntimeError("exit code %d" % exitcode))
+            if backoff.failures > self.__max_restarts:
+                logger.error("Worker %d exited with %d, crashed %d times in a row, giving up" %
+                             (i, exitcode, backoff.failures))
+                self.__given_up.add(i)
+                return False
+            logger.error("Worker %d exited with %d, restarting in %.1fs" % (i, exitcode, backoff.wait()))
+        if backoff.wait() > 0 or self.__stopping.is_set():
+            return True
+        self.__crashed.discard(i)
+        self.__restarts += 1
+        self.__start(i)
+        return True
+
+    def __collect(self):
+        while True:
+            try:
+                i, stats = self.__metrics_queue.get_nowait()
+            except queue.Empty:
+                return
+            self.__metrics[i] = stats
+
+    def watch(self, interval: float = 1.0, timeout: float = 10.0):
+        """
+            checks the workers every `interval` seconds until `stop` is called or all the workers exit, then stops the
+            workers still running, waits `timeout` seconds before killing them
+            """
+        last_log = time.monotonic()
+        while self.check() and not self.__stopping.wait(interval):
+            if time.monotonic() - last_log >= self.__log_interval:
+                last_log = time.monotonic()
+                logger.info("Workers: %s" % self.metrics())
+        self.__stop_workers(timeout)
+
+    def stop(self):
+        """makes `watch` stop the workers and return, may be called from a signal handler"""
+        self.__stopping.set()
+
+    def __stop_workers(self, timeout: float):
+        self.__stopping.set()
+        for proc in self.__procs:
+            if proc.exitcode is None:
+                proc.terminate()
+        deadline = time.monotonic() + timeout
+        for i, proc in enumerate(self.__procs):
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.exitcode is None:
+                logger.warning("Worker %d did not stop, killing" % i)
+                proc.kill()
+                proc.join()
+        self.__collect()
+        logger.info("Stopped workers: %s" % self.metrics())
+
+    def metrics(self) -> dict:
+        """:return: the sums of the last metrics of the workers, the running workers and the restarts"""
+        res = {}
+        for stats in self.__metrics.values():
+            res = add_up(res, stats)
+        res["workers"] = sum(1 for proc in self.__procs if proc is not None and proc.exitcode is None)
+        res["restarts"] = self.__restarts
+        return res
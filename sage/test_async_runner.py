@@ -0,0 +1,233 @@
+import asyncio
+import threading
+
+from sage.api.data import Data, DataType, Sender
+from sage.async_runner import AsyncRunner, maybe_await
+
+
+class FakeBot:
+    def __init__(self, runner_ref):
+        self.runner_ref = runner_ref
+        self.texts = []
+        self.partials = []
+        self.events = []
+        self.calls = []
+        self.threads = set()
+
+    def process(self, txt, alternatives=None):
+        self.threads.add(threading.current_thread().name)
+        self.texts.append((txt, alternatives))
+        self.calls.append(txt)
+        self.runner_ref[0].add_output(Data(in_type=DataType.TEXT, who=Sender.BOT, data="ans " + txt))
+
+    def process_partial(self, txt):
+        self.partials.append(txt)
+
+    def process_event(self, d):
+        self.events.append(d.data)
+        self.calls.append(d.data)
+
+
+class FakeRec:
+    def __init__(self):
+        self.audio = []
+        self.events = []
+        self.calls = []
+
+    async def add(self, data):
+        self.audio.append(data)
+        self.calls.append(data)
+
+    async def event(self, data):
+        # connecting
+        await asyncio.sleep(0.01)
+        self.events.append(data)
+        self.calls.append(data)
+
+
+def make_runner():
+    ref = [None]
+    bot = FakeBot(ref)
+    rec = FakeRec()
+    runner = AsyncRunner(bot=bot, audio_rec=rec)
+    ref[0] = runner
+    return runner, bot, rec
+
+
+async def run_with(runner, inputs, wait=0.1):
+    task = asyncio.create_task(runner.run())
+    await asyncio.sleep(0)
+    for d in inputs:
+        runner.add_input(d)
+        await asyncio.sleep(wait)
+    runner.stop()
+    await task
+
+
+def user_text(txt):
+    return Data(in_type=DataType.TEXT, who=Sender.USER, data=txt)
+
+
+def test_maybe_await():
+    async def coro():
+        return 2
+
+    async def check():
+        assert await maybe_await(1) == 1
+        assert await maybe_await(coro()) == 2
+
+    asyncio.run(check())
+
+
+def test_dispatch():
+    runner, bot, rec = make_runner()
+    inputs = [user_text("1 plus 1"),
+              Data(in_type=DataType.AUDIO, who=Sender.USER, data=b"123"),
+              Data(in_type=DataType.EVENT, who=Sender.USER, data="AUDIO_START"),
+              Data(in_type=DataType.TEXT_PARTIAL, who=Sender.RECOGNIZER, data="1 plus")]
+    asyncio.run(run_with(runner, inputs))
+    assert bot.texts == [("1 plus 1", None)]
+    assert bot.partials == ["1 plus"]
+    assert bot.events == ["AUDIO_START"]
+    assert rec.audio == [b"123"]
+    assert rec.events == ["AUDIO_START"]
+    assert all(t.startswith("bot") for t in bot.threads)
+
+
+def test_outputs_reach_processors():
+    runner, bot, rec = make_runner()
+    sync_out, async_out = [], []
+
+    async def async_proc(d):
+        async_out.append(d.data)
+
+    runner.add_output_processor(sync_out.append)
+    runner.add_output_processor(async_proc)
+    asyncio.run(run_with(runner, [user_text("a"), user_text("b")]))
+    assert [d.data for d in sync_out] == ["ans a", "ans b"]
+    assert async_out == ["ans a", "ans b"]
+    assert all(s["depth"] == 0 for s in runner.output_stats().values())
+    assert runner.stats() == {"outputs": runner.output_stats(), "dropped": {}, "latency": runner.latency_stats()}
+
+
+def test_recognized_resent_as_input():
+    runner, bot, rec = make_runner()
+
+    async def run():
+        task = asyncio.create_task(runner.run())
+        await asyncio.sleep(0)
+        runner.add_output(Data(in_type=DataType.TEXT_RESULT, who=Sender.RECOGNIZER, data="1 plus 1",
+                               internal=["1 plus 1", "1 plus 2"]))
+        await asyncio.sleep(0.1)
+        runner.stop()
+        await task
+
+    asyncio.run(run())
+    assert bot.texts == [("1 plus 1", ["1 plus 1", "1 plus 2"])]
+
+
+def test_input_before_run():
+    runner, bot, rec = make_runner()
+    runner.add_input(user_text("a"))
+    asyncio.run(run_with(runner, []))
+    assert bot.texts == [("a", None)]
+
+
+def test_queued_text_dropped():
+    runner, bot, rec = make_runner()
+    runner.add_input(user_text("a"))
+    runner.add_input(user_text("b"))
+    asyncio.run(run_with(runner, []))
+    assert bot.texts == [("b", None)]
+    assert runner.stats()["dropped"] == {"queued": 1}
+
+
+def test_partial_burst_collapsed():
+    runner, bot, rec = make_runner()
+    for txt in ["1", "1 plus", "1 plus 2"]:
+        runner.add_input(Data(in_type=DataType.TEXT_PARTIAL, who=Sender.RECOGNIZER, data=txt))
+    asyncio.run(run_with(runner, []))
+    assert bot.partials == ["1 plus 2"]
+    assert runner.stats()["dropped"] == {"partial": 2}
+
+
+def test_stale_speech_dropped():
+    runner, bot, rec = make_runner()
+    out = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(d):
+        started.set()
+        release.wait(2)
+        out.append(d.data)
+
+    sent = []
+    runner.add_output_processor(slow, speech=True)
+    runner.add_output_processor(lambda d: sent.append(d.data))
+
+    async def run():
+        task = asyncio.create_task(runner.run())
+        await asyncio.sleep(0)
+        runner.add_input(user_text("a"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 2)
+        runner.add_output(Data(in_type=DataType.TEXT, who=Sender.BOT, data="old"))
+        await asyncio.sleep(0.05)
+        runner.add_input(user_text("b"))
+        await asyncio.sleep(0.1)
+        release.set()
+        await asyncio.sleep(0.1)
+        runner.stop()
+        await task
+
+    asyncio.run(run())
+    assert out == ["ans a", "ans b"]
+    # the other processors, e.g. the socket sender, get all the outputs
+    assert sent == ["ans a", "old", "ans b"]
+    assert runner._AsyncRunner__generations.dropped() == {"speech test_stale_speech_dropped.<locals>.slow": 1}
+
+
+def test_stop_from_thread():
+    runner, bot, rec = make_runner()
+
+    async def run():
+        task = asyncio.create_task(runner.run())
+        await asyncio.sleep(0)
+        threading.Thread(target=runner.stop).start()
+        await asyncio.wait_for(task, 2)
+
+    asyncio.run(run())
+
+
+def test_events_ahead_of_texts():
+    runner, bot, rec = make_runner()
+    runner.add_input(Data(in_type=DataType.TEXT_PARTIAL, who=Sender.RECOGNIZER, data="1 plus"))
+    runner.add_input(user_text("a"))
+    runner.add_input(Data(in_type=DataType.EVENT, who=Sender.USER, data="connected"))
+    asyncio.run(run_with(runner, []))
+    assert bot.calls == ["connected", "a"]
+    # the final text supersedes the partial queued before it
+    assert bot.partials == []
+    assert runner.stats()["dropped"] == {"partial": 1}
+
+
+def test_recognizer_lane_in_order():
+    runner, bot, rec = make_runner()
+
+    async def run():
+        task = asyncio.create_task(runner.run())
+        await asyncio.sleep(0)
+        runner.add_input(Data(in_type=DataType.EVENT, who=Sender.USER, data="AUDIO_START"))
+        for i in range(3):
+            runner.add_audio(bytes([i]))
+        runner.add_input(Data(in_type=DataType.EVENT, who=Sender.USER, data="AUDIO_STOP"))
+        await asyncio.sleep(0.1)
+        runner.stop()
+        await task
+
+    asyncio.run(run())
+    assert rec.calls == ["AUDIO_START", b"\x00", b"\x01", b"\x02", "AUDIO_STOP"]
+    stats = runner.latency_stats()
+    assert stats["audio"]["count"] == 3
+    assert stats["control"]["count"] == 2
+    assert stats["input"]["count"] == 0
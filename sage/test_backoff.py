@@ -0,0 +1,24 @@
+from sage.backoff import Backoff
+
+
+def test_backoff():
+    now = [0.0]
+    backoff = Backoff(1.0, 3.0, clock=lambda: now[0])
+    assert backoff.wait() == 0
+    err = RuntimeError("fail")
+    backoff.failed(err)
+    assert backoff.error is err
+    assert backoff.failures == 1
+    assert backoff.wait() == 1.0
+    backoff.failed(err)
+    assert backoff.wait() == 2.0
+    backoff.failed(err)
+    backoff.failed(err)
+    assert backoff.wait() == 3.0
+    now[0] = 10.0
+    assert backoff.wait() == 0
+    backoff.succeeded()
+    assert backoff.error is None
+    assert backoff.failures == 0
+    backoff.failed(err)
+    assert backoff.wait() == 1.0
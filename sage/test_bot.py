@@ -1,6 +1,14 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
 import pytest
 
-from sage.bot import round_number
+from sage.api.data import DataType, Sender
+from sage.bot import round_number, cache_key, CalculatorBot
+from sage.cache import ResultCache
+from sage.cfg.grammar import UnknownWord
+from sage.supersede import Generations
 
 
 @pytest.mark.parametrize("txt,exp,exp_change",
@@ -19,9 +27,176 @@ from sage.bot import round_number
                              ("-1.0", "-1", True),
                              ("-1.00199", "-1.001", True),
                              ("1.00199", "1.001", True),
+                             ("inf", "labai didelis skaičius", False),
+                             ("-inf", "labai didelis neigiamas skaičius", False),
+                             ("nan", "neapibrėžtas skaičius", False),
                          ])
 class TestRound:
     def test_round(self, txt, exp, exp_change):
         res, change = round_number(txt)
         assert res == exp
         assert change == exp_change
+
+
+class Counting:
+    def __init__(self, func):
+        self.calls = 0
+        self.__func = func
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.__func(*args, **kwargs)
+
+
+def test_cached_answer():
+    cfg = SimpleNamespace(new_session=lambda: None, parse=Counting(lambda txt, session: ("tree", True)))
+    evaluator = SimpleNamespace(evaluate=Counting(lambda tree: ("5", "2+3")))
+    eq_maker = SimpleNamespace(prepare=Counting(lambda eq: "<svg>%s</svg>" % eq))
+    replacer = SimpleNamespace(convert=Counting(lambda num: "penki"))
+    out = []
+    bot = CalculatorBot(cfg=cfg, evaluator=evaluator, eq_maker=eq_maker, out_func=out.append,
+                        number_to_text_changer=replacer, cache=ResultCache())
+    bot.process("du plius trys")
+    first = [(d.type, d.data) for d in out]
+    out.clear()
+    bot.process(" du  plius trys ")
+    second = [(d.type, d.data) for d in out]
+    assert second[:1] + second[2:] == first[:1] + first[2:]
+    assert (DataType.TEXT_RESULT, "penki") in first
+    for f in [cfg.parse, evaluator.evaluate, eq_maker.prepare, replacer.convert]:
+        assert f.calls == 1
+
+
+class FakePool:
+    """completes the jobs in the reverse order"""
+
+    def __init__(self, calculate):
+        self.__calculate = calculate
+        self.jobs = []
+
+    def submit(self, txt):
+        fut = Future()
+        self.jobs.append((txt, fut))
+        return fut
+
+    def run(self):
+        for txt, fut in reversed(self.jobs):
+            try:
+                fut.set_result(self.__calculate(txt))
+            except BaseException as err:
+                fut.set_exception(err)
+
+
+def calculate(txt):
+    if "olia" in txt:
+        raise UnknownWord("olia")
+    return True, ("5", "2+3")
+
+
+def parse(txt, session):
+    calculate(txt)
+    return txt, True
+
+
+def make_bot(out, pool=None, answers=None, convert=lambda num: "penki"):
+    cfg = SimpleNamespace(new_session=lambda: None, parse=parse)
+    evaluator = SimpleNamespace(evaluate=lambda tree: ("5", "2+3"))
+    return CalculatorBot(cfg=cfg, evaluator=evaluator, eq_maker=SimpleNamespace(prepare=lambda eq: "<svg/>"),
+                         out_func=out.append, number_to_text_changer=SimpleNamespace(convert=convert),
+                         pool=pool, nbest=3, answers=answers)
+
+
+def results(out):
+    return [(d.type, d.data) for d in out if d.type in (DataType.TEXT_RESULT, DataType.TEXT) and d.who == Sender.BOT]
+
+
+def test_nbest_inline():
+    out = []
+    make_bot(out).process("du plius olia", alternatives=["du plius olia", "du plius trys"])
+    assert results(out) == [(DataType.TEXT_RESULT, "penki")]
+
+
+def test_nbest_not_cached_under_text():
+    out, cache = [], ResultCache()
+    cfg = SimpleNamespace(new_session=lambda: None, parse=Counting(parse))
+    bot = CalculatorBot(cfg=cfg, evaluator=SimpleNamespace(evaluate=lambda tree: ("5", "2+3")),
+                        eq_maker=SimpleNamespace(prepare=lambda eq: "<svg/>"), out_func=out.append,
+                        number_to_text_changer=SimpleNamespace(convert=lambda num: "penki"), cache=cache, nbest=3)
+    bot.process("du plius olia", alternatives=["du plius olia", "du plius trys"])
+    assert results(out) == [(DataType.TEXT_RESULT, "penki")]
+    assert cache.get(cache_key("du plius trys")) is not None
+    assert cache.get(cache_key("du plius olia")) is None
+    # the top text is calculated again, not answered with the result of the other hypothesis
+    out.clear()
+    bot.process("du plius olia")
+    assert cfg.parse.calls == 3
+    assert results(out) == [(DataType.TEXT, "Nežinau ką daryti su žodžiu 'olia'")]
+
+
+def test_nbest_inline_all_fail():
+    out = []
+    make_bot(out).process("du plius olia", alternatives=["du plius olia", "olia"])
+    assert results(out) == [(DataType.TEXT, "Nežinau ką daryti su žodžiu 'olia'")]
+
+
+def test_nbest_pool():
+    out = []
+    pool, answers = FakePool(calculate), ThreadPoolExecutor(max_workers=1)
+    make_bot(out, pool=pool, answers=answers).process("du plius olia",
+                                                      alternatives=["du plius olia", "du plius trys", "trys"])
+    assert [t for t, _ in pool.jobs] == ["du plius olia", "du plius trys", "trys"]
+    pool.run()
+    answers.shutdown()
+    assert results(out) == [(DataType.TEXT_RESULT, "penki")]
+    assert out[-1].data == "waiting"
+
+
+def test_answer_off_pool_thread():
+    out, threads = [], []
+
+    def convert(num):
+        threads.append(threading.current_thread())
+        return "penki"
+
+    pool, answers = FakePool(calculate), ThreadPoolExecutor(max_workers=1)
+    make_bot(out, pool=pool, answers=answers, convert=convert).process("du plius trys")
+    pool.run()
+    answers.shutdown()
+    assert results(out) == [(DataType.TEXT_RESULT, "penki")]
+    assert threads and threading.current_thread() not in threads
+
+
+def test_superseded_pool():
+    out, gens = [], Generations()
+    pool, answers = FakePool(calculate), ThreadPoolExecutor(max_workers=1)
+    bot = CalculatorBot(cfg=SimpleNamespace(new_session=lambda: None), evaluator=None,
+                        eq_maker=SimpleNamespace(prepare=lambda eq: "<svg/>"), out_func=out.append,
+                        number_to_text_changer=SimpleNamespace(convert=lambda num: "penki"), pool=pool,
+                        generations=gens, answers=answers)
+    bot.process("du plius trys")
+    old = pool.jobs[0][1]
+    bot.process("du plius olia")
+    assert old.cancelled()
+    pool.jobs = pool.jobs[1:]
+    pool.run()
+    answers.shutdown()
+    assert results(out) == [(DataType.TEXT, "Nežinau ką daryti su žodžiu 'olia'")]
+    assert gens.dropped() == {"calculate": 1}
+
+
+def test_superseded_render():
+    out, gens = [], Generations()
+
+    def prepare(eq):
+        # a newer utterance arrives while rendering
+        gens.next()
+        return "<svg/>"
+
+    bot = CalculatorBot(cfg=SimpleNamespace(new_session=lambda: None, parse=parse),
+                        evaluator=SimpleNamespace(evaluate=lambda tree: ("5", "2+3")),
+                        eq_maker=SimpleNamespace(prepare=prepare), out_func=out.append,
+                        number_to_text_changer=SimpleNamespace(convert=lambda num: "penki"), generations=gens)
+    bot.process("du plius trys")
+    assert results(out) == []
+    assert [d.data for d in out if d.type == DataType.STATUS] == ["thinking"]
+    assert gens.dropped() == {"render": 1}
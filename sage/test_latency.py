@@ -0,0 +1,15 @@
+from sage.latency import Latency, latencies
+
+
+def test_latency():
+    latency = Latency()
+    assert latency.stats() == {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+    latency.add(0.001)
+    latency.add(0.003)
+    assert latency.stats() == {"count": 2, "total_ms": 4.0, "max_ms": 3.0}
+
+
+def test_latencies():
+    res = latencies("audio", "control")
+    assert list(res) == ["audio", "control"]
+    assert res["audio"] is not res["control"]
@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+from sage.cfg.grammar import UnknownWord
+from sage.nbest import NBestChooser, candidates, parsed, settle
+
+
+def value(v):
+    return settle(lambda: (True, v))
+
+
+def unknown(word):
+    def calc():
+        raise UnknownWord(word)
+
+    return settle(calc)
+
+
+class Answers:
+    def __init__(self):
+        self.got = []
+        self.event = threading.Event()
+
+    def __call__(self, rank, calculation):
+        self.got.append((rank, calculation))
+        self.event.set()
+
+
+@pytest.mark.parametrize("txt,alts,limit,exp", [("a", None, 3, ["a"]), ("a", ["a", "b", " ", "b", "c"], 3, ["a", "b", "c"]),
+                                                ("a", ["a", "b", "c"], 2, ["a", "b"]), ("a", ["b"], 0, ["a"])])
+def test_candidates(txt, alts, limit, exp):
+    assert candidates(txt, alts, limit) == exp
+
+
+def test_settle():
+    calls = []
+    calc = settle(lambda: calls.append(1) or (True, ("5", "5")))
+    assert calc() == calc() == (True, ("5", "5"))
+    assert calls == [1]
+    calc = unknown("olia")
+    for _ in range(2):
+        with pytest.raises(UnknownWord):
+            calc()
+    assert parsed(value(("5", "5")))
+    assert not parsed(value(None))
+    assert not parsed(settle(lambda: (False, None)))
+    assert not parsed(calc)
+
+
+def test_first_parsed():
+    answers = Answers()
+    chooser = NBestChooser(3, answers)
+    chooser.set(1, value(("2", "2")))
+    assert answers.got == []
+    chooser.set(0, unknown("olia"))
+    assert [(r, c()) for r, c in answers.got] == [(1, (True, ("2", "2")))]
+    assert chooser.decided()
+    chooser.set(2, value(("3", "3")))
+    assert len(answers.got) == 1
+
+
+def test_top_if_all_fail():
+    answers = Answers()
+    chooser = NBestChooser(2, answers)
+    chooser.set(1, value(None))
+    chooser.set(0, unknown("olia"))
+    assert [r for r, _ in answers.got] == [0]
+    with pytest.raises(UnknownWord):
+        answers.got[0][1]()
+
+
+def test_expire():
+    answers = Answers()
+    chooser = NBestChooser(3, answers)
+    chooser.set(0, unknown("olia"))
+    chooser.set(2, value(("3", "3")))
+    chooser.expire()
+    assert [r for r, _ in answers.got] == [2]
+
+
+def test_expire_waits_for_top():
+    answers = Answers()
+    chooser = NBestChooser(2, answers)
+    chooser.set(1, unknown("olia"))
+    chooser.expire()
+    assert answers.got == []
+    chooser.set(0, value(None))
+    assert [r for r, _ in answers.got] == [0]
+
+
+def test_deadline():
+    answers = Answers()
+    chooser = NBestChooser(3, answers, deadline=0.05)
+    chooser.set(0, unknown("olia"))
+    chooser.set(1, value(("2", "2")))
+    assert answers.event.wait(5)
+    assert [r for r, _ in answers.got] == [1]
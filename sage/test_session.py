@@ -0,0 +1,222 @@
+import asyncio
+
+import pytest
+
+from sage.api.data import Data, DataType, Sender
+from sage.async_runner import AsyncRunner
+from sage.session import AsyncSession, SessionManager, ThreadSession
+
+
+class FakeSession:
+    def __init__(self, sid):
+        self.sid = sid
+        self.started = False
+        self.stopped = False
+        self.inputs = []
+        self.audio = []
+
+    def start(self):
+        self.started = True
+
+    def add_input(self, d: Data):
+        self.inputs.append(d.data)
+
+    def add_audio(self, data: bytes):
+        self.audio.append(data)
+
+    def stop(self):
+        self.stopped = True
+
+    def stats(self):
+        return {"outputs": {"send": {"depth": len(self.inputs), "max_depth": len(self.inputs), "dropped": 1}}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_manager(**kwargs):
+    made = {}
+
+    def new_session(sid):
+        made[sid] = FakeSession(sid)
+        return made[sid]
+
+    return SessionManager(new_session, **kwargs), made
+
+
+def text(txt):
+    return Data(in_type=DataType.TEXT, who=Sender.USER, data=txt)
+
+
+def test_routes_by_sid():
+    sessions, made = make_manager()
+    assert sessions.open("a")
+    assert sessions.open("b")
+    assert sessions.open("a")
+    sessions.add_input("a", text("1"))
+    sessions.add_input("b", text("2"))
+    sessions.add_input("c", text("3"))
+    sessions.add_audio("b", b"123")
+    sessions.add_audio("c", b"456")
+    assert made["a"].started and made["b"].started
+    assert made["a"].audio == []
+    assert made["b"].audio == [b"123"]
+    assert made["a"].inputs == ["1"]
+    assert made["b"].inputs == ["2"]
+    assert sessions.stats() == {"active": 2, "rejected": 0, "idle_closed": 0}
+
+
+def test_max_sessions():
+    sessions, made = make_manager(max_sessions=2)
+    assert sessions.open("a")
+    assert sessions.open("b")
+    assert not sessions.open("c")
+    assert "c" not in made
+    sessions.close("a")
+    assert made["a"].stopped
+    assert sessions.open("c")
+    assert sessions.stats() == {"active": 2, "rejected": 1, "idle_closed": 0}
+
+
+def test_max_sessions_positive():
+    with pytest.raises(ValueError):
+        SessionManager(FakeSession, max_sessions=0)
+
+
+def test_close_unknown():
+    sessions, made = make_manager()
+    sessions.close("a")
+    assert sessions.stats()["active"] == 0
+
+
+def test_idle_cleanup():
+    clock = Clock()
+    kicked = []
+    sessions, made = make_manager(idle_timeout=10, clock=clock, on_idle=kicked.append)
+    sessions.open("a")
+    sessions.open("b")
+    clock.now = 8
+    sessions.add_audio("b", b"1")
+    clock.now = 12
+    assert sessions.cleanup() == ["a"]
+    assert made["a"].stopped and not made["b"].stopped
+    assert kicked == ["a"]
+    clock.now = 18
+    assert sessions.cleanup() == ["b"]
+    assert sessions.stats() == {"active": 0, "rejected": 0, "idle_closed": 2}
+
+
+def test_stop():
+    sessions, made = make_manager()
+    sessions.open("a")
+    sessions.open("b")
+    stopped = sessions.stop()
+    assert stopped == [made["a"], made["b"]]
+    assert all(s.stopped for s in stopped)
+    assert not sessions.open("c")
+    sessions.watch(0.01)
+
+
+def test_runner_stats():
+    sessions, made = make_manager()
+    assert sessions.runner_stats() == {}
+    sessions.open("a")
+    sessions.open("b")
+    sessions.add_input("a", text("1"))
+    sessions.add_input("a", text("2"))
+    sessions.add_input("b", text("3"))
+    assert sessions.runner_stats() == {"outputs": {"send": {"depth": 3, "max_depth": 2, "dropped": 2}}}
+
+
+class FakeRunner:
+    def __init__(self):
+        self.inputs = []
+        self.audio = []
+        self.stopped = False
+
+    def start(self):
+        pass
+
+    def add_input(self, d):
+        self.inputs.append(d.data)
+
+    def add_audio(self, data):
+        self.audio.append(data)
+
+    def stop(self):
+        self.stopped = True
+
+
+def test_thread_session():
+    runner, rec = FakeRunner(), FakeRunner()
+    session = ThreadSession(runner, rec)
+    session.start()
+    session.add_input(text("1"))
+    session.add_audio(b"1")
+    session.stop()
+    session.join(5)
+    assert runner.inputs == ["1"]
+    assert runner.audio == [b"1"]
+    assert runner.stopped and rec.stopped
+
+
+class EchoBot:
+    def __init__(self, out):
+        self.out = out
+
+    def process(self, txt, alternatives=None):
+        self.out[0].add_output(Data(in_type=DataType.TEXT, who=Sender.BOT, data="ans " + txt))
+
+    def process_partial(self, txt):
+        pass
+
+    def process_event(self, d):
+        pass
+
+
+class AsyncRec:
+    def __init__(self):
+        self.stopped = False
+
+    def add(self, data):
+        pass
+
+    def event(self, data):
+        pass
+
+    async def stop(self):
+        self.stopped = True
+
+
+def test_async_sessions_isolated():
+    got = {}
+
+    def new_session(sid):
+        ref = [None]
+        runner = AsyncRunner(bot=EchoBot(ref), audio_rec=AsyncRec())
+        ref[0] = runner
+        got[sid] = []
+
+        async def send(d):
+            got[sid].append(d.data)
+
+        runner.add_output_processor(send)
+        return AsyncSession(runner, AsyncRec())
+
+    async def run():
+        sessions = SessionManager(new_session)
+        sessions.open("a")
+        sessions.open("b")
+        await asyncio.sleep(0)
+        sessions.add_input("a", text("1"))
+        sessions.add_input("b", text("2"))
+        await asyncio.sleep(0.1)
+        await asyncio.wait_for(asyncio.gather(*[s.wait() for s in sessions.stop()]), 2)
+
+    asyncio.run(run())
+    assert got == {"a": ["ans 1"], "b": ["ans 2"]}
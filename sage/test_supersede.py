@@ -0,0 +1,27 @@
+import pytest
+
+from sage.supersede import Generations, Superseded
+
+
+def test_check():
+    gens = Generations()
+    gen = gens.next()
+    gens.check(gen, "calculate")
+    assert gens.is_current(gen)
+    gens.next()
+    with pytest.raises(Superseded) as err:
+        gens.check(gen, "render")
+    assert err.value.stage == "render"
+    gens.drop("queued")
+    assert gens.dropped() == {"render": 1, "queued": 1}
+
+
+def test_cancel():
+    gens = Generations()
+    cancelled = []
+    gens.on_next(lambda: cancelled.append(1))
+    gens.on_next(lambda: cancelled.append(2))
+    gens.next()
+    assert cancelled == [1, 2]
+    gens.next()
+    assert cancelled == [1, 2]
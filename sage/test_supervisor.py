@@ -0,0 +1,86 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from sage.supervisor import MetricsReporter, Supervisor, add_up
+
+
+def report_and_exit(report: MetricsReporter):
+    report({"sessions": {"active": report.index + 1}, "name": "w"})
+
+
+def crash_once(report: MetricsReporter, marker_dir: str):
+    marker = os.path.join(marker_dir, "crashed-%d" % report.index)
+    if not os.path.exists(marker):
+        open(marker, "w").close()
+        sys.exit(3)
+    report({"ok": 1})
+
+
+def always_crash(report: MetricsReporter):
+    sys.exit(3)
+
+
+def run_forever(report: MetricsReporter):
+    report({"ok": 1})
+    while True:
+        time.sleep(0.1)
+
+
+def test_add_up():
+    assert add_up({}, {"a": 1, "b": {"c": 2.5}, "d": "x", "e": True}) == {"a": 1, "b": {"c": 2.5}}
+    assert add_up({"a": 1, "b": {"c": 2}}, {"a": 2, "b": {"c": 1, "d": 1}}) == {"a": 3, "b": {"c": 3, "d": 1}}
+    assert add_up({"max_a": 3, "b": 1}, {"max_a": 2, "b": 1, "max_c": 1}) == {"max_a": 3, "b": 2, "max_c": 1}
+
+
+def test_count_positive():
+    with pytest.raises(ValueError):
+        Supervisor(report_and_exit, count=0)
+
+
+def test_metrics_summed():
+    supervisor = Supervisor(report_and_exit, count=2)
+    supervisor.start()
+    supervisor.watch(interval=0.05)
+    assert supervisor.metrics() == {"sessions": {"active": 3}, "workers": 0, "restarts": 0}
+
+
+def test_restarts_crashed(tmp_path):
+    supervisor = Supervisor(crash_once, args=(str(tmp_path),), count=2, restart_delay=0.05)
+    supervisor.start()
+    supervisor.watch(interval=0.05)
+    assert supervisor.metrics() == {"ok": 2, "workers": 0, "restarts": 2}
+
+
+def test_gives_up_crash_loop():
+    supervisor = Supervisor(always_crash, count=1, restart_delay=0.01, max_restarts=2)
+    supervisor.start()
+    supervisor.watch(interval=0.02)
+    assert supervisor.metrics() == {"workers": 0, "restarts": 2}
+
+
+def test_restart_does_not_wait():
+    supervisor = Supervisor(always_crash, count=1, restart_delay=100)
+    supervisor.start()
+    while supervisor.metrics()["workers"]:
+        time.sleep(0.02)
+    start = time.monotonic()
+    assert supervisor.check()
+    assert supervisor.check()
+    assert time.monotonic() - start < 1
+    assert supervisor.metrics()["restarts"] == 0
+    supervisor.stop()
+    supervisor.watch(interval=0.02)
+
+
+def test_stop():
+    supervisor = Supervisor(run_forever, count=2)
+    supervisor.start()
+    timer = threading.Timer(1.0, supervisor.stop)
+    timer.start()
+    supervisor.watch(interval=0.05, timeout=5)
+    assert supervisor.metrics()["workers"] == 0
+    assert supervisor.metrics()["restarts"] == 0